@@ -0,0 +1,145 @@
+from os import stat
+
+from enigma import eEnv, eServiceCenter, eServiceReference
+
+from Components.config import config
+
+
+class BouquetIndexEntry:
+	def __init__(self, name):
+		self.name = name
+		self.numbers = {}  # channel number -> first service with that number
+		self.positions = {}  # service compare string -> position among the playable services
+		self.count = 0  # number of playable services
+		self.firstNumber = 0  # first channel number used in the bouquet
+		self.streams = False  # contains stream (url) services
+		self.alternatives = False  # contains alternatives (service groups)
+
+
+# Channel numbers and bouquet membership of the services in the bouquets.
+# Every bouquet is listed once when it is first needed and kept until the
+# bouquets are changed: edits flushed by eBouquet rename the bouquet file into
+# place, which changes the directory, and code that reloads or edits the
+# bouquets in memory calls invalidate().
+class BouquetIndex:
+	def __init__(self):
+		self.directory = eEnv.resolve("${sysconfdir}/enigma2/")
+		self.bouquets = {}  # bouquet string -> BouquetIndexEntry
+		self.roots = {}  # root string -> ([(bouquet, playable services before it)], {number: (service, bouquet)})
+		self.key = None
+		self.generation = 0
+
+	def invalidate(self):
+		self.generation += 1
+
+	def validate(self):
+		key = [self.generation, config.usage.alternative_number_mode.value]
+		for filename in ("", "bouquets.tv", "bouquets.radio"):
+			try:
+				key.append(stat(self.directory + filename).st_mtime_ns)
+			except OSError:
+				key.append(None)
+		if key != self.key:
+			self.key = key
+			self.bouquets = {}
+			self.roots = {}
+
+	def getEntry(self, bouquet):
+		self.validate()
+		return self.loadEntry(bouquet)
+
+	# Like getEntry() for callers which already validated the index.
+	def loadEntry(self, bouquet):
+		bouquetString = bouquet.toString()
+		entry = self.bouquets.get(bouquetString)
+		if entry is None:
+			serviceHandler = eServiceCenter.getInstance()
+			info = serviceHandler.info(bouquet)
+			entry = BouquetIndexEntry(info and info.getName(bouquet) or "")
+			servicelist = serviceHandler.list(bouquet)
+			if servicelist is not None:
+				for service in servicelist.getContent("R", False):
+					number = service.getChannelNum()
+					if number not in entry.numbers:
+						entry.numbers[number] = service
+					if number > 0 and not entry.firstNumber:
+						entry.firstNumber = number
+					if not (service.flags & (eServiceReference.isMarker | eServiceReference.isDirectory)):
+						entry.count += 1
+						entry.positions.setdefault(service.toCompareString(), entry.count)
+						if service.flags & eServiceReference.isGroup:
+							entry.alternatives = True
+						elif "%3a//" in service.toString().lower():
+							entry.streams = True
+			self.bouquets[bouquetString] = entry
+		return entry
+
+	def getRoot(self, root):
+		self.validate()
+		rootString = root.toString()
+		rootEntry = self.roots.get(rootString)
+		if rootEntry is None:
+			bouquets = []
+			numbers = {}  # Channel number -> (service, bouquet) of the first visible bouquet using it.
+			offset = 0
+			servicelist = eServiceCenter.getInstance().list(root)
+			if servicelist is not None:
+				for bouquet in servicelist.getContent("R", False):
+					if bouquet.flags & eServiceReference.isDirectory:
+						bouquets.append((bouquet, offset))
+						entry = self.loadEntry(bouquet)
+						offset += entry.count
+						if not bouquet.flags & eServiceReference.isInvisible:
+							for number, service in entry.numbers.items():
+								if number not in numbers:
+									numbers[number] = (service, bouquet)
+			self.roots[rootString] = rootEntry = (bouquets, numbers)
+		return rootEntry
+
+	# Returns the bouquets of a bouquet root with the number of playable
+	# services in the bouquets before them.
+	def getBouquets(self, root):
+		return self.getRoot(root)[0]
+
+	# Returns the service with the channel number and the visible bouquet of
+	# the root containing it, or only looks into the first visible bouquet.
+	# Like the bouquet walk it replaces, an invalid bouquet is returned when
+	# no bouquet has the number.
+	def findNumber(self, root, number, firstBouquetOnly=False):
+		bouquets, numbers = self.getRoot(root)
+		if firstBouquetOnly:
+			for bouquet, offset in bouquets:
+				if not bouquet.flags & eServiceReference.isInvisible:
+					return self.getService(bouquet, number), bouquet
+			return None, eServiceReference()
+		return numbers.get(number, (None, eServiceReference()))
+
+	def getService(self, bouquet, number):
+		return self.getEntry(bouquet).numbers.get(number)
+
+	def getPosition(self, bouquet, service):
+		return self.getEntry(bouquet).positions.get(service.toCompareString())
+
+	# Returns the number of the service counted over all bouquets of the root
+	# and the bouquet it was found in, preferring the given bouquet. Like the
+	# bouquet walk it replaces, the last bouquet with the service is used when
+	# the preferred one does not have it.
+	def getRootPosition(self, root, service, preferred=None):
+		found = None
+		serviceString = service.toCompareString()
+		for bouquet, offset in self.getBouquets(root):
+			position = self.loadEntry(bouquet).positions.get(serviceString)
+			if position is not None:
+				found = (offset + position, bouquet)
+				if preferred is not None and bouquet == preferred:
+					break
+		return found or (0, None)
+
+	def getName(self, bouquet):
+		return self.getEntry(bouquet).name
+
+	def getFirstNumber(self, bouquet):
+		return self.getEntry(bouquet).firstNumber
+
+
+bouquetIndex = BouquetIndex()
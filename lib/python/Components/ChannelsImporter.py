@@ -1,4 +1,6 @@
+from Components.BouquetIndex import bouquetIndex
 from Components.config import config
+from Components.ServiceMetadataIndex import serviceMetadataIndex
 
 # for scheduler
 from time import mktime, strftime, time, localtime
@@ -277,7 +279,9 @@ class ChannelsImporter():
 			self.removeFiles(self.DIR_TMP, filename)
 		db = eDVBDB.getInstance()
 		db.reloadServicelist()
+		serviceMetadataIndex.invalidate()
 		db.reloadBouquets()
+		bouquetIndex.invalidate()
 		print("[ChannelsImporter][processFiles] New channel list loaded.")
 		self.checkEPG()
 
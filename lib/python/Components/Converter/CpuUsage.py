@@ -6,11 +6,9 @@
 # Support: http://dream.altmaster.net/
 #
 
-from os.path import isfile
-
 from Components.Converter.Converter import Converter
-from Components.Converter.Poll import Poll
 from Components.Element import cached
+from Components.SystemMetrics import systemMetrics
 
 
 class CpuUsage(Converter):
@@ -80,60 +78,18 @@ class CpuUsage(Converter):
 	range = 100
 
 
-class CpuUsageMonitor(Poll):
-
-	def __init__(self):
-		Poll.__init__(self)
-		self.__callbacks = []
-		self.__curr_info = self.getCpusInfo()
-		self.poll_interval = 1400
-
+# The cpu load is sampled by the shared system metrics sampler, this class
+# remains for the users of cpuUsageMonitor.
+class CpuUsageMonitor:
 	def getCpusCount(self):
-		return len(self.__curr_info) - 1
-
-	def getCpusInfo(self):
-		res = []
-		if isfile(file := "/proc/stat"):
-			with open(file, "r") as fd:
-				for line in fd.readlines():
-					if line.find("cpu") == 0:
-						total = busy = 0
-						# tmp = [cpu, usr, nic, sys, idle, iowait, irq, softirq, steal]
-						tmp = line.split()
-						for i in range(1, len(tmp)):
-							total += int(tmp[i])
-						# busy = total - idle - iowait
-						busy = total - int(tmp[4]) - int(tmp[5])
-						# append [cpu, total, busy]
-						res.append([tmp[0], total, busy])
-		return res
-
-	def poll(self):
-		prev_info, self.__curr_info = self.__curr_info, self.getCpusInfo()
-		if len(self.__callbacks):
-			info = []
-			for i in range(len(self.__curr_info)):
-				# xxx% = (cur_xxx - prev_xxx) // (cur_total - prev_total) * 100
-				try:
-					p = 100 * (self.__curr_info[i][2] - prev_info[i][2]) // (self.__curr_info[i][1] - prev_info[i][1])
-				except ZeroDivisionError:
-					p = 0
-				info.append(p)
-			for f in self.__callbacks:
-				f(info)
+		return systemMetrics.getCpusCount()
 
 	def connectCallback(self, func):
-		if func not in self.__callbacks:
-			self.__callbacks.append(func)
-		if not self.poll_enabled:
-			self.poll()
-			self.poll_enabled = True
+		systemMetrics.subscribe("cpu", func)
+		func(systemMetrics.snapshot("cpu"))
 
 	def disconnectCallback(self, func):
-		if func in self.__callbacks:
-			self.__callbacks.remove(func)
-		if not len(self.__callbacks) and self.poll_enabled:
-			self.poll_enabled = False
+		systemMetrics.unsubscribe("cpu", func)
 
 
 cpuUsageMonitor = CpuUsageMonitor()
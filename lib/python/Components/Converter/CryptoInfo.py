@@ -3,7 +3,7 @@ from Components.Converter.Poll import Poll
 from Components.Element import cached
 from Components.config import config
 from enigma import iServiceInformation
-from Tools.GetEcmInfo import GetEcmInfo
+from Tools.GetEcmInfo import GetEcmInfo, ecmInfoWatcher
 from Tools.Directories import pathExists
 
 
@@ -20,8 +20,9 @@ class CryptoInfo(Poll, Converter):
 			self.visible = True
 		self.textvalue = ""
 		self.poll_interval = 1000
-		self.poll_enabled = True
 		self.ecmdata = GetEcmInfo()
+		# New ecm data is pushed by the watcher, only the ecm age changes without it.
+		self.poll_enabled = not ecmInfoWatcher.watch() or self.type.startswith("ecminterval")
 
 	@cached
 	def getText(self):
@@ -108,7 +109,29 @@ class CryptoInfo(Poll, Converter):
 						except:
 							pass
 				return textvalue
+			elif self.type == "EcmTimes":
+				# Average and range of the ecm times of the current caid, from the history of the watcher.
+				history = ecmInfoWatcher.getHistory()
+				caid = history and history[-1][2]
+				times = [x[1] for x in history if x[1] is not None and x[2] == caid]
+				data = "%d ms (%d-%d ms)" % (sum(times) // len(times), min(times), max(times)) if times else ""
 			else:
 				data = self.ecmdata.getInfo(self.type)
 		return data
 	text = property(getText)
+
+	def ecmChanged(self, data, info):
+		self.changed((self.CHANGED_POLL,))
+
+	def doSuspend(self, suspended):
+		if suspended:
+			ecmInfoWatcher.unsubscribe(self.ecmChanged)
+		else:
+			ecmInfoWatcher.subscribe(self.ecmChanged)
+			if not self.poll_enabled:
+				self.ecmChanged(ecmInfoWatcher.data, ecmInfoWatcher.info)  # It may have changed while suspended.
+		Poll.doSuspend(self, suspended)
+
+	def destroy(self):
+		ecmInfoWatcher.unsubscribe(self.ecmChanged)
+		Poll.destroy(self)
@@ -1,8 +1,11 @@
 from os import popen, statvfs
+from time import monotonic
 
 from Components.Converter.Converter import Converter
 from Components.Element import cached
+from Components.Harddisk import getProcMounts
 from Components.Converter.Poll import Poll
+from Components.SystemMetrics import systemMetrics
 
 SIZE_UNITS = ['B', 'KB', 'MB', 'GB', 'TB', 'PB', 'EB']
 
@@ -17,6 +20,8 @@ class LayoutInfo(Poll, Converter):
 	USBINFO = 6
 	HDDINFO = 7
 	FLASHINFO = 8
+	HddTempInterval = 60  # seconds the output of hddtemp is reused
+	hddTemp = None  # (time, text) of the last hddtemp run, shared by all instances
 
 	def __init__(self, type):
 		Converter.__init__(self, type)
@@ -42,11 +47,9 @@ class LayoutInfo(Poll, Converter):
 			self.type = self.HDDINFO
 		else:
 			self.type = self.FLASHINFO
-		if self.type in (self.FLASHINFO, self.HDDINFO, self.USBINFO):
+		self.metricsSource = {self.HDDTEMP: "drivetemp", self.LOADAVG: "loadavg", self.MEMTOTAL: "meminfo", self.MEMFREE: "meminfo", self.SWAPTOTAL: "meminfo", self.SWAPFREE: "meminfo"}.get(self.type)
+		if self.metricsSource is None:
 			self.poll_interval = 5000
-		else:
-			self.poll_interval = 1600
-			self.poll_enabled = True
 
 	@cached
 	def getText(self):
@@ -75,7 +78,7 @@ class LayoutInfo(Poll, Converter):
 				text = '%s: %s Free:%s Used:%s (%s%%)' % (entry[1], self.getSizeStr(list[0]), self.getSizeStr(list[2]), self.getSizeStr(list[1]), list[3])
 			else:
 				text = '%s: %s Used:%s Free:%s' % (entry[1], self.getSizeStr(list[0]), self.getSizeStr(list[1]), self.getSizeStr(list[2]))
-			return text
+		return text
 
 	@cached
 	def getValue(self):
@@ -102,60 +105,41 @@ class LayoutInfo(Poll, Converter):
 
 	def getHddTemp(self):
 		textvalue = 'No info'
-		info = '0'
-		try:
-			out_line = popen('hddtemp -n -q /dev/sda').readline()
-			info = 'Hdd C:' + out_line[:4]
-			textvalue = info
-		except:
-			pass
+		temperatures = systemMetrics.sample("drivetemp")
+		if temperatures:
+			textvalue = 'Hdd C:%d' % temperatures[0]
+		else:  # Without the drivetemp driver the temperature is only available from hddtemp.
+			now = monotonic()
+			if LayoutInfo.hddTemp is not None and now - LayoutInfo.hddTemp[0] < self.HddTempInterval:
+				return LayoutInfo.hddTemp[1]
+			try:
+				out_line = popen('hddtemp -n -q /dev/sda').readline()
+				textvalue = 'Hdd C:' + out_line[:4]
+			except:
+				pass
+			LayoutInfo.hddTemp = (now, textvalue)
 		return textvalue
 
 	def getLoadAvg(self):
-		textvalue = 'No info'
-		info = '0'
-		try:
-			out_line = popen('cat /proc/loadavg').readline()
-			info = 'loadavg:' + out_line[:15]
-			textvalue = info
-		except:
-			pass
-		return textvalue
+		loadavg = systemMetrics.sample("loadavg")
+		return 'loadavg:' + loadavg[:15] if loadavg else 'No info'
 
 	def getMemInfo(self, value):
 		result = [0, 0, 0, 0]
-		try:
-			check = 0
-			fd = open('/proc/meminfo')
-			for line in fd:
-				if value + 'Total' in line:
-					check += 1
-					result[0] = int(line.split()[1]) * 1024
-				elif value + 'Free' in line:
-					check += 1
-					result[2] = int(line.split()[1]) * 1024
-				if check > 1:
-					if result[0] > 0:
-						result[1] = result[0] - result[2]
-						result[3] = result[1] * 100 // result[0]
-					break
-			fd.close()
-		except:
-			pass
+		meminfo = systemMetrics.sample("meminfo")
+		result[0] = meminfo.get(value + 'Total', 0)
+		result[2] = meminfo.get(value + 'Free', 0)
+		if result[0] > 0:
+			result[1] = result[0] - result[2]
+			result[3] = result[1] * 100 // result[0]
 		return result
 
 	def getDiskInfo(self, path):
 
 		def isMountPoint():
-			try:
-				fd = open('/proc/mounts', 'r')
-				for line in fd:
-					partLine = line.split()
-					if len(partLine) > 1 and partLine[1] == path:
-						return True
-				fd.close()
-			except:
-				return None
+			for parts in getProcMounts():
+				if parts[1] == path:
+					return True
 			return False
 
 		result = [0, 0, 0, 0]
@@ -184,8 +168,21 @@ class LayoutInfo(Poll, Converter):
 		return fmt % {'size': value, 'frac': fractal, 'unit': SIZE_UNITS[u]}
 
 	def doSuspend(self, suspended):
+		if self.metricsSource:
+			if suspended:
+				systemMetrics.unsubscribe(self.metricsSource, self.gotMetrics)
+			else:
+				systemMetrics.subscribe(self.metricsSource, self.gotMetrics)
 		if suspended:
 			self.poll_enabled = False
 		else:
 			self.downstream_elements.changed((self.CHANGED_POLL,))
-			self.poll_enabled = True
+			self.poll_enabled = self.metricsSource is None
+
+	def gotMetrics(self, snapshot):
+		self.downstream_elements.changed((self.CHANGED_POLL,))
+
+	def destroy(self):
+		if self.metricsSource:
+			systemMetrics.unsubscribe(self.metricsSource, self.gotMetrics)
+		Poll.destroy(self)
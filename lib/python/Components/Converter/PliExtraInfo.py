@@ -5,9 +5,10 @@ from Components.Converter.Converter import Converter
 from Components.Element import cached
 from Components.config import config
 from Tools.Transponder import ConvertToHumanReadable
-from Tools.GetEcmInfo import GetEcmInfo
+from Tools.GetEcmInfo import GetEcmInfo, ecmInfoWatcher
 from Tools.Hex2strColor import Hex2strColor
 from Components.Converter.Poll import Poll
+from Components.ServiceMetadataIndex import serviceMetadataIndex
 from skin import parameters
 from Tools.Directories import pathExists
 from Components.SystemInfo import SystemInfo
@@ -69,6 +70,99 @@ gamma_data = {
 	3: "HLG",
 }
 
+# Orbital position to satellite name for the transponder names
+sat_names = {
+	30: 'Rascom/Eutelsat 3E',
+	48: 'SES 5',
+	70: 'Eutelsat 7E',
+	90: 'Eutelsat 9E',
+	100: 'Eutelsat 10E',
+	130: 'Hot Bird',
+	160: 'Eutelsat 16E',
+	192: 'Astra 1KR/1L/1M/1N',
+	200: 'Arabsat 20E',
+	216: 'Eutelsat 21.5E',
+	235: 'Astra 3',
+	255: 'Eutelsat 25.5E',
+	260: 'Badr 4/5/6',
+	282: 'Astra 2E/2F/2G',
+	305: 'Arabsat 30.5E',
+	315: 'Astra 5',
+	330: 'Eutelsat 33E',
+	360: 'Eutelsat 36E',
+	380: 'Paksat',
+	390: 'Hellas Sat',
+	400: 'Express 40E',
+	420: 'Turksat',
+	450: 'Intelsat 45E',
+	480: 'Afghansat',
+	490: 'Yamal 49E',
+	530: 'Express 53E',
+	570: 'NSS 57E',
+	600: 'Intelsat 60E',
+	620: 'Intelsat 62E',
+	685: 'Intelsat 68.5E',
+	705: 'Eutelsat 70.5E',
+	720: 'Intelsat 72E',
+	750: 'ABS',
+	765: 'Apstar',
+	785: 'ThaiCom',
+	800: 'Express 80E',
+	830: 'Insat',
+	851: 'Intelsat/Horizons',
+	880: 'ST2',
+	900: 'Yamal 90E',
+	915: 'Mesat',
+	950: 'NSS/SES 95E',
+	1005: 'AsiaSat 100E',
+	1030: 'Express 103E',
+	1055: 'Asiasat 105E',
+	1082: 'NSS/SES 108E',
+	1100: 'BSat/NSAT',
+	1105: 'ChinaSat',
+	1130: 'KoreaSat',
+	1222: 'AsiaSat 122E',
+	1380: 'Telstar 18',
+	1440: 'SuperBird',
+	2310: 'Ciel',
+	2390: 'Echostar/Galaxy 121W',
+	2410: 'Echostar/DirectTV 119W',
+	2500: 'Echostar/DirectTV 110W',
+	2630: 'Galaxy 97W',
+	2690: 'NIMIQ 91W',
+	2780: 'NIMIQ 82W',
+	2830: 'Echostar/QuetzSat',
+	2880: 'AMC 72W',
+	2900: 'Star One',
+	2985: 'Echostar 61.5W',
+	2990: 'Amazonas',
+	3020: 'Intelsat 58W',
+	3045: 'Intelsat 55.5W',
+	3070: 'Intelsat 53W',
+	3100: 'Intelsat 50W',
+	3150: 'Intelsat 45W',
+	3169: 'Intelsat 43.1W',
+	3195: 'SES 40.5W',
+	3225: 'NSS/Telstar 37W',
+	3255: 'Intelsat 34.5W',
+	3285: 'Intelsat 31.5W',
+	3300: 'Hispasat',
+	3325: 'Intelsat 27.5W',
+	3355: 'Intelsat 24.5W',
+	3380: 'SES 22W',
+	3400: 'NSS 20W',
+	3420: 'Intelsat 18W',
+	3450: 'Telstar 15W',
+	3460: 'Express 14W',
+	3475: 'Eutelsat 12.5W',
+	3490: 'Express 11W',
+	3520: 'Eutelsat 8W',
+	3530: 'Nilesat/Eutelsat 7W',
+	3550: 'Eutelsat 5W',
+	3560: 'Amos',
+	3592: 'Thor/Intelsat'
+}
+
 
 def addspace(text):
 	if text:
@@ -134,7 +228,8 @@ class PliExtraInfo(Poll, Converter, object):
 		Poll.__init__(self)
 		self.type = type
 		self.poll_interval = 1000
-		self.poll_enabled = True
+		# New ecm data is pushed by the watcher, polling is only needed without it.
+		self.poll_enabled = not ecmInfoWatcher.watch()
 		self.info_fields = {
 			# Field combinations accessible from skin
 			"All": (
@@ -690,98 +785,6 @@ class PliExtraInfo(Poll, Converter, object):
 			else:
 				orbpos -= 1
 
-		sat_names = {
-			30: 'Rascom/Eutelsat 3E',
-			48: 'SES 5',
-			70: 'Eutelsat 7E',
-			90: 'Eutelsat 9E',
-			100: 'Eutelsat 10E',
-			130: 'Hot Bird',
-			160: 'Eutelsat 16E',
-			192: 'Astra 1KR/1L/1M/1N',
-			200: 'Arabsat 20E',
-			216: 'Eutelsat 21.5E',
-			235: 'Astra 3',
-			255: 'Eutelsat 25.5E',
-			260: 'Badr 4/5/6',
-			282: 'Astra 2E/2F/2G',
-			305: 'Arabsat 30.5E',
-			315: 'Astra 5',
-			330: 'Eutelsat 33E',
-			360: 'Eutelsat 36E',
-			380: 'Paksat',
-			390: 'Hellas Sat',
-			400: 'Express 40E',
-			420: 'Turksat',
-			450: 'Intelsat 45E',
-			480: 'Afghansat',
-			490: 'Yamal 49E',
-			530: 'Express 53E',
-			570: 'NSS 57E',
-			600: 'Intelsat 60E',
-			620: 'Intelsat 62E',
-			685: 'Intelsat 68.5E',
-			705: 'Eutelsat 70.5E',
-			720: 'Intelsat 72E',
-			750: 'ABS',
-			765: 'Apstar',
-			785: 'ThaiCom',
-			800: 'Express 80E',
-			830: 'Insat',
-			851: 'Intelsat/Horizons',
-			880: 'ST2',
-			900: 'Yamal 90E',
-			915: 'Mesat',
-			950: 'NSS/SES 95E',
-			1005: 'AsiaSat 100E',
-			1030: 'Express 103E',
-			1055: 'Asiasat 105E',
-			1082: 'NSS/SES 108E',
-			1100: 'BSat/NSAT',
-			1105: 'ChinaSat',
-			1130: 'KoreaSat',
-			1222: 'AsiaSat 122E',
-			1380: 'Telstar 18',
-			1440: 'SuperBird',
-			2310: 'Ciel',
-			2390: 'Echostar/Galaxy 121W',
-			2410: 'Echostar/DirectTV 119W',
-			2500: 'Echostar/DirectTV 110W',
-			2630: 'Galaxy 97W',
-			2690: 'NIMIQ 91W',
-			2780: 'NIMIQ 82W',
-			2830: 'Echostar/QuetzSat',
-			2880: 'AMC 72W',
-			2900: 'Star One',
-			2985: 'Echostar 61.5W',
-			2990: 'Amazonas',
-			3020: 'Intelsat 58W',
-			3045: 'Intelsat 55.5W',
-			3070: 'Intelsat 53W',
-			3100: 'Intelsat 50W',
-			3150: 'Intelsat 45W',
-			3169: 'Intelsat 43.1W',
-			3195: 'SES 40.5W',
-			3225: 'NSS/Telstar 37W',
-			3255: 'Intelsat 34.5W',
-			3285: 'Intelsat 31.5W',
-			3300: 'Hispasat',
-			3325: 'Intelsat 27.5W',
-			3355: 'Intelsat 24.5W',
-			3380: 'SES 22W',
-			3400: 'NSS 20W',
-			3420: 'Intelsat 18W',
-			3450: 'Telstar 15W',
-			3460: 'Express 14W',
-			3475: 'Eutelsat 12.5W',
-			3490: 'Express 11W',
-			3520: 'Eutelsat 8W',
-			3530: 'Nilesat/Eutelsat 7W',
-			3550: 'Eutelsat 5W',
-			3560: 'Amos',
-			3592: 'Thor/Intelsat'
-		}
-
 		if orbpos in sat_names:
 			return sat_names[orbpos]
 		else:
@@ -943,8 +946,7 @@ class PliExtraInfo(Poll, Converter, object):
 
 			feraw = self.feraw
 			if not feraw:
-				feraw = info.getInfoObject(iServiceInformation.sTransponderData)
-				fedata = ConvertToHumanReadable(feraw)
+				feraw, fedata = serviceMetadataIndex.getTransponderData(info)
 			else:
 				fedata = self.fedata
 
@@ -1063,3 +1065,19 @@ class PliExtraInfo(Poll, Converter, object):
 		elif what[0] == self.CHANGED_POLL and self.updateFEdata is not None:
 			self.updateFEdata = False
 			Converter.changed(self, what)
+
+	def ecmChanged(self, data, info):
+		self.changed((self.CHANGED_POLL,))
+
+	def doSuspend(self, suspended):
+		if suspended:
+			ecmInfoWatcher.unsubscribe(self.ecmChanged)
+		else:
+			ecmInfoWatcher.subscribe(self.ecmChanged)
+			if not self.poll_enabled:
+				self.ecmChanged(ecmInfoWatcher.data, ecmInfoWatcher.info)  # It may have changed while suspended.
+		Poll.doSuspend(self, suspended)
+
+	def destroy(self):
+		ecmInfoWatcher.unsubscribe(self.ecmChanged)
+		Poll.destroy(self)
@@ -1,19 +1,107 @@
+from time import monotonic, perf_counter
+from traceback import print_exc
+
 from enigma import eTimer
 
 
+# One timer for all polling converters. Converters are grouped on their poll
+# interval and every group is due on a multiple of its interval, so groups
+# whose intervals divide each other (100/500/1000 ms ...) fire in the same
+# wakeup of the main loop.
+class PollWheel:
+	Slack = 10  # msec, groups due within this time are fired with the current wakeup
+
+	def __init__(self):
+		self.timer = eTimer()
+		self.timer.callback.append(self.tick)
+		self.groups = {}  # interval -> {converter: None}, ordered like the original timers were started
+		self.due = {}  # interval -> msec when the group is due next
+		self.wakeups = 0
+		self.classStats = {}  # converter class name -> [wakeups, seconds]
+
+	def add(self, converter, interval):
+		group = self.groups.get(interval)
+		if group is None:
+			self.groups[interval] = group = {}
+			now = int(monotonic() * 1000)
+			self.due[interval] = now - now % interval + interval
+			self.schedule(now)
+		group[converter] = None
+
+	def remove(self, converter, interval):
+		group = self.groups.get(interval)
+		if group is not None and converter in group:
+			del group[converter]
+			if not group:
+				del self.groups[interval]
+				del self.due[interval]
+				if not self.groups:
+					self.timer.stop()
+
+	def schedule(self, now):
+		if self.due:
+			self.timer.start(max(min(self.due.values()) - now, 0), True)
+
+	def tick(self):
+		self.wakeups += 1
+		now = int(monotonic() * 1000)
+		for interval in [interval for interval, due in self.due.items() if due <= now + self.Slack]:
+			if interval not in self.due:
+				continue  # A previous poll may have closed the screen.
+			self.due[interval] = now - now % interval + interval
+			for converter in list(self.groups[interval]):
+				group = self.groups.get(interval)
+				if group is not None and converter in group:
+					begin = perf_counter()
+					try:
+						converter.poll()
+					except Exception:  # One failing converter must not stop the polling of all others.
+						print("[Poll] Error: Poll of %s failed!" % converter.__class__.__name__)
+						print_exc()
+					converter.accountPoll(perf_counter() - begin)
+		self.schedule(int(monotonic() * 1000))
+
+	def account(self, converter, seconds):
+		stats = self.classStats.get(converter.__class__.__name__)
+		if stats is None:
+			self.classStats[converter.__class__.__name__] = stats = [0, 0.0]
+		stats[0] += 1
+		stats[1] += seconds
+
+	# Returns the wakeups of the shared timer, the number of polling
+	# converters per interval and the polls and time spent per converter (for
+	# the active ones) and per converter class (since start).
+	def getStats(self):
+		converters = []
+		for interval, group in sorted(self.groups.items()):
+			for converter in group:
+				converters.append({"converter": "%s(%s)" % (converter.__class__.__name__, getattr(converter, "converter_arguments", "")), "interval": interval, "wakeups": converter.pollWakeups, "msec": converter.pollTime * 1000})
+		classes = dict([(name, {"wakeups": stats[0], "msec": stats[1] * 1000}) for name, stats in self.classStats.items()])
+		return {"wakeups": self.wakeups, "groups": dict([(interval, len(group)) for interval, group in self.groups.items()]), "converters": converters, "classes": classes}
+
+
+pollWheel = PollWheel()
+
+
 class Poll:
 	def __init__(self):
-		self.__poll_timer = eTimer()
-		self.__poll_timer.callback.append(self.poll)
 		self.__interval = 1000
 		self.__enabled = False
+		self.__scheduled = None  # interval this converter is in the poll wheel with
+		self.pollWakeups = 0
+		self.pollTime = 0.0
+
+	def __schedule(self, active):
+		if self.__scheduled is not None:
+			pollWheel.remove(self, self.__scheduled)
+			self.__scheduled = None
+		if active:
+			self.__scheduled = max(int(self.__interval), 1)
+			pollWheel.add(self, self.__scheduled)
 
 	def __setInterval(self, interval):
 		self.__interval = interval
-		if self.__enabled:
-			self.__poll_timer.start(self.__interval)
-		else:
-			self.__poll_timer.stop()
+		self.__schedule(self.__enabled)
 
 	def __setEnable(self, enabled):
 		self.__enabled = enabled
@@ -25,13 +113,18 @@ class Poll:
 	def poll(self):
 		self.changed((self.CHANGED_POLL,))
 
+	def accountPoll(self, seconds):
+		self.pollWakeups += 1
+		self.pollTime += seconds
+		pollWheel.account(self, seconds)
+
 	def doSuspend(self, suspended):
 		if self.__enabled:
 			if suspended:
-				self.__poll_timer.stop()
+				self.__schedule(False)
 			else:
 				self.poll()
 				self.poll_enabled = True
 
 	def destroy(self):
-		self.__poll_timer.callback.remove(self.poll)
+		self.__schedule(False)
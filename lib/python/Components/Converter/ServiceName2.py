@@ -20,9 +20,11 @@
 
 from enigma import iServiceInformation, iPlayableService, iPlayableServicePtr, eServiceReference, eServiceCenter, eTimer, getBestPlayableServiceReference
 
+from Components.BouquetIndex import bouquetIndex
 from Components.config import config
 from Components.Converter.Converter import Converter
 from Components.Element import cached
+from Components.ServiceMetadataIndex import serviceMetadataIndex
 
 import NavigationInstance
 try:
@@ -75,66 +77,9 @@ class ServiceName2(Converter):
 		self.refstr = self.isStream = self.ref = self.info = self.what = self.tpdata = None
 		self.Timer = eTimer()
 		self.Timer.callback.append(self.neededChange)
-		self.IPTVcontrol = self.isAdditionalService(type=0)
-		self.AlternativeControl = self.isAdditionalService(type=1)
-
-	def isAdditionalService(self, type=0):
-		def searchService(serviceHandler, bouquet):
-			istype = False
-			servicelist = serviceHandler.list(bouquet)
-			if servicelist is not None:
-				while True:
-					s = servicelist.getNext()
-					if not s.valid():
-						break
-					if not (s.flags & (eServiceReference.isMarker | eServiceReference.isDirectory)):
-						if type:
-							if s.flags & eServiceReference.isGroup:
-								istype = True
-								return istype
-						else:
-							if "%3a//" in s.toString().lower():
-								istype = True
-								return istype
-			return istype
-
-		isService = False
-		serviceHandler = eServiceCenter.getInstance()
-		if not config.usage.multibouquet.value:
-			service_types_tv = '1:7:1:0:0:0:0:0:0:0:(type == 1) || (type == 17) || (type == 22) || (type == 25) || (type == 134) || (type == 195)'
-			rootstr = '%s FROM BOUQUET "userbouquet.favourites.tv" ORDER BY bouquet' % (service_types_tv)
-		else:
-			rootstr = '1:7:1:0:0:0:0:0:0:0:FROM BOUQUET "bouquets.tv" ORDER BY bouquet'
-		bouquet = eServiceReference(rootstr)
-		if not config.usage.multibouquet.value:
-			isService = searchService(serviceHandler, bouquet)
-		else:
-			bouquetlist = serviceHandler.list(bouquet)
-			if bouquetlist is not None:
-				while True:
-					bouquet = bouquetlist.getNext()
-					if not bouquet.valid():
-						break
-					if bouquet.flags & eServiceReference.isDirectory:
-						isService = searchService(serviceHandler, bouquet)
-						if isService:
-							break
-		return isService
+		self.IPTVcontrol, self.AlternativeControl = serviceMetadataIndex.getAdditionalServices()
 
 	def getServiceNumber(self, ref):
-		def searchHelper(serviceHandler, num, bouquet):
-			servicelist = serviceHandler.list(bouquet)
-			if servicelist is not None:
-				while True:
-					s = servicelist.getNext()
-					if not s.valid():
-						break
-					if not (s.flags & (eServiceReference.isMarker | eServiceReference.isDirectory)):
-						num += 1
-						if s == ref:
-							return s, num
-			return None, num
-
 		if isinstance(ref, eServiceReference):
 			isRadioService = ref.getData(0) in (2, 10)
 			lastpath = isRadioService and config.radio.lastroot.value or config.tv.lastroot.value
@@ -154,58 +99,22 @@ class ServiceName2(Converter):
 			for x in lastpath.split(';'):
 				if x != '':
 					rootstr = x
-			serviceHandler = eServiceCenter.getInstance()
 			if acount is True or not config.usage.multibouquet.value:
 				bouquet = eServiceReference(rootstr)
-				service, number = searchHelper(serviceHandler, 0, bouquet)
+				number = bouquetIndex.getPosition(bouquet, ref)
 			else:
 				if isRadioService:
 					bqrootstr = '1:7:2:0:0:0:0:0:0:0:FROM BOUQUET "bouquets.radio" ORDER BY bouquet'
 				else:
 					bqrootstr = '1:7:1:0:0:0:0:0:0:0:FROM BOUQUET "bouquets.tv" ORDER BY bouquet'
-				number = 0
-				cur = eServiceReference(rootstr)
-				bouquet = eServiceReference(bqrootstr)
-				bouquetlist = serviceHandler.list(bouquet)
-				if bouquetlist is not None:
-					while True:
-						bouquet = bouquetlist.getNext()
-						if not bouquet.valid():
-							break
-						if bouquet.flags & eServiceReference.isDirectory:
-							service, number = searchHelper(serviceHandler, number, bouquet)
-							if service is not None and cur == bouquet:
-								break
-			if service is not None:
-				info = serviceHandler.info(bouquet)
-				name = info and info.getName(bouquet) or ''
-				return number, name
+				number, bouquet = bouquetIndex.getRootPosition(eServiceReference(bqrootstr), ref, eServiceReference(rootstr))
+			if number:
+				return number, bouquetIndex.getName(bouquet)
 		return 0, ''
 
 	def getProviderName(self, ref):
 		if isinstance(ref, eServiceReference):
-			from Screens.ChannelSelection import service_types_radio, service_types_tv
-			typestr = ref.getData(0) in (2, 10) and service_types_radio or service_types_tv
-			pos = typestr.rfind(':')
-			rootstr = '%s (channelID == %08x%04x%04x) && %s FROM PROVIDERS ORDER BY name' % (typestr[:pos + 1], ref.getUnsignedData(4), ref.getUnsignedData(2), ref.getUnsignedData(3), typestr[pos + 1:])
-			provider_root = eServiceReference(rootstr)
-			serviceHandler = eServiceCenter.getInstance()
-			providerlist = serviceHandler.list(provider_root)
-			if providerlist is not None:
-				while True:
-					provider = providerlist.getNext()
-					if not provider.valid():
-						break
-					if provider.flags & eServiceReference.isDirectory:
-						servicelist = serviceHandler.list(provider)
-						if servicelist is not None:
-							while True:
-								service = servicelist.getNext()
-								if not service.valid():
-									break
-								if service == ref:
-									info = serviceHandler.info(provider)
-									return info and info.getName(provider) or "Unknown"
+			return serviceMetadataIndex.getProviderName(ref)
 		return ""
 
 	def getTransponderInfo(self, info, ref, fmt):
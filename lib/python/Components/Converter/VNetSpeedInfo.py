@@ -19,10 +19,10 @@
 
 from Components.Converter.Converter import Converter
 from Components.Element import cached
-from Components.Converter.Poll import Poll
+from Components.SystemMetrics import systemMetrics
 
 
-class VNetSpeedInfo(Poll, Converter):
+class VNetSpeedInfo(Converter):
 	RCL = 0 			# Receive Lan in Megabit/s = Geschwindigkeit/Bandbreite
 	TML = 1				# Transmit Lan in Megabit/s = Geschwindigkeit/Bandbreite
 	RCW = 2				# Receive Wlan in Megabit/s = Geschwindigkeit/Bandbreite
@@ -52,9 +52,6 @@ class VNetSpeedInfo(Poll, Converter):
 	DRO_TMW = 26  # Drop WLan-Transmit
 
 	def __init__(self, type, update_interval=1000):
-		Poll.__init__(self)
-		self.poll_interval = 1500
-		self.poll_enabled = True
 		self.lanreceivetotal = 0
 		self.lanreceivetotalout = 0
 		self.lanreceive = 0
@@ -76,6 +73,9 @@ class VNetSpeedInfo(Poll, Converter):
 		self.transmittotal = 0
 		self.transmit = 0
 		self.receivemb = 0
+		self.transmitmb = 0
+		self.receivetotalout = 0
+		self.transmittotalout = 0
 		self.nettyp = "NONE"
 		self.error_lanreceive = 0
 		self.drop_lanreceive = 0
@@ -144,102 +144,50 @@ class VNetSpeedInfo(Poll, Converter):
 		elif type == "DRO_TMW":
 			self.type = self.DRO_TMW
 
-	@cached
-	def getText(self):
-		textvalue = ""
-		textvalue = self.updateNetSpeedInfoStatus()
-		return textvalue
+	def doSuspend(self, suspended):
+		if suspended:
+			systemMetrics.unsubscribe("netdev", self.updateNetSpeedInfoStatus)
+		else:
+			systemMetrics.subscribe("netdev", self.updateNetSpeedInfoStatus)
+			self.updateNetSpeedInfoStatus(systemMetrics.snapshot("netdev"))
 
-	text = property(getText)
+	def destroy(self):
+		systemMetrics.unsubscribe("netdev", self.updateNetSpeedInfoStatus)
+		Converter.destroy(self)
 
-	def updateNetSpeedInfoStatus(self):
-		flaglan = 0
-		flagwlan = 0
-		bwm = open("/proc/net/dev")
-		bw = bwm.readline()
-		bw = bwm.readline()
-		sp = []
-		while (bw):
-			bw = bwm.readline()
-			while bw.find("  ") != -1:
-				bw = bw.replace("  ", " ")
-			if bw.find("eth") != -1:
-				flaglan = 1
-				sp = bw.split(":")
-				bw = sp[1].lstrip()
-				sp = bw.split(" ")
-				if len(sp[0]) == 0:
-					sp[0] = "0"
-				if len(sp[2]) == 0:
-					sp[2] = "0"
-				if len(sp[3]) == 0:
-					sp[3] = "0"
-				if len(sp[8]) == 0:
-					sp[8] = "0"
-				if len(sp[10]) == 0:
-					sp[10] = "0"
-				if len(sp[11]) == 0:
-					sp[11] = "0"
-				newlanreceive = int(sp[0]) / 1024
-				self.error_lanrecive = int(sp[2])
-				self.drop_lanreceive = int(sp[3])
-				if self.lanreceivetotal > 0:
-					self.lanreceive = float(newlanreceive - self.lanreceivetotal) * 8 / 1024
-					self.lanreceivemb = float(newlanreceive - self.lanreceivetotal) / 1024
-				else:
-					self.lanreceive = 0
-				self.lanreceivetotal = newlanreceive
-				self.lanreceivetotalout = newlanreceive / 1024
-				newlantransmit = int(sp[8]) / 1024
-				self.error_lantransmite = int(sp[10])
-				self.drop_lantransmite = int(sp[11])
-				if self.lantransmittotal > 0:
-					self.lantransmit = float(newlantransmit - self.lantransmittotal) * 8 / 1024
-					self.lantransmitmb = float(newlantransmit - self.lantransmittotal) / 1024
-				else:
-					self.lantransmit = 0
-				self.lantransmittotal = newlantransmit
-				self.lantransmittotalout = newlantransmit / 1024
-				if (self.lantransmittotal + self.lanreceivetotal) == 0:
-					flaglan = 0
-			if (bw.find("ra") != -1) or (bw.find("wlan") != -1) or (bw.find("wifi") != -1):
-				flagwlan = 1
-				sp = bw.split(":")
-				bw = sp[1].lstrip()
-				sp = bw.split(" ")
-				if len(sp[0]) == 0:
-					sp[0] = "0"
-				if len(sp[2]) == 0:
-					sp[2] = "0"
-				if len(sp[3]) == 0:
-					sp[3] = "0"
-				if len(sp[8]) == 0:
-					sp[8] = "0"
-				if len(sp[10]) == 0:
-					sp[10] = "0"
-				if len(sp[11]) == 0:
-					sp[11] = "0"
-				newwlanreceive = int(sp[0]) / 1024
-				self.error_wlanrecive = int(sp[2])
-				self.drop_wlanreceive = int(sp[3])
-				if self.wlanreceivetotal > 0:
-					self.wlanreceive = float(newwlanreceive - self.wlanreceivetotal) * 8 / 1024
-					self.wlanreceivemb = float(newwlanreceive - self.wlanreceivetotal) / 1024
-				else:
-					self.wlanreceive = 0
-				self.wlanreceivetotal = newwlanreceive
-				self.wlanreceivetotalout = newwlanreceive / 1024
-				newwlantransmit = int(sp[8]) / 1024
-				self.error_wlantransmite = int(sp[10])
-				self.drop_wlantransmite = int(sp[11])
-				if self.wlantransmittotal > 0:
-					self.wlantransmit = float(newwlantransmit - self.wlantransmittotal) * 8 / 1024
-					self.wlantransmitmb = float(newwlantransmit - self.wlantransmittotal) / 1024
-				else:
-					self.wlantransmit = 0
-				self.wlantransmittotal = newwlantransmit
-				self.wlantransmittotalout = newwlantransmit / 1024
-		bwm.close()
+	# Totals are in KB (the *totalout values in MB), rates in Mb/s and MB/s
+	# over the time between the last two samples of /proc/net/dev.
+	def updateNetSpeedInfoStatus(self, rates):
+		lan = [x for name, x in rates.items() if "eth" in name]
+		wlan = [x for name, x in rates.items() if "ra" in name or "wlan" in name or "wifi" in name]
+		flaglan = 1 if lan and sum([x[0][0] + x[0][3] for x in lan]) else 0
+		flagwlan = 1 if wlan else 0
+		if lan:
+			self.lanreceivetotal = sum([x[0][0] for x in lan]) / 1024
+			self.lanreceivetotalout = self.lanreceivetotal / 1024
+			self.lanreceivemb = sum([x[1] for x in lan]) / 1048576
+			self.lanreceive = self.lanreceivemb * 8
+			self.error_lanreceive = sum([x[0][1] for x in lan])
+			self.drop_lanreceive = sum([x[0][2] for x in lan])
+			self.lantransmittotal = sum([x[0][3] for x in lan]) / 1024
+			self.lantransmittotalout = self.lantransmittotal / 1024
+			self.lantransmitmb = sum([x[2] for x in lan]) / 1048576
+			self.lantransmit = self.lantransmitmb * 8
+			self.error_lantransmite = sum([x[0][4] for x in lan])
+			self.drop_lantransmite = sum([x[0][5] for x in lan])
+		if wlan:
+			self.wlanreceivetotal = sum([x[0][0] for x in wlan]) / 1024
+			self.wlanreceivetotalout = self.wlanreceivetotal / 1024
+			self.wlanreceivemb = sum([x[1] for x in wlan]) / 1048576
+			self.wlanreceive = self.wlanreceivemb * 8
+			self.error_wlanreceive = sum([x[0][1] for x in wlan])
+			self.drop_wlanreceive = sum([x[0][2] for x in wlan])
+			self.wlantransmittotal = sum([x[0][3] for x in wlan]) / 1024
+			self.wlantransmittotalout = self.wlantransmittotal / 1024
+			self.wlantransmitmb = sum([x[2] for x in wlan]) / 1048576
+			self.wlantransmit = self.wlantransmitmb * 8
+			self.error_wlantransmite = sum([x[0][4] for x in wlan])
+			self.drop_wlantransmite = sum([x[0][5] for x in wlan])
 
 		#  if ((flaglan == 1) and (flagwlan == 0)) or ((flaglan == 1) and (flagwlan == 1)):
 		if flaglan == 1:
@@ -260,6 +208,12 @@ class VNetSpeedInfo(Poll, Converter):
 		if (flaglan == 1) or (flagwlan == 1):
 			self.receivemb = self.receive / 8
 			self.transmitmb = self.transmit / 8
+			self.receivetotalout = self.receivetotal / 1024
+			self.transmittotalout = self.transmittotal / 1024
+		self.changed((self.CHANGED_POLL,))
+
+	@cached
+	def getText(self):
 		if self.type == self.RCL:
 			return "%3.1fMb/s" % self.lanreceive
 		elif self.type == self.TML:
@@ -1,6 +1,6 @@
 from time import localtime, time, strftime
 
-from enigma import eListbox, eListboxPythonMultiContent, eServiceReference, gFont, eRect, eSize, RT_HALIGN_LEFT, RT_VALIGN_CENTER, BT_SCALE, BT_KEEP_ASPECT_RATIO, BT_ALIGN_CENTER
+from enigma import eListbox, eListboxPythonMultiContent, eServiceReference, eTimer, gFont, eRect, eSize, RT_HALIGN_LEFT, RT_VALIGN_CENTER, BT_SCALE, BT_KEEP_ASPECT_RATIO, BT_ALIGN_CENTER
 
 from skin import parseColor, parseFont, parseScale, applySkinFactor
 from Components.EpgListBase import EPGListBase
@@ -11,7 +11,7 @@ from Components.config import config
 from RecordTimer import RecordTimer
 from Tools.Alternatives import CompareWithAlternatives
 from Tools.Directories import resolveFilename, SCOPE_CURRENT_SKIN
-from Tools.LoadPixmap import LoadPixmap
+from Tools.LoadPixmap import LoadPixmap, pixmapCache
 from Tools.TextBoundary import getTextBoundarySize
 
 MAX_TIMELINES = 6
@@ -22,6 +22,11 @@ SECS_IN_MIN = 60
 
 
 class EPGListGrid(EPGListBase):
+	PrefetchPages = 1  # rows fetched above and below the visible page
+	PrefetchEpochs = 1  # time windows fetched before and after the visible one
+	FillChunkSize = 50  # services fetched per main loop iteration
+	EventCacheTimeout = 120  # seconds before fetched events are queried again
+
 	def __init__(self, session, isInfobar, selChangedCB=None):
 		EPGListBase.__init__(self, session, selChangedCB)
 
@@ -33,6 +38,14 @@ class EPGListGrid(EPGListBase):
 		self.selectionRect = None
 		self.eventRect = None
 		self.serviceRect = None
+		self.eventCache = {}  # service ref -> (fetchBegin, fetchEnd, events)
+		self.eventCacheTime = 0
+		self.pendingRows = {}  # service ref -> indexes of the rows still to be fetched
+		self.rowCache = {}  # (service ref, channel number) -> row layout, see buildRow()
+		self.rowCacheLayout = None
+		self.piconPage = None  # first row of the page the picons were prefetched for
+		self.fillTimer = eTimer()
+		self.fillTimer.callback.append(self.fillPendingRows)
 
 		self.nowEvPix = None
 		self.nowSelEvPix = None
@@ -107,6 +120,7 @@ class EPGListGrid(EPGListBase):
 		self.showServiceNumber = "servicenumber" in self.serviceTitleMode
 		self.showServiceName = "servicename" in self.serviceTitleMode
 		self.showPicon = "picon" in self.serviceTitleMode
+		self.rowCache = {}
 
 	def applySkin(self, desktop, screen):
 		if self.skinAttributes is not None:
@@ -275,6 +289,7 @@ class EPGListGrid(EPGListBase):
 			self.listHeight = self.instance.size().height()
 
 	def setFontsize(self):
+		self.rowCache = {}
 		self.l.setFont(0, gFont(self.serviceFontName, self.serviceFontSize + self.epgConfig.servfs.value))
 		self.l.setFont(1, gFont(self.eventFontName, self.eventFontSize + self.epgConfig.eventfs.value))
 		# Cache service number width.
@@ -285,6 +300,8 @@ class EPGListGrid(EPGListBase):
 				self.serviceNumberWidth = getTextBoundarySize(self.instance, font, self.instance.size(), "0000").width()
 
 	def isSelectable(self, service, serviceName, events, picon, channel):
+		if service in self.pendingRows:
+			events = self.loadRow(service)[2]
 		return (events and len(events) and True) or False
 
 	def postWidgetCreate(self, instance):
@@ -298,15 +315,19 @@ class EPGListGrid(EPGListBase):
 		self.l.setSelectionClip(eRect(0, 0, 0, 0), False)
 
 	def preWidgetRemove(self, instance):
+		self.fillTimer.stop()
 		instance.selectionChanged.get().remove(self.serviceChanged)
 		instance.setContent(None)
 
 	def serviceChanged(self):
 		self.selectEventFromTime()
 		self.refreshSelection()
+		self.prefetchPicons(self.instance.getCurrentIndex())
 
 	def selectEventFromTime(self):
 		self.selectedService = self.l.getCurrentSelection()
+		if self.selectedService and self.selectedService[0] in self.pendingRows:
+			self.selectedService = self.loadRow(self.selectedService[0])
 		if self.selectedService:
 			self.selectedEventIndex = None
 			events = self.selectedService[2]
@@ -340,6 +361,9 @@ class EPGListGrid(EPGListBase):
 			self.piconSize = eSize(piconWidth, piconHeight)
 		self.serviceRect = eRect(0, 0, w, height)
 		self.eventRect = eRect(w, 0, width - w, height)
+		if self.rowCacheLayout != (w, width, height):
+			self.rowCacheLayout = (w, width, height)
+			self.rowCache = {}
 
 	def calcEventPosAndWidthHelper(self, stime, duration, start, end, width):
 		xpos = (stime - start) * width // (end - start)
@@ -353,25 +377,63 @@ class EPGListGrid(EPGListBase):
 		return xpos, ewidth
 
 	def buildEntry(self, service, serviceName, events, picon, channel):
-		r1 = self.serviceRect
-		r2 = self.eventRect
-		left = r2.left()
-		top = r2.top()
-		width = r2.width()
-		height = r2.height()
+		if service in self.pendingRows:
+			service, serviceName, events, picon, channel = self.loadRow(service)
 		selected = self.selectedService[0] == service
-		res = [None]
+		now = time()
+		# The layout of a row only depends on the visible time window, the timers of the
+		# service and the playing service, so it's built once and reused on every repaint.
+		# Only the selected row gets the events touched by the selection rebuilt.
+		playing = self.session.nav.getCurrentlyPlayingServiceOrGroup()
+		key = (self.timeBase, self.timeEpochSecs, self.session.nav.RecordTimer.timerIndex.serviceGeneration(service), playing and playing.toString())
+		row = self.rowCache.get((service, channel))  # a service can be in the bouquet more than once
+		if row is None or row[0] != key or row[1] != events or now >= row[2]:
+			row = self.buildRow(key, service, serviceName, events, picon, channel, playing, now)
+			self.rowCache[(service, channel)] = row
+		if not selected:
+			return row[6]
+		res = [None] + row[3]
+		res.extend(self.buildBackgroundEntries(True, events) if events is None else row[4])
+		if row[5]:
+			serviceTimers = self.getServiceTimers(service)
+			selectionLeft = self.selectionRect.left() - self.eventRect.left()
+			for ev, xpos, hasTimerIcon, entries in row[5]:
+				res.extend(self.buildEventEntries(ev, serviceTimers, now, True)[0] if hasTimerIcon or xpos == selectionLeft else entries)
+		return res
 
-		borderTopPix = None
-		borderLeftPix = None
-		borderBottomPix = None
-		borderRightPix = None
+	# Returns [key, events, validUntil, serviceEntries, backgroundEntries, eventCells, unselectedEntries]
+	# where every event cell is (event, xpos, hasTimerIcon, entries) as built for an unselected row.
+	def buildRow(self, key, service, serviceName, events, picon, channel, playing, now):
+		serviceEntries = self.buildServiceEntries(service, serviceName, events, picon, channel, playing)
+		backgroundEntries = self.buildBackgroundEntries(False, events)
+		res = [None] + serviceEntries + backgroundEntries
+		eventCells = []
+		validUntil = now + 86400
+		if events:
+			serviceTimers = self.getServiceTimers(service)
+			for ev in events:  # (eventId, eventTitle, beginTime, duration)
+				entries, xpos, hasTimerIcon = self.buildEventEntries(ev, serviceTimers, now, False)
+				eventCells.append((ev, xpos, hasTimerIcon, entries))
+				res.extend(entries)
+				# the current event highlight moves at the next event boundary
+				for boundary in (ev[2], ev[2] + ev[3]):
+					if now < boundary < validUntil:
+						validUntil = boundary
+		return [key, events, validUntil, serviceEntries, backgroundEntries, eventCells, res]
+
+	def getServiceTimers(self, service):
+		serviceref = "1" + service[4:] if service[:4] in config.recording.setstreamto1.value else service  # converts 4097, 5001, 5002 to 1
+		return self.filteredTimerList.get(':'.join(serviceref.split(':')[:11]))
+
+	def buildServiceEntries(self, service, serviceName, events, picon, channel, playing):
+		r1 = self.serviceRect
+		res = []
 
 		# Picon and Service name
 		serviceForeColor = self.foreColorService
 		serviceBackColor = self.backColorService
 		bgpng = self.othServPix
-		if CompareWithAlternatives(service, self.session.nav.getCurrentlyPlayingServiceOrGroup()):
+		if CompareWithAlternatives(service, playing):
 			serviceForeColor = self.foreColorServiceNow
 			serviceBackColor = self.backColorServiceNow
 			bgpng = self.nowServPix
@@ -455,6 +517,16 @@ class EPGListGrid(EPGListBase):
 					color=serviceForeColor, color_sel=serviceForeColor,
 					backcolor=serviceBackColor, backcolor_sel=serviceBackColor))
 				colX += namewidth + 2 * self.serviceNamePadding
+		return res
+
+	def buildBackgroundEntries(self, selected, events):
+		r1 = self.serviceRect
+		r2 = self.eventRect
+		left = r2.left()
+		top = r2.top()
+		width = r2.width()
+		height = r2.height()
+		res = []
 
 		if self.graphic:
 			# Service Borders
@@ -519,170 +591,173 @@ class EPGListGrid(EPGListBase):
 				text="", color=None, color_sel=None,
 				backcolor=self.backColor, backcolor_sel=self.backColorSelected,
 				border_width=self.eventBorderWidth, border_color=self.borderColor))
+		return res
 
-		# Events for service
-		if events:
-			start = self.timeBase
-			end = start + self.timeEpochSecs
+	# Returns the entries of one event, its position and whether it shows a timer icon.
+	def buildEventEntries(self, ev, serviceTimers, now, selected):
+		r2 = self.eventRect
+		left = r2.left()
+		top = r2.top()
+		width = r2.width()
+		height = r2.height()
+		start = self.timeBase
+		end = start + self.timeEpochSecs
+		res = []
+
+		stime = ev[2]
+		duration = ev[3]
+
+		xpos, ewidth = self.calcEventPosAndWidthHelper(stime, duration, start, end, width)
+		if serviceTimers is not None:
+			# Code below: "+ (20 if config.recording.margin_before.value == 0 else 0)"
+			# When recording-start-margin is zero allow recordings that start up to 20 seconds
+			# after the program boundary to still produce matchType in (2, 3). This allows
+			# correct display of "epg/RecordEvent.png" when multiple recodings are programmed to
+			# start at the same instant.
+			timer, matchType = RecordTimer.isInTimerOnService(serviceTimers, stime + (20 if config.recording.margin_before.value == 0 else 0), duration)
+			timerIcon, autoTimerIcon = self.getPixmapsForTimer(timer, matchType, selected)
+			if matchType not in (2, 3):
+				timer = None
+		else:
+			timer = matchType = timerIcon = None
+
+		isNow = stime <= now < (stime + duration) and config.epgselection.grid.highlight_current_events.value
+		# Only highlight timers that span an entire event
+		if timer and matchType == 3:
+			if timer.justplay == 0 and timer.always_zap == 0:
+				foreColor = self.foreColorRecord
+				backColor = self.backColorRecord
+				foreColorSel = self.foreColorRecordSelected
+				backColorSel = self.backColorRecordSelected
+			else:
+				foreColor = self.foreColorZap
+				backColor = self.backColorZap
+				foreColorSel = self.foreColorZapSelected
+				backColorSel = self.backColorZapSelected
+		elif isNow:
+			foreColor = self.foreColorNow
+			backColor = self.backColorNow
+			foreColorSel = self.foreColorNowSelected
+			backColorSel = self.backColorNowSelected
+		else:
+			foreColor = self.foreColor
+			backColor = self.backColor
+			foreColorSel = self.foreColorSelected
+			backColorSel = self.backColorSelected
+
+		if selected and self.selectionRect.left() == xpos + left:
+			borderTopPix = self.borderSelectedTopPix
+			borderLeftPix = self.borderSelectedLeftPix
+			borderBottomPix = self.borderSelectedBottomPix
+			borderRightPix = self.borderSelectedRightPix
+			infoPix = self.selInfoPix
+			bgpng = self.nowSelEvPix if isNow else self.selEvPix
+			if timer:
+				bgpng = self.recSelEvPix if timer.justplay == 0 and timer.always_zap == 0 else self.zapSelEvPix
+		else:
+			borderTopPix = self.borderTopPix
+			borderLeftPix = self.borderLeftPix
+			borderBottomPix = self.borderBottomPix
+			borderRightPix = self.borderRightPix
+			infoPix = self.infoPix
+			bgpng = self.othEvPix
+			if timer:
+				bgpng = self.recEvPix if timer.justplay == 0 and timer.always_zap == 0 else self.zapEvPix
+			elif isNow:
+				bgpng = self.nowEvPix
+
+		# Event box background.
+		if bgpng is not None and self.graphic:
+			backColor = None
+			backColorSel = None
+			res.append(MultiContentEntryPixmapAlphaBlend(
+				pos=(left + xpos + self.eventBorderWidth, top + self.eventBorderWidth),
+				size=(ewidth - 2 * self.eventBorderWidth, height - 2 * self.eventBorderWidth),
+				png=bgpng,
+				flags=BT_SCALE))
+		else:
+			res.append(MultiContentEntryText(
+				pos=(left + xpos, top), size=(ewidth + self.eventBorderWidth, height + self.eventBorderWidth),
+				font=1, flags=RT_HALIGN_LEFT | RT_VALIGN_CENTER,
+				text="", color=None, color_sel=None,
+				backcolor=backColor, backcolor_sel=backColorSel,
+				border_width=self.eventBorderWidth, border_color=self.borderColor))
 
-			now = time()
-			for ev in events:  # (eventId, eventTitle, beginTime, duration)
-				stime = ev[2]
-				duration = ev[3]
-
-				xpos, ewidth = self.calcEventPosAndWidthHelper(stime, duration, start, end, width)
-				serviceref = "1" + service[4:] if service[:4] in config.recording.setstreamto1.value else service  # converts 4097, 5001, 5002 to 1
-				serviceTimers = self.filteredTimerList.get(':'.join(serviceref.split(':')[:11]))
-				if serviceTimers is not None:
-					# Code below: "+ (20 if config.recording.margin_before.value == 0 else 0)"
-					# When recording-start-margin is zero allow recordings that start up to 20 seconds
-					# after the program boundary to still produce matchType in (2, 3). This allows
-					# correct display of "epg/RecordEvent.png" when multiple recodings are programmed to
-					# start at the same instant.
-					timer, matchType = RecordTimer.isInTimerOnService(serviceTimers, stime + (20 if config.recording.margin_before.value == 0 else 0), duration)
-					timerIcon, autoTimerIcon = self.getPixmapsForTimer(timer, matchType, selected)
-					if matchType not in (2, 3):
-						timer = None
-				else:
-					timer = matchType = timerIcon = None
-
-				isNow = stime <= now < (stime + duration) and config.epgselection.grid.highlight_current_events.value
-				# Only highlight timers that span an entire event
-				if timer and matchType == 3:
-					if timer.justplay == 0 and timer.always_zap == 0:
-						foreColor = self.foreColorRecord
-						backColor = self.backColorRecord
-						foreColorSel = self.foreColorRecordSelected
-						backColorSel = self.backColorRecordSelected
-					else:
-						foreColor = self.foreColorZap
-						backColor = self.backColorZap
-						foreColorSel = self.foreColorZapSelected
-						backColorSel = self.backColorZapSelected
-				elif isNow:
-					foreColor = self.foreColorNow
-					backColor = self.backColorNow
-					foreColorSel = self.foreColorNowSelected
-					backColorSel = self.backColorNowSelected
-				else:
-					foreColor = self.foreColor
-					backColor = self.backColor
-					foreColorSel = self.foreColorSelected
-					backColorSel = self.backColorSelected
-
-				if selected and self.selectionRect.left() == xpos + left:
-					borderTopPix = self.borderSelectedTopPix
-					borderLeftPix = self.borderSelectedLeftPix
-					borderBottomPix = self.borderSelectedBottomPix
-					borderRightPix = self.borderSelectedRightPix
-					infoPix = self.selInfoPix
-					bgpng = self.nowSelEvPix if isNow else self.selEvPix
-					if timer:
-						bgpng = self.recSelEvPix if timer.justplay == 0 and timer.always_zap == 0 else self.zapSelEvPix
-				else:
-					borderTopPix = self.borderTopPix
-					borderLeftPix = self.borderLeftPix
-					borderBottomPix = self.borderBottomPix
-					borderRightPix = self.borderRightPix
-					infoPix = self.infoPix
-					bgpng = self.othEvPix
-					if timer:
-						bgpng = self.recEvPix if timer.justplay == 0 and timer.always_zap == 0 else self.zapEvPix
-					elif isNow:
-						bgpng = self.nowEvPix
-
-				# Event box background.
-				if bgpng is not None and self.graphic:
-					backColor = None
-					backColorSel = None
-					res.append(MultiContentEntryPixmapAlphaBlend(
-						pos=(left + xpos + self.eventBorderWidth, top + self.eventBorderWidth),
-						size=(ewidth - 2 * self.eventBorderWidth, height - 2 * self.eventBorderWidth),
-						png=bgpng,
+		# Event text.
+		evX = left + xpos + self.eventBorderWidth + self.eventNamePadding
+		evY = top + self.eventBorderWidth
+		evW = ewidth - 2 * (self.eventBorderWidth + self.eventNamePadding)
+		evH = height - 2 * self.eventBorderWidth
+		infowidth = self.epgConfig.infowidth.value
+		if infowidth > 0 and evW < infowidth and infoPix is not None:
+			res.append(MultiContentEntryPixmapAlphaBlend(
+				pos=(left + xpos + self.eventBorderWidth, evY), size=(ewidth - 2 * self.eventBorderWidth, evH),
+				png=infoPix, flags=BT_ALIGN_CENTER))
+		else:
+			res.append(MultiContentEntryText(
+				pos=(evX + self.eventTextSidesMargin, evY), size=(evW - self.eventTextSidesMargin * 2, evH),
+				font=1, flags=int(config.epgselection.grid.event_alignment.value),
+				text=ev[1],
+				color=foreColor, color_sel=foreColorSel,
+				backcolor=backColor, backcolor_sel=backColorSel))
+
+		# Event box borders.
+		if self.graphic:
+			if borderTopPix is not None:
+				res.append(MultiContentEntryPixmapAlphaBlend(
+						pos=(left + xpos, top),
+						size=(ewidth, self.eventBorderWidth),
+						png=borderTopPix,
 						flags=BT_SCALE))
+			if borderBottomPix is not None:
+				res.append(MultiContentEntryPixmapAlphaBlend(
+						pos=(left + xpos, height - self.eventBorderWidth),
+						size=(ewidth, self.eventBorderWidth),
+						png=borderBottomPix,
+						flags=BT_SCALE))
+			if borderLeftPix is not None:
+				res.append(MultiContentEntryPixmapAlphaBlend(
+						pos=(left + xpos, top),
+						size=(self.eventBorderWidth, height),
+						png=borderLeftPix,
+						flags=BT_SCALE))
+			if borderRightPix is not None:
+				res.append(MultiContentEntryPixmapAlphaBlend(
+						pos=(left + xpos + ewidth - self.eventBorderWidth, top),
+						size=(self.eventBorderWidth, height),
+						png=borderRightPix,
+						flags=BT_SCALE))
+
+		# Recording icons.
+		if timerIcon is not None and ewidth > timerIcon.size().width():
+			if config.epgselection.grid.rec_icon_height.value != "hide":
+				pix_size = timerIcon.size()
+				pix_width = pix_size.width()
+				pix_height = pix_size.height()
+				isTimerIconAdded = False
+				if config.epgselection.grid.rec_icon_height.value == "middle":
+					recIconHeight = top + (height - pix_height) // 2
+				elif config.epgselection.grid.rec_icon_height.value == "top":
+					recIconHeight = top + 3
 				else:
-					res.append(MultiContentEntryText(
-						pos=(left + xpos, top), size=(ewidth + self.eventBorderWidth, height + self.eventBorderWidth),
-						font=1, flags=RT_HALIGN_LEFT | RT_VALIGN_CENTER,
-						text="", color=None, color_sel=None,
-						backcolor=backColor, backcolor_sel=backColorSel,
-						border_width=self.eventBorderWidth, border_color=self.borderColor))
-
-				# Event text.
-				evX = left + xpos + self.eventBorderWidth + self.eventNamePadding
-				evY = top + self.eventBorderWidth
-				evW = ewidth - 2 * (self.eventBorderWidth + self.eventNamePadding)
-				evH = height - 2 * self.eventBorderWidth
-				infowidth = self.epgConfig.infowidth.value
-				if infowidth > 0 and evW < infowidth and infoPix is not None:
-					res.append(MultiContentEntryPixmapAlphaBlend(
-						pos=(left + xpos + self.eventBorderWidth, evY), size=(ewidth - 2 * self.eventBorderWidth, evH),
-						png=infoPix, flags=BT_ALIGN_CENTER))
+					recIconHeight = top + height - pix_height - 10
+				if matchType == 0:
+					pos = (left + xpos + ewidth - pix_width - 10, recIconHeight)
+					isTimerIconAdded = True
 				else:
-					res.append(MultiContentEntryText(
-						pos=(evX + self.eventTextSidesMargin, evY), size=(evW - self.eventTextSidesMargin * 2, evH),
-						font=1, flags=int(config.epgselection.grid.event_alignment.value),
-						text=ev[1],
-						color=foreColor, color_sel=foreColorSel,
-						backcolor=backColor, backcolor_sel=backColorSel))
-
-				# Event box borders.
-				if self.graphic:
-					if borderTopPix is not None:
-						res.append(MultiContentEntryPixmapAlphaBlend(
-								pos=(left + xpos, top),
-								size=(ewidth, self.eventBorderWidth),
-								png=borderTopPix,
-								flags=BT_SCALE))
-					if borderBottomPix is not None:
-						res.append(MultiContentEntryPixmapAlphaBlend(
-								pos=(left + xpos, height - self.eventBorderWidth),
-								size=(ewidth, self.eventBorderWidth),
-								png=borderBottomPix,
-								flags=BT_SCALE))
-					if borderLeftPix is not None:
-						res.append(MultiContentEntryPixmapAlphaBlend(
-								pos=(left + xpos, top),
-								size=(self.eventBorderWidth, height),
-								png=borderLeftPix,
-								flags=BT_SCALE))
-					if borderRightPix is not None:
-						res.append(MultiContentEntryPixmapAlphaBlend(
-								pos=(left + xpos + ewidth - self.eventBorderWidth, top),
-								size=(self.eventBorderWidth, height),
-								png=borderRightPix,
-								flags=BT_SCALE))
-
-				# Recording icons.
-				if timerIcon is not None and ewidth > timerIcon.size().width():
-					if config.epgselection.grid.rec_icon_height.value != "hide":
-						pix_size = timerIcon.size()
-						pix_width = pix_size.width()
-						pix_height = pix_size.height()
-						isTimerIconAdded = False
-						if config.epgselection.grid.rec_icon_height.value == "middle":
-							recIconHeight = top + (height - pix_height) // 2
-						elif config.epgselection.grid.rec_icon_height.value == "top":
-							recIconHeight = top + 3
-						else:
-							recIconHeight = top + height - pix_height - 10
-						if matchType == 0:
-							pos = (left + xpos + ewidth - pix_width - 10, recIconHeight)
-							isTimerIconAdded = True
-						else:
-							pos = (left + xpos + ewidth - pix_width - 10, recIconHeight)
-							isTimerIconAdded = True
-						res.append(MultiContentEntryPixmapAlphaBlend(
-							pos=pos, size=(pix_width, pix_height),
-							png=timerIcon))
-						if autoTimerIcon:
-							pix_size = autoTimerIcon.size()
-							pix_width = pix_size.width()
-							pix_height = pix_size.height()
-							res.append(MultiContentEntryPixmapAlphaBlend(
-								pos=(pos[0] - pix_width - (5 if isTimerIconAdded else 10), pos[1]), size=(pix_width, pix_height),
-								png=autoTimerIcon))
-		return res
+					pos = (left + xpos + ewidth - pix_width - 10, recIconHeight)
+					isTimerIconAdded = True
+				res.append(MultiContentEntryPixmapAlphaBlend(
+					pos=pos, size=(pix_width, pix_height),
+					png=timerIcon))
+				if autoTimerIcon:
+					pix_size = autoTimerIcon.size()
+					pix_width = pix_size.width()
+					pix_height = pix_size.height()
+					res.append(MultiContentEntryPixmapAlphaBlend(
+						pos=(pos[0] - pix_width - (5 if isTimerIconAdded else 10), pos[1]), size=(pix_width, pix_height),
+						png=autoTimerIcon))
+		return res, xpos, timerIcon is not None
 
 	def getSelectionPosition(self):
 		_, sely = EPGListBase.getSelectionPosition(self)
@@ -791,62 +866,125 @@ class EPGListGrid(EPGListBase):
 			self.graphicsloaded = True
 
 		if services is None:
-			test = [(service[0], 0, self.timeBase, self.timeEpoch) for service in self.list]
-			serviceList = self.list
-			piconIdx = 3
-			channelIdx = 4
+			serviceList = [(service[0], service[1], service[3], service[4]) for service in self.list]
 		else:
 			self.selectedEventIndex = None
 			self.selectedService = None
-			test = [(service.ref.toString(), 0, self.timeBase, self.timeEpoch) for service in services]
-			serviceList = services
-			piconIdx = 0
-			channelIdx = 0
-
-		test.insert(0, "XRnITBD")  # return record, service ref, service name, event id, event title, begin time, duration
-		epgData = self.queryEPG(test)
+			self.eventCache = {}
+			self.rowCache = {}
+			# We pass the serviceref if we don't have the channel number yet, so it can be grabbed.
+			serviceList = [(service.ref.toString(), service.getServiceName(), None, service) for service in services]
+		if time() - self.eventCacheTime > self.EventCacheTimeout:
+			self.eventCache = {}
+			self.eventCacheTime = time()
+
+		# Every service gets its row straight away, so that the selection and the service
+		# lookups work as before.  The events are taken from the events fetched for an
+		# earlier time window where possible, the remaining rows are fetched for the
+		# visible page now and in chunks between main loop iterations afterwards.
+		self.fillTimer.stop()
 		self.list = []
-		eventList = None
-		serviceRef = ""
-		serviceName = ""
+		self.pendingRows = {}
+		for index, (serviceRef, serviceName, picon, channel) in enumerate(serviceList):
+			events = self.getCachedEvents(serviceRef)
+			if events is False:
+				events = None
+				self.pendingRows.setdefault(serviceRef, []).append(index)
+			self.list.append((serviceRef, serviceName, events, picon, channel))
 		self.snapshotTimers(self.timeBase, self.timeBase + self.timeEpochSecs)
+		self.loadRows(self.instance and self.instance.getCurrentIndex() or 0)
+		if self.pendingRows:
+			self.fillTimer.start(1, True)
 
-		def appendService():
-			picon = None if piconIdx == 0 else serviceList[serviceIdx][piconIdx]
-			# We pass the serviceref if we don't have the channel number yet, so it can be grabbed.
-			channel = serviceList[serviceIdx] if channelIdx == 0 else serviceList[serviceIdx][channelIdx]
-			self.list.append((serviceRef, serviceName, eventList[0][0] is not None and eventList or None, picon, channel))
+		self.l.setList(self.list)
+		self.recalcEventSize()
+		self.piconPage = None
+		self.prefetchPicons(self.instance and self.instance.getCurrentIndex() or 0)
+
+	def getCachedEvents(self, serviceRef):
+		# Return the events of the visible time window from the events fetched earlier,
+		# None if there are none or False if the fetched span doesn't cover the window.
+		cached = self.eventCache.get(serviceRef)
+		windowEnd = self.timeBase + self.timeEpochSecs
+		if cached is None or cached[0] > self.timeBase or cached[1] < windowEnd:
+			return False
+		return [event for event in cached[2] if event[2] < windowEnd and event[2] + event[3] > self.timeBase] or None
 
-		serviceIdx = 0
-		for x in epgData:
+	def fetchRows(self, indexes):
+		indexes = [index for index in indexes if index in self.pendingRows.get(self.list[index][0], ())]
+		if not indexes:
+			return
+		serviceRefs = []
+		for index in indexes:
+			if self.list[index][0] not in serviceRefs:
+				serviceRefs.append(self.list[index][0])
+		fetchBegin = self.timeBase - self.PrefetchEpochs * self.timeEpochSecs
+		fetchEnd = self.timeBase + (self.PrefetchEpochs + 1) * self.timeEpochSecs
+		query = [(serviceRef, 0, fetchBegin, (fetchEnd - fetchBegin) // SECS_IN_MIN) for serviceRef in serviceRefs]
+		query.insert(0, "XRnITBD")  # return record, service ref, service name, event id, event title, begin time, duration
+		fetched = []
+		serviceRef = None
+		for x in self.queryEPG(query):
 			if serviceRef != x[0]:
-				if eventList:
-					appendService()
-					serviceIdx += 1
 				serviceRef = x[0]
-				serviceName = x[1]
-				eventList = []
-			eventList.append((x[2], x[3], x[4], x[5]))  # (eventId, eventTitle, beginTime, duration)
-		if eventList and len(eventList) > 0:
-			appendService()
-
-		self.l.setList(self.list)
-		self.recalcEventSize()
+				fetched.append((x[1], []))
+			if x[2] is not None:
+				fetched[-1][1].append((x[2], x[3], x[4], x[5]))  # (eventId, eventTitle, beginTime, duration)
+		for serviceRef, (serviceName, eventList) in zip(serviceRefs, fetched):
+			self.eventCache[serviceRef] = (fetchBegin, fetchEnd, eventList)
+			events = self.getCachedEvents(serviceRef)
+			for index in self.pendingRows.pop(serviceRef, ()):
+				row = self.list[index]
+				self.list[index] = (serviceRef, serviceName, events, row[3], row[4])
+
+	def loadRows(self, index):
+		# Fetch the page around the given row plus the prefetch margin.
+		rows = max(self.listHeight // self.itemHeight, 1)
+		top = index - index % rows
+		self.fetchRows(range(max(top - self.PrefetchPages * rows, 0), min(top + (self.PrefetchPages + 1) * rows, len(self.list))))
+
+	def prefetchPicons(self, index):
+		# Decode the picons of the pages above and below the page of the given row
+		# in the background, so that paging shows them without loading them first.
+		if self.showPicon:
+			rows = max(self.listHeight // self.itemHeight, 1)
+			top = index - index % rows
+			if top != self.piconPage:
+				self.piconPage = top
+				picons = []
+				for index in list(range(max(top - self.PrefetchPages * rows, 0), top)) + list(range(top + rows, min(top + (self.PrefetchPages + 1) * rows, len(self.list)))):
+					service, serviceName, events, picon, channel = self.list[index]
+					if picon is None:
+						picon = getPiconName(service)
+						self.list[index] = (service, serviceName, events, picon, channel)
+					picons.append(picon)
+				pixmapCache.prefetch(picons)
+
+	def loadRow(self, serviceRef):
+		index = self.pendingRows[serviceRef][0]
+		self.loadRows(index)
+		return self.list[index]
+
+	def fillPendingRows(self):
+		if self.pendingRows:
+			current = self.instance and self.instance.getCurrentIndex() or 0
+			indexes = sorted([index for indexes in self.pendingRows.values() for index in indexes], key=lambda index: abs(index - current))
+			self.fetchRows(indexes[:self.FillChunkSize])
+		if self.pendingRows:
+			self.fillTimer.start(1, True)
 
 	def snapshotTimers(self, startTime, endTime):
 		# take a snapshot of the timers relevant to the span of the grid and index them by service
-		# We scan the entire timerlist as pending timers and in progress timers are sorted differently
+		# the timer index only returns the timers overlapping the span (repeat timers are always included)
 		self.filteredTimerList = {}
-		for timer in self.session.nav.RecordTimer.timer_list:
-			# repeat timers represent all their future repetitions, so always include them
-			if (startTime <= timer.end or timer.repeated) and timer.begin < endTime:
-				serviceref = timer.service_ref.ref.toCompareString()
-				serviceref = "1" + serviceref[4:] if serviceref[:4] in config.recording.setstreamto1.value else serviceref  # converts 4097, 5001, 5002 to 1
-				srefl = self.filteredTimerList.get(serviceref)
-				if srefl is None:
-					self.filteredTimerList[serviceref] = srefl = [timer]
-				else:
-					srefl.append(timer)
+		for timer in self.session.nav.RecordTimer.timerIndex.lookupRange(startTime, endTime):
+			serviceref = timer.service_ref.ref.toCompareString()
+			serviceref = "1" + serviceref[4:] if serviceref[:4] in config.recording.setstreamto1.value else serviceref  # converts 4097, 5001, 5002 to 1
+			srefl = self.filteredTimerList.get(serviceref)
+			if srefl is None:
+				self.filteredTimerList[serviceref] = srefl = [timer]
+			else:
+				srefl.append(timer)
 
 	def getChannelNumber(self, service):
 		if service.ref and "0:0:0:0:0:0:0:0:0" not in service.ref.toString():
@@ -1,11 +1,13 @@
-from os import listdir, path
+from collections import OrderedDict
+from os import path, scandir, stat
 import re
+from time import time
 
 from enigma import RT_HALIGN_LEFT, eListboxPythonMultiContent, \
-	eServiceReference, eServiceCenter, gFont
+	eServiceReference, eServiceCenter, eTimer, gFont
 from Components.MenuList import MenuList
 from Components.Harddisk import harddiskmanager
-from Tools.Directories import SCOPE_CURRENT_SKIN, resolveFilename, fileExists, pathExists
+from Tools.Directories import MTIME_RESOLUTION, SCOPE_CURRENT_SKIN, resolveFilename, pathExists
 from Tools.LoadPixmap import LoadPixmap
 from skin import applySkinFactor, fonts, parameters
 
@@ -65,6 +67,59 @@ EXTENSIONS = {
 	}
 
 
+# Sorted directory and file names of the directories shown in the file lists.
+# A directory is only read again when its mtime changed. The type of the
+# entries comes from scandir() and needs no stat() of every entry on most
+# file systems, which makes a difference on network mounts.
+class DirectoryCache:
+	MaxDirectories = 20  # directories kept
+
+	def __init__(self):
+		self.directories = OrderedDict()  # directory -> (mtime, directories, files, linked directories)
+
+	# Returns the names of the directories and files in the directory and
+	# the names of the directories which are symbolic links.
+	def listDirectory(self, directory):
+		try:
+			mtime = stat(directory).st_mtime_ns
+		except OSError:
+			return [], [], set()
+		cached = self.directories.get(directory)
+		if cached and cached[0] == mtime:
+			self.directories.move_to_end(directory)
+			return cached[1:]
+		directories = []
+		files = []
+		links = set()
+		try:
+			with scandir(directory) as entries:
+				for entry in entries:
+					try:
+						isDir = entry.is_dir()
+					except OSError:
+						isDir = False
+					if isDir:
+						directories.append(entry.name)
+						if entry.is_symlink():
+							links.add(entry.name)
+					else:
+						files.append(entry.name)
+		except OSError as err:
+			print("[FileList] Error: Unable to list directory '%s'!" % directory, err)
+		directories.sort()
+		files.sort()
+		if time() - mtime / 1000000000.0 > MTIME_RESOLUTION:  # a listing of a directory changed this recently is not kept
+			self.directories[directory] = (mtime, directories, files, links)
+		else:
+			self.directories.pop(directory, None)
+		while len(self.directories) > self.MaxDirectories:
+			self.directories.popitem(last=False)
+		return directories, files, links
+
+
+directoryCache = DirectoryCache()
+
+
 def FileEntryComponent(name, absolute=None, isDir=False):
 	res = [(absolute, isDir)]
 	x, y, w, h = parameters.get("FileListName", applySkinFactor(35, 1, 470, 20))
@@ -86,6 +141,9 @@ def FileEntryComponent(name, absolute=None, isDir=False):
 
 
 class FileList(MenuList):
+	PageSize = 100  # entries shown at once, the rest of a large directory is added from the main loop
+	ChunkSize = 500  # entries added per main loop callback
+
 	def __init__(self, directory, showDirectories=True, showFiles=True, showMountpoints=True, matchingPattern=None, useServiceRef=False, inhibitDirs=False, inhibitMounts=False, isTop=False, enableWrapAround=False, additionalExtensions=None):
 		MenuList.__init__(self, list, enableWrapAround, eListboxPythonMultiContent)
 		self.additional_extensions = additionalExtensions
@@ -104,6 +162,9 @@ class FileList(MenuList):
 			self.matchingPattern = None
 		self.inhibitDirs = inhibitDirs or []
 		self.inhibitMounts = inhibitMounts or []
+		self.pendingEntries = None  # (component, arguments of the entries not created yet)
+		self.pendingTimer = eTimer()
+		self.pendingTimer.callback.append(self.addPendingEntries)
 
 		self.refreshMountpoints()
 		self.changeDir(directory)
@@ -150,6 +211,7 @@ class FileList(MenuList):
 			return self.serviceHandler.info(currl[0][0]).getEvent(currl[0][0])
 
 	def getFileList(self):
+		self.addPendingEntries(complete=True)
 		return self.list
 
 	def inParentDirs(self, dir, parents):
@@ -159,8 +221,70 @@ class FileList(MenuList):
 				return True
 		return False
 
+	# Returns the subdirectories (with trailing slash) and the files of a
+	# directory. The symbolic links among the subdirectories are returned
+	# too, the other subdirectories are on the path of their parent.
+	def readDirectory(self, directory):
+		directories, files, links = directoryCache.listDirectory(directory)
+		return [directory + x + "/" for x in directories], files, set([directory + x + "/" for x in links])
+
+	# Removes the inhibited directories. Only subdirectories which are links
+	# need their real path looked up again, the others are on the mount of the
+	# parent unless they are mount points themselves.
+	def filterDirectories(self, directory, directories, links=None):
+		if not (self.inhibitMounts or self.inhibitDirs):
+			return directories
+		if links is None:
+			return [x for x in directories if not (self.inhibitMounts and self.getMountpoint(x) in self.inhibitMounts) and not self.inParentDirs(x, self.inhibitDirs)]
+		parent = path.join(path.realpath(directory), "")
+		parentMountpoint = self.getMountpoint(directory)
+		result = []
+		for x in directories:
+			if x in links:
+				realPath = path.join(path.realpath(x), "")
+				mountpoint = self.getMountpoint(x)
+			else:
+				realPath = parent + x[len(directory):]
+				mountpoint = realPath if realPath in self.mountpoints else parentMountpoint
+			if not (self.inhibitMounts and mountpoint in self.inhibitMounts) and not [p for p in self.inhibitDirs if realPath[:-1].startswith(p)]:
+				result.append(x)
+		return result
+
+	# Shows the entries, creating the list components of the first page (and
+	# up to the selected entry) right away and the others from the main loop.
+	def setEntries(self, component, entries, select=None):
+		self.pendingTimer.stop()
+		index = None
+		if select is not None:
+			for i, entry in enumerate(entries):
+				p = entry["absolute"]
+				if isinstance(p, eServiceReference):
+					p = p.getPath()
+				if p == select:
+					index = i
+		count = self.PageSize if index is None else index + self.PageSize
+		self.list = [component(**x) for x in entries[:count]]
+		self.pendingEntries = (component, entries[count:])
+		self.l.setList(self.list)
+		if select is not None:
+			self.moveToIndex(index or 0)
+		if self.pendingEntries[1]:
+			self.pendingTimer.start(0, True)
+
+	def addPendingEntries(self, complete=False):
+		if self.pendingEntries and self.pendingEntries[1]:
+			component, entries = self.pendingEntries
+			count = len(entries) if complete else self.ChunkSize
+			self.list.extend([component(**x) for x in entries[:count]])
+			self.pendingEntries = (component, entries[count:])
+			self.l.setList(self.list)
+			if self.pendingEntries[1]:
+				self.pendingTimer.start(0, True)
+			else:
+				self.pendingTimer.stop()
+
 	def changeDir(self, directory, select=None):
-		self.list = []
+		entries = []
 
 		# if we are just entering from the list of mount points:
 		if self.current_directory is None:
@@ -171,17 +295,15 @@ class FileList(MenuList):
 		self.current_directory = directory
 		directories = []
 		files = []
+		links = None
 
 		if directory is None and self.showMountpoints:  # present available mountpoints
 			for p in harddiskmanager.getMountedPartitions():
 				mountPath = path.join(p.mountpoint, "")
 				if mountPath not in self.inhibitMounts and not self.inParentDirs(mountPath, self.inhibitDirs):
-					self.list.append(FileEntryComponent(name=p.description, absolute=mountPath, isDir=True))
-			files = []
-			directories = []
+					entries.append({"name": p.description, "absolute": mountPath, "isDir": True})
 		elif directory is None:
-			files = []
-			directories = []
+			pass
 		elif self.useServiceRef:
 			# we should not use the "eServiceReference(string)" constructor, because it doesn't allow ":" in the directoryname
 			root = eServiceReference(2, 0, directory)
@@ -202,29 +324,17 @@ class FileList(MenuList):
 			directories.sort()
 			files.sort()
 		else:
-			if fileExists(directory):
-				try:
-					files = listdir(directory)
-				except:
-					files = []
-				files.sort()
-				tmpfiles = files[:]
-				for x in tmpfiles:
-					if path.isdir(directory + x):
-						directories.append(directory + x + "/")
-						files.remove(x)
+			directories, files, links = self.readDirectory(directory)
 
 		if directory is not None and self.showDirectories and not self.isTop:
 			if directory == self.current_mountpoint and self.showMountpoints:
-				self.list.append(FileEntryComponent(name="<" + _("List of storage devices") + ">", absolute=None, isDir=True))
+				entries.append({"name": "<" + _("List of storage devices") + ">", "absolute": None, "isDir": True})
 			elif (directory != "/") and not (self.inhibitMounts and self.getMountpoint(directory) in self.inhibitMounts):
-				self.list.append(FileEntryComponent(name="<" + _("Parent directory") + ">", absolute="/".join(directory.split("/")[:-2]) + "/", isDir=True))
+				entries.append({"name": "<" + _("Parent directory") + ">", "absolute": "/".join(directory.split("/")[:-2]) + "/", "isDir": True})
 
 		if self.showDirectories:
-			for x in directories:
-				if not (self.inhibitMounts and self.getMountpoint(x) in self.inhibitMounts) and not self.inParentDirs(x, self.inhibitDirs):
-					name = x.split("/")[-2]
-					self.list.append(FileEntryComponent(name=name, absolute=x, isDir=True))
+			for x in self.filterDirectories(directory, directories, links):
+				entries.append({"name": x.split("/")[-2], "absolute": x, "isDir": True})
 
 		if self.showFiles:
 			for x in files:
@@ -236,25 +346,12 @@ class FileList(MenuList):
 					name = x
 
 				if (self.matchingPattern is None) or self.matchingPattern.search(showPath):
-					self.list.append(FileEntryComponent(name=name, absolute=x, isDir=False))
-
-		if self.showMountpoints and len(self.list) == 0:
-			self.list.append(FileEntryComponent(name=_("nothing connected"), absolute=None, isDir=False))
+					entries.append({"name": name, "absolute": x, "isDir": False})
 
-		self.l.setList(self.list)
-
-		if select is not None:
-			i = 0
-			self.moveToIndex(0)
-			for x in self.list:
-				p = x[0][0]
+		if self.showMountpoints and len(entries) == 0:
+			entries.append({"name": _("nothing connected"), "absolute": None, "isDir": False})
 
-				if isinstance(p, eServiceReference):
-					p = p.getPath()
-
-				if p == select:
-					self.moveToIndex(i)
-				i += 1
+		self.setEntries(FileEntryComponent, entries, select)
 
 	def getCurrentDirectory(self):
 		return self.current_directory
@@ -290,6 +387,7 @@ class FileList(MenuList):
 
 	def execEnd(self):
 		harddiskmanager.on_partition_list_change.remove(self.partitionListChanged)
+		self.pendingTimer.stop()
 
 	def refresh(self):
 		self.changeDir(self.current_directory, self.getFilename())
@@ -384,7 +482,7 @@ class MultiFileSelectList(FileList):
 		return selectedFilesExist
 
 	def changeDir(self, directory, select=None):
-		self.list = []
+		entries = []
 
 		# if we are just entering from the list of mount points:
 		if self.current_directory is None:
@@ -395,17 +493,15 @@ class MultiFileSelectList(FileList):
 		self.current_directory = directory
 		directories = []
 		files = []
+		links = None
 
 		if directory is None and self.showMountpoints:  # present available mountpoints
 			for p in harddiskmanager.getMountedPartitions():
 				mountPath = path.join(p.mountpoint, "")
 				if mountPath not in self.inhibitMounts and not self.inParentDirs(mountPath, self.inhibitDirs):
-					self.list.append(MultiFileSelectEntryComponent(name=p.description, absolute=mountPath, isDir=True))
-			files = []
-			directories = []
+					entries.append({"name": p.description, "absolute": mountPath, "isDir": True})
 		elif directory is None:
-			files = []
-			directories = []
+			pass
 		elif self.useServiceRef:
 			root = eServiceReference.fromDirectory(directory)
 			if self.additional_extensions:
@@ -425,30 +521,19 @@ class MultiFileSelectList(FileList):
 			directories.sort()
 			files.sort()
 		else:
-			if fileExists(directory):
-				try:
-					files = listdir(directory)
-				except:
-					files = []
-				files.sort()
-				tmpfiles = files[:]
-				for x in tmpfiles:
-					if path.isdir(directory + x):
-						directories.append(directory + x + "/")
-						files.remove(x)
+			directories, files, links = self.readDirectory(directory)
 
 		if directory is not None and self.showDirectories and not self.isTop:
 			if directory == self.current_mountpoint and self.showMountpoints:
-				self.list.append(MultiFileSelectEntryComponent(name="<" + _("List of storage devices") + ">", absolute=None, isDir=True))
+				entries.append({"name": "<" + _("List of storage devices") + ">", "absolute": None, "isDir": True})
 			elif (directory != "/") and not (self.inhibitMounts and self.getMountpoint(directory) in self.inhibitMounts):
-				self.list.append(MultiFileSelectEntryComponent(name="<" + _("Parent directory") + ">", absolute="/".join(directory.split("/")[:-2]) + "/", isDir=True))
+				entries.append({"name": "<" + _("Parent directory") + ">", "absolute": "/".join(directory.split("/")[:-2]) + "/", "isDir": True})
 
+		selectedFiles = set(self.selectedFiles)
 		if self.showDirectories:
-			for x in directories:
-				if not (self.inhibitMounts and self.getMountpoint(x) in self.inhibitMounts) and not self.inParentDirs(x, self.inhibitDirs):
-					name = x.split("/")[-2]
-					alreadySelected = (x in self.selectedFiles) or (path.normpath(x) in self.selectedFiles)
-					self.list.append(MultiFileSelectEntryComponent(name=name, absolute=x, isDir=True, selected=alreadySelected))
+			for x in self.filterDirectories(directory, directories, links):
+				alreadySelected = (x in selectedFiles) or (path.normpath(x) in selectedFiles)
+				entries.append({"name": x.split("/")[-2], "absolute": x, "isDir": True, "selected": alreadySelected})
 
 		if self.showFiles:
 			for x in files:
@@ -459,25 +544,7 @@ class MultiFileSelectList(FileList):
 					showPath = directory + x
 					name = x
 				if (self.matchingPattern is None) or self.matchingPattern.search(showPath):
-					alreadySelected = False
-					for entry in self.selectedFiles:
-						if self.useServiceRef and path.basename(entry) == x:
-							alreadySelected = True
-						elif entry == showPath:
-							alreadySelected = True
-					self.list.append(MultiFileSelectEntryComponent(name=name, absolute=x, isDir=False, selected=alreadySelected))
+					alreadySelected = showPath in selectedFiles
+					entries.append({"name": name, "absolute": x, "isDir": False, "selected": alreadySelected})
 
-		self.l.setList(self.list)
-
-		if select is not None:
-			i = 0
-			self.moveToIndex(0)
-			for x in self.list:
-				p = x[0][0]
-
-				if isinstance(p, eServiceReference):
-					p = p.getPath()
-
-				if p == select:
-					self.moveToIndex(i)
-				i += 1
+		self.setEntries(MultiFileSelectEntryComponent, entries, select)
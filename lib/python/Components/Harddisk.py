@@ -1,10 +1,12 @@
 import errno
 from os import listdir, major, path as ospath, rmdir, sep as ossep, stat, statvfs, system as ossystem, unlink  # minor
 from fcntl import ioctl
+from select import poll, POLLPRI
 from time import sleep, time
 
 from enigma import eTimer
 from Components.SystemInfo import SystemInfo, BoxInfo
+from Components.SystemMetrics import systemMetrics
 import Components.Task
 from Tools.CList import CList
 
@@ -80,27 +82,107 @@ def runCommand(command):
 	return exitStatus
 
 
+# Shared parsed copy of /proc/mounts. The table is only parsed again after the
+# kernel signalled a change of the mount namespace (POLLPRI on /proc/self/mounts)
+# or a hotplug event invalidated it. The file system behind a fuseblk mount is
+# looked up with blkid once per mounted device.
+#
+class MountTable:
+	def __init__(self):
+		self.mounts = None
+		self.fileSystems = {}  # Device -> file system behind its fuseblk mount.
+		self.watchFile = None
+		self.poller = None
+		self.notifier = None
+		self.reads = 0
+		self.parses = 0
+		self.blkidRuns = 0
+		self.changes = 0
+		self.invalidations = 0
+
+	def watch(self):
+		if self.watchFile is None:
+			try:
+				self.watchFile = open("/proc/self/mounts", "r")
+			except (IOError, OSError) as err:
+				print("[Harddisk] Error: Unable to watch '/proc/self/mounts' for changes!", err)
+				return False
+			self.poller = poll()
+			self.poller.register(self.watchFile.fileno(), POLLPRI)
+			try:
+				from enigma import eSocketNotifier
+				self.notifier = eSocketNotifier(self.watchFile.fileno(), POLLPRI)
+				self.notifier.callback.append(self.kernelChanged)
+			except ImportError:  # No main loop, changes are only checked when the table is used.
+				pass
+		return True
+
+	def kernelChanged(self, what=None):
+		self.changes += 1
+		self.mounts = None
+
+	# A (u)mount done earlier in the same main loop callback has not been
+	# dispatched to kernelChanged() yet, so the pending event is checked here too.
+	#
+	def getMounts(self):
+		self.reads += 1
+		if not self.watch():
+			self.mounts = None  # Without change notification the table must always be read again.
+		elif self.poller.poll(0):
+			self.kernelChanged()
+		if self.mounts is None:
+			self.mounts = self.parse()
+		return self.mounts
+
+	def parse(self):
+		try:
+			with open("/proc/mounts", "r") as fd:
+				lines = fd.readlines()
+		except (IOError, OSError) as err:
+			print("[Harddisk][getProcMounts] Error: Failed to open '/proc/mounts':", err)
+			return None
+		self.parses += 1
+		result = [line.strip().split(" ") for line in lines]
+		fileSystems = {}
+		for item in result:
+			item[1] = item[1].replace("\\040", " ")  # Spaces are encoded as \040 in mounts.
+			# Also, map any fuseblk fstype to the real file-system behind it...
+			# Use blkid to get the info we need....
+			#
+			if item[2] == "fuseblk":
+				fileSystem = self.fileSystems.get(item[0]) or self.blkid(item[0])
+				if fileSystem:
+					fileSystems[item[0]] = item[2] = fileSystem
+		self.fileSystems = fileSystems  # Forget devices which are no longer mounted, they may be formatted meanwhile.
+		# print("[Harddisk][getProcMounts] ProcMounts", result)
+		return result
+
+	def blkid(self, device):
+		import subprocess
+		self.blkidRuns += 1
+		res = subprocess.run(["blkid", "-sTYPE", "-ovalue", device], capture_output=True)
+		if res.returncode == 0:
+			# print("[Harddisk][getProcMounts] fuseblk", res.stdout)
+			return res.stdout.strip().decode()
+		return None
+
+	def invalidate(self, device=None):
+		self.invalidations += 1
+		self.mounts = None
+		if device:
+			for key in [key for key in self.fileSystems if key.startswith(device)]:
+				del self.fileSystems[key]
+
+	def getStats(self):
+		return {"mounts": len(self.mounts or []), "reads": self.reads, "parses": self.parses, "blkidRuns": self.blkidRuns, "changes": self.changes, "invalidations": self.invalidations, "watched": self.watchFile is not None}
+
+
+mountTable = MountTable()
+
+
 def getProcMounts():
-	try:
-		with open("/proc/mounts", "r") as fd:
-			lines = fd.readlines()
-	except (IOError, OSError) as err:
-		print("[Harddisk][getProcMounts] Error: Failed to open '/proc/mounts':", err)
-		return []
-	result = [line.strip().split(" ") for line in lines]
-	for item in result:
-		item[1] = item[1].replace("\\040", " ")  # Spaces are encoded as \040 in mounts.
-		# Also, map any fuseblk fstype to the real file-system behind it...
-		# Use blkid to get the info we need....
-		#
-		if item[2] == 'fuseblk':
-			import subprocess
-			res = subprocess.run(['blkid', '-sTYPE', '-ovalue', item[0]], capture_output=True)
-			if res.returncode == 0:
-				# print("[Harddisk][getProcMounts] fuseblk", res.stdout)
-				item[2] = res.stdout.strip().decode()
-	# print("[Harddisk][getProcMounts] ProcMounts", result)
-	return result
+	mounts = mountTable.getMounts()
+	return [item[:] for item in mounts] if mounts else []  # Callers may change their copy.
 
 
 def findMountPoint(path):
@@ -470,14 +552,12 @@ class Harddisk:
 	# discard sectors sectors       number of sectors discarded
 	# discard ticks   milliseconds  total wait time for discard requests
 	#
-	def readStats(self):
-		filename = ospath.join("/sys/block", self.device, "stat")
-		data = readFile(filename)
+	def readStats(self):  # The I/O counters of all disks are read once by the shared sampler.
+		data = systemMetrics.sample("diskstats").get(self.device)
 		if data is None:
-			print("[Harddisk] Error: Failed to read '%s' stats!" % filename)
+			print("[Harddisk] Error: Failed to read '%s' stats!" % self.device)
 			return -1, -1
-		data = data.split()
-		return int(data[0]), int(data[4])  # Return read I/O's, write I/O's.
+		return data  # Return read I/O's, write I/O's.
 
 	def startIdle(self):
 		# Disable HDD standby timer.
@@ -799,6 +879,7 @@ class HarddiskManager:
 		HDDin = error = removable = isCdrom = blacklisted = False
 		mediumFound = True
 		hddDev, part = self.splitDeviceName(device)
+		mountTable.invalidate(ospath.join("/dev", hddDev))
 		devicePath = "/sys/block/%s" % hddDev
 		try:
 			physicalDevice = ospath.realpath(ospath.join("/sys/block", hddDev, "device"))
@@ -850,6 +931,7 @@ class HarddiskManager:
 	def removeHotplugPartition(self, device):
 		print("[Harddisk] Evaluating hotplug disconnected device...")
 		hddDev, part = self.splitDeviceName(device)  # Separate the device from the partition.
+		mountTable.invalidate(ospath.join("/dev", hddDev))
 		for partition in self.partitions:
 			if partition.device is None:
 				continue
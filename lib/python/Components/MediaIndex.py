@@ -0,0 +1,149 @@
+from json import dump, load
+from os import listdir, makedirs, rename, scandir, stat
+from os.path import join, normpath, realpath
+from threading import Lock
+from time import time
+
+from Tools.Directories import MTIME_RESOLUTION, SCOPE_CONFIG, resolveFilename
+
+
+# Returns the UUID of the file system mounted on the mount point, None for
+# file systems without one (network shares, tmpfs).
+def getFileSystemUUID(mountpoint):
+	from Components.Harddisk import getProcMounts
+	mountpoint = normpath(mountpoint)
+	devices = [item[0] for item in getProcMounts() if len(item) > 1 and item[1] == mountpoint and item[0].startswith("/dev/")]
+	if devices:
+		device = realpath(devices[-1])
+		try:
+			for uuid in listdir("/dev/disk/by-uuid"):
+				if realpath(join("/dev/disk/by-uuid", uuid)) == device:
+					return uuid
+		except OSError:
+			pass
+	return None
+
+
+# Files of the scanned directories of a file system with their size, mtime
+# and mime type. A directory is only listed again when its mtime changed, the
+# other directories are taken from the index, so a rescan of an unchanged
+# disk only needs one stat() per directory. The index of a file system with
+# a UUID is saved and used again when the disk is connected next time.
+class MediaIndex:
+	Version = 1
+
+	def __init__(self, uuid=None):
+		self.uuid = uuid
+		self.filename = resolveFilename(SCOPE_CONFIG, "mediaindex/%s.json" % uuid) if uuid else None
+		self.directories = {}  # directory relative to the mount point -> [mtime, [subdirectories], {name: [size, mtime, mime type]}]
+		self.types = None  # mime type version the index was built with
+		self.lock = Lock()
+		self.loaded = False
+
+	def load(self):
+		self.loaded = True
+		if self.filename:
+			try:
+				with open(self.filename, "r") as fd:
+					data = load(fd)
+				if data.get("version") == self.Version:
+					self.directories = data.get("directories", {})
+					self.types = data.get("types")
+			except (IOError, OSError, ValueError) as err:
+				if not isinstance(err, FileNotFoundError):
+					print("[MediaIndex] Error: Unable to load '%s'!" % self.filename, err)
+
+	def save(self):
+		if self.filename:
+			try:
+				makedirs(resolveFilename(SCOPE_CONFIG, "mediaindex"), exist_ok=True)
+				with open(self.filename + ".tmp", "w") as fd:
+					dump({"version": self.Version, "types": self.types, "directories": self.directories}, fd)
+				rename(self.filename + ".tmp", self.filename)
+			except (IOError, OSError) as err:
+				print("[MediaIndex] Error: Unable to save '%s'!" % self.filename, err)
+
+	# Returns [(path, mime type)] of the files in the scan paths, walking the
+	# directories of the scan paths with subdirectories. The progress object,
+	# if given, gets the number of directories done in pos and the expected
+	# number in end.
+	def update(self, mountpoint, scanPaths, progress=None):
+		from Components.Scanner import getScanType, getTypesVersion
+		with self.lock:
+			if not self.loaded:
+				self.load()
+			types = getTypesVersion()
+			if types != self.types:
+				self.types = types
+				for entry in self.directories.values():
+					for name, info in entry[2].items():
+						info[2] = getScanType(name)
+			changed = False
+			visited = {}
+			result = []
+			if progress:
+				progress.end = max(len(self.directories), 1)
+			for scanPath in scanPaths:
+				pending = [normpath(scanPath.path) if scanPath.path else ""]
+				while pending:
+					directory = pending.pop(0)
+					entry = visited.get(directory) or self.readDirectory(mountpoint, directory)
+					if entry is None:
+						continue
+					if entry is not self.directories.get(directory):
+						changed = True
+					visited[directory] = entry
+					result.extend([(join(mountpoint, directory, name), info[2]) for name, info in sorted(entry[2].items())])
+					if scanPath.with_subdirs:
+						pending.extend([join(directory, x) if directory else x for x in entry[1]])
+					if progress:
+						progress.pos = len(visited)
+						progress.end = max(progress.end, len(visited))
+			if changed or len(visited) != len(self.directories):
+				self.directories = visited
+				self.save()
+			return result
+
+	def readDirectory(self, mountpoint, directory):
+		path = join(mountpoint, directory)
+		try:
+			mtime = stat(path).st_mtime_ns
+		except OSError:
+			return None
+		entry = self.directories.get(directory)
+		if entry and entry[0] == mtime:
+			return entry
+		subdirectories = []
+		files = {}
+		try:
+			with scandir(path) as entries:
+				for item in entries:
+					try:
+						if item.is_dir():
+							if not item.is_symlink():  # Like os.walk(), links to directories are not followed.
+								subdirectories.append(item.name)
+						else:
+							info = item.stat()
+							files[item.name] = [info.st_size, info.st_mtime_ns, None]
+					except OSError:
+						pass
+		except OSError as err:
+			print("[MediaIndex] Error: Unable to list '%s'!" % path, err)
+			return None
+		from Components.Scanner import getScanType
+		for name, info in files.items():
+			info[2] = getScanType(name)
+		subdirectories.sort()
+		return [mtime if time() - mtime / 1000000000.0 > MTIME_RESOLUTION else None, subdirectories, files]  # a directory changed this recently is listed again next time
+
+
+mediaIndexes = {}  # file system UUID or mount point -> MediaIndex
+
+
+def getMediaIndex(mountpoint):
+	uuid = getFileSystemUUID(mountpoint)
+	key = uuid or normpath(mountpoint)
+	index = mediaIndexes.get(key)
+	if index is None:
+		mediaIndexes[key] = index = MediaIndex(uuid)
+	return index
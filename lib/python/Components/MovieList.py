@@ -1,5 +1,4 @@
 from os import path, stat
-import struct
 import random
 from time import localtime, strftime
 from chardet import detect
@@ -8,6 +7,7 @@ from enigma import eListboxPythonMultiContent, eListbox, gFont, iServiceInformat
 
 from Components.config import config
 from Components.GUIComponent import GUIComponent
+from Components.MovieMetadataCache import CachedMovieInfo, cutsParser, movieMetadataCache
 from Components.MultiContent import MultiContentEntryText, MultiContentEntryPixmapAlphaBlend, MultiContentEntryProgress
 from Components.Renderer.Picon import getPiconName
 from Screens.LocationBox import defaultInhibitDirs
@@ -62,9 +62,6 @@ def expandCollections(items):
 	return expanded
 
 
-cutsParser = struct.Struct('>QI')  # big-endian, 64-bit PTS and 32-bit type
-
-
 class MovieListData:
 	def __init__(self):
 		self.dirty = True
@@ -105,37 +102,36 @@ justStubInfo = StubInfo()
 
 
 def lastPlayPosFromCache(ref):
-	from Screens.InfoBarGenerics import resumePointCache
-	return resumePointCache.get(ref.toString(), None)
+	from Components.ResumePoints import resumePoints
+	return resumePoints.get(ref.toString(), None)
 
 
 def moviePlayState(cutsFileName, ref, length):
 	"""Returns None, 0..100 for percentage"""
-	try:
-		# read the cuts file first
-		f = open(cutsFileName, 'rb')
-		lastPosition = None
-		while True:
-			data = f.read(cutsParser.size)
-			if len(data) < cutsParser.size:
-				break
-			cut, cutType = cutsParser.unpack(data)
-			if cutType == 3:  # undocumented, but 3 appears to be the stop
-				lastPosition = cut
-		f.close()
-		# See what we have in RAM (it might help)
-		last = lastPlayPosFromCache(ref)
-		if last:
-			# Get the cut point from the cache if not in the file
-			lastPosition = last[1]
-			# Get the length from the cache
+	# The resume point has the last position and the length, the cuts file is
+	# only needed without it.
+	last = lastPlayPosFromCache(ref)
+	if last:
+		lastPosition = last[1]
+		if last[2]:
 			length = last[2]
+		elif length and (length > 0):
+			length = length * 90000
 		else:
-			if length and (length > 0):
-				length = length * 90000
-			else:
-				if lastPosition:
-					return 50
+			return 50 if lastPosition else 0
+		if not lastPosition:
+			return 0
+		if lastPosition >= length:
+			return 100
+		return (100 * lastPosition) // length
+	try:
+		# read the cuts file, it is only read again when it changed
+		lastPosition = movieMetadataCache.getLastPosition(cutsFileName)
+		if length and (length > 0):
+			length = length * 90000
+		else:
+			if lastPosition:
+				return 50
 		if lastPosition is None:
 			# Unseen movie
 			return 0
@@ -143,18 +139,6 @@ def moviePlayState(cutsFileName, ref, length):
 			return 100
 		return (100 * lastPosition) // length
 	except:
-		last = lastPlayPosFromCache(ref)
-		if last:
-			lastPosition = last[1]
-			if not length or (length < 0):
-				length = last[2]
-			if length:
-				if lastPosition >= length:
-					return 100
-				return (100 * lastPosition) // length
-			else:
-				if lastPosition:
-					return 50
 		return 0
 
 
@@ -208,6 +192,7 @@ class MovieList(GUIComponent):
 	TRASHSORT_SHOWDELETE = 14
 	UsingTrashSort = False
 	InTrashFolder = False
+	StaleRecordingsPerTick = 20  # changed recordings read again per timer tick
 
 	def __init__(self, root, sort_type=None, descr_state=None, allowCollections=False):
 		GUIComponent.__init__(self)
@@ -238,6 +223,9 @@ class MovieList(GUIComponent):
 		if config.usage.time.wide.value:
 			self.dateWidth = int(self.dateWidth * 1.15)
 		self.reloadDelayTimer = None
+		self.staleRecordings = []  # (service reference, cached info) of the recordings changed since they were cached
+		self.staleTimer = eTimer()
+		self.staleTimer.callback.append(self.refreshStaleRecordings)
 		self.l = eListboxPythonMultiContent()  # noqa: E741
 		self.tags = set()
 		self.markList = []
@@ -299,8 +287,8 @@ class MovieList(GUIComponent):
 	playInForeground = property(get_playInForeground, set_playInForeground)
 
 	def updatePlayPosCache(self):
-		from Screens.InfoBarGenerics import updateresumePointCache
-		updateresumePointCache()
+		from Components.ResumePoints import resumePoints
+		resumePoints.reload()
 
 	def updateRecordings(self, timer=None):
 		if timer is not None:
@@ -681,6 +669,40 @@ class MovieList(GUIComponent):
 				return index
 		return None
 
+	# Returns the service information of a list entry. Recordings are answered
+	# from the metadata cache, recordings changed since they were cached are
+	# shown with the cached data and read again by refreshStaleRecordings().
+	def getMovieInfo(self, serviceHandler, serviceref):
+		if serviceref.flags & eServiceReference.mustDescent:
+			return serviceHandler.info(serviceref) or justStubInfo
+		record, valid = movieMetadataCache.getRecord(serviceref)
+		if record is None:
+			info = serviceHandler.info(serviceref)
+			record = movieMetadataCache.updateRecord(serviceref, info or justStubInfo, info is None)
+			cachedInfo = CachedMovieInfo(serviceHandler, serviceref, record, justStubInfo)
+			cachedInfo.info = info or justStubInfo
+			return cachedInfo
+		cachedInfo = CachedMovieInfo(serviceHandler, serviceref, record, justStubInfo)
+		if not valid:
+			self.staleRecordings.append((serviceref, cachedInfo))
+			self.staleTimer.start(0, True)
+		return cachedInfo
+
+	def refreshStaleRecordings(self):
+		serviceHandler = eServiceCenter.getInstance()
+		refreshed = set()
+		for serviceref, cachedInfo in self.staleRecordings[:self.StaleRecordingsPerTick]:
+			info = serviceHandler.info(serviceref)
+			cachedInfo.info = info or justStubInfo
+			movieMetadataCache.updateRecord(serviceref, cachedInfo.info, info is None, cachedInfo.record)
+			refreshed.add(id(cachedInfo))
+		del self.staleRecordings[:self.StaleRecordingsPerTick]
+		for index, item in enumerate(self.list):
+			if id(item[1]) in refreshed:
+				self.invalidateItem(index)
+		if self.staleRecordings:
+			self.staleTimer.start(0, True)
+
 	def __len__(self):
 		return len(self.list)
 
@@ -695,6 +717,8 @@ class MovieList(GUIComponent):
 		# nice list
 		del self.list[:]
 		del self.markList[:]
+		del self.staleRecordings[:]
+		self.staleTimer.stop()
 		serviceHandler = eServiceCenter.getInstance()
 		numberOfDirs = 0
 		collectionMode = config.movielist.enable_collections.value
@@ -744,17 +768,18 @@ class MovieList(GUIComponent):
 			elif (config.usage.trashsort_deltime.value == "show delete time"):
 				MovieList.UsingTrashSort = MovieList.TRASHSORT_SHOWDELETE
 
+		names = set()  # recordings in the directory
 		while True:
 			serviceref = reflist.getNext()
 			if not serviceref.valid():
 				break
+			if not serviceref.flags & eServiceReference.mustDescent:
+				names.add(path.basename(serviceref.getPath()))
 			if config.ParentalControl.servicepinactive.value and config.ParentalControl.storeservicepin.value != "never":
 				from Components.ParentalControl import parentalControl
 				if not parentalControl.sessionPinCached and parentalControl.isProtected(serviceref):
 					continue
-			info = serviceHandler.info(serviceref)
-			if info is None:
-				info = justStubInfo
+			info = self.getMovieInfo(serviceHandler, serviceref)
 			begin = info.getInfo(serviceref, iServiceInformation.sTimeCreate)
 			begin2 = 0
 			name = info.getName(serviceref)
@@ -815,6 +840,7 @@ class MovieList(GUIComponent):
 				self.list.append((serviceref, info, begin, data, begin2))
 			else:
 				self.list.append((serviceref, info, begin, data))
+		movieMetadataCache.prune(rootPath, names)
 
 		if not collectionName and collectionMode and self.allowCollections:
 			# not displaying the contents of a collection, group similar named
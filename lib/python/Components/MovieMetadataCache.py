@@ -0,0 +1,281 @@
+from collections import OrderedDict
+from hashlib import md5
+from json import dump, load
+from os import listdir, makedirs, remove, rename, stat, utime
+from os.path import basename, dirname, isdir, join, normpath
+from struct import Struct
+from time import time
+
+from enigma import eTimer, iServiceInformation
+
+from Tools.Directories import SCOPE_CONFIG, resolveFilename
+
+cutsParser = Struct(">QI")  # big-endian, 64-bit PTS and 32-bit type
+
+
+# Answers the questions the movie list asks about a recording from the
+# metadata cache. The service information is only created (which reads the
+# meta data of the recording) when something else is asked.
+class CachedMovieInfo:
+	def __init__(self, serviceHandler, serviceref, record, stubInfo):
+		self.serviceHandler = serviceHandler
+		self.serviceref = serviceref
+		self.record = record
+		self.stubInfo = stubInfo
+		self.info = None
+
+	def getServiceInfo(self):
+		if self.info is None:
+			self.info = None if self.record["stub"] else self.serviceHandler.info(self.serviceref)
+			if self.info is None:
+				self.info = self.stubInfo
+		return self.info
+
+	def __getattr__(self, name):
+		return getattr(self.getServiceInfo(), name)
+
+	def getName(self, serviceref):
+		return self.record["name"]
+
+	def getLength(self, serviceref):
+		if self.record["length"] is None:
+			self.record["length"] = self.getServiceInfo().getLength(serviceref)
+			movieMetadataCache.changed(dirname(serviceref.getPath()))
+		return self.record["length"]
+
+	def getInfo(self, serviceref, w):
+		if w == iServiceInformation.sTimeCreate:
+			return self.record["begin"]
+		if w == iServiceInformation.sFileSize and self.record["stub"]:
+			return self.record["size"]
+		return self.getServiceInfo().getInfo(serviceref, w)
+
+	def getInfoObject(self, serviceref, w):
+		if w == iServiceInformation.sFileSize:
+			return self.record["size"]
+		return self.getServiceInfo().getInfoObject(serviceref, w)
+
+	def getInfoString(self, serviceref, w):
+		if w == iServiceInformation.sTags:
+			return self.record["tags"]
+		return self.getServiceInfo().getInfoString(serviceref, w)
+
+
+# Name, tags, begin time, length and size of the recordings and the last play
+# position from their cuts files, per directory. An entry is valid while the
+# mtime and size of the recording and the mtime of its meta file are
+# unchanged, the play position while the mtime of the cuts file is. So opening
+# a directory again only needs stat() calls instead of reading the meta, cuts
+# and length (.ap) files of every recording. The directories are saved a few
+# seconds after they changed and loaded again after a restart. The saved
+# files of directories which no longer exist are removed and only the
+# MaxFiles most recently used ones are kept.
+class MovieMetadataCache:
+	MaxDirectories = 10  # directories kept in memory
+	SaveDelay = 5000  # msec after the last change before the changed directories are saved
+	MaxFiles = 100  # saved directories
+	CleanUpInterval = 24 * 3600  # seconds between the clean ups of the saved directories
+
+	def __init__(self):
+		self.directories = OrderedDict()  # directory -> {"files": {name: record}, "cuts": {name: [mtime, last position]}}
+		self.changedDirectories = set()
+		self.index = None  # cache file name -> directory of the saved directories
+		self.indexChanged = False
+		self.cleanUpTime = 0
+		self.saveTimer = eTimer()
+		self.saveTimer.callback.append(self.save)
+
+	def getFilename(self, directory):
+		return resolveFilename(SCOPE_CONFIG, "moviecache/%s.json" % md5(directory.encode("UTF-8", "surrogateescape")).hexdigest())
+
+	def getIndex(self):
+		if self.index is None:
+			self.index = {}
+			try:
+				with open(resolveFilename(SCOPE_CONFIG, "moviecache/index.json"), "r") as fd:
+					self.index = load(fd)
+			except (IOError, OSError, ValueError):
+				pass
+		return self.index
+
+	def getDirectory(self, directory):
+		directory = normpath(directory)
+		cache = self.directories.get(directory)
+		if cache is None:
+			cache = {"files": {}, "cuts": {}}
+			filename = self.getFilename(directory)
+			try:
+				with open(filename, "r") as fd:
+					data = load(fd)
+				if data.get("directory") == directory:
+					cache["files"] = data.get("files", {})
+					cache["cuts"] = data.get("cuts", {})
+					utime(filename)  # The mtime is the last use for the clean up.
+			except (IOError, OSError, ValueError):
+				pass
+			self.directories[directory] = cache
+			while len(self.directories) > self.MaxDirectories:
+				oldest = next(iter(self.directories))
+				if oldest in self.changedDirectories:
+					self.saveDirectory(oldest)
+				del self.directories[oldest]
+		else:
+			self.directories.move_to_end(directory)
+		return cache
+
+	def getKey(self, filename):
+		info = stat(filename)
+		try:
+			metaTime = stat(filename + ".meta").st_mtime_ns
+		except OSError:
+			metaTime = None
+		return [info.st_mtime_ns, info.st_size, metaTime]
+
+	# Returns the cached record of the recording and whether it is still
+	# valid, or None when the recording is not in the cache.
+	def getRecord(self, serviceref):
+		filename = serviceref.getPath()
+		record = self.getDirectory(dirname(filename))["files"].get(basename(filename))
+		if record is None:
+			return None, False
+		try:
+			valid = record["key"] == self.getKey(filename)
+		except OSError:
+			valid = False
+		return record, valid
+
+	# Reads the data of the recording from its service information, updating
+	# the existing record in place so the users of the record see the new data.
+	def updateRecord(self, serviceref, info, isStub, record=None):
+		filename = serviceref.getPath()
+		try:
+			key = self.getKey(filename)
+		except OSError:
+			key = None
+		data = {
+			"key": key,
+			"name": info.getName(serviceref),
+			"tags": info.getInfoString(serviceref, iServiceInformation.sTags),
+			"begin": info.getInfo(serviceref, iServiceInformation.sTimeCreate),
+			"length": None,
+			"size": key[1] if isStub and key else info.getInfoObject(serviceref, iServiceInformation.sFileSize),
+			"stub": isStub
+		}
+		if record is None:
+			record = data
+		else:
+			record.update(data)
+		self.getDirectory(dirname(filename))["files"][basename(filename)] = record
+		self.changed(dirname(filename))
+		return record
+
+	# Removes the recordings which are no longer in the directory.
+	def prune(self, directory, names):
+		files = self.getDirectory(directory)["files"]
+		removed = [name for name in files if name not in names]
+		for name in removed:
+			del files[name]
+		cuts = self.getDirectory(directory)["cuts"]
+		for name in [name for name in cuts if name[:-5] not in names]:
+			del cuts[name]
+		if removed:
+			self.changed(directory)
+
+	# Returns the last play position of a cuts file, raises OSError when there
+	# is no cuts file.
+	def getLastPosition(self, cutsFileName):
+		mtime = stat(cutsFileName).st_mtime_ns
+		cuts = self.getDirectory(dirname(cutsFileName))["cuts"]
+		name = basename(cutsFileName)
+		entry = cuts.get(name)
+		if entry is None or entry[0] != mtime:
+			lastPosition = None
+			with open(cutsFileName, "rb") as fd:
+				while True:
+					data = fd.read(cutsParser.size)
+					if len(data) < cutsParser.size:
+						break
+					cut, cutType = cutsParser.unpack(data)
+					if cutType == 3:  # undocumented, but 3 appears to be the stop
+						lastPosition = cut
+			cuts[name] = entry = [mtime, lastPosition]
+			self.changed(dirname(cutsFileName))
+		return entry[1]
+
+	def changed(self, directory):
+		self.changedDirectories.add(normpath(directory))
+		self.saveTimer.start(self.SaveDelay, True)
+
+	def saveDirectory(self, directory):
+		self.changedDirectories.discard(directory)
+		cache = self.directories.get(directory)
+		if cache is not None:
+			filename = self.getFilename(directory)
+			try:
+				makedirs(resolveFilename(SCOPE_CONFIG, "moviecache"), exist_ok=True)
+				with open(filename + ".tmp", "w") as fd:
+					dump({"directory": directory, "files": cache["files"], "cuts": cache["cuts"]}, fd)
+				rename(filename + ".tmp", filename)
+			except (IOError, OSError) as err:
+				print("[MovieMetadataCache] Error: Unable to save the cache of '%s'!" % directory, err)
+				return
+			index = self.getIndex()
+			if index.get(basename(filename)) != directory:
+				index[basename(filename)] = directory
+				self.indexChanged = True
+
+	def save(self):
+		for directory in list(self.changedDirectories):
+			self.saveDirectory(directory)
+		if time() - self.cleanUpTime > self.CleanUpInterval:
+			self.cleanUp()
+		if self.indexChanged:
+			self.saveIndex()
+
+	def saveIndex(self):
+		self.indexChanged = False
+		filename = resolveFilename(SCOPE_CONFIG, "moviecache/index.json")
+		try:
+			with open(filename + ".tmp", "w") as fd:
+				dump(self.getIndex(), fd)
+			rename(filename + ".tmp", filename)
+		except (IOError, OSError) as err:
+			print("[MovieMetadataCache] Error: Unable to save '%s'!" % filename, err)
+
+	# Removes the saved directories which no longer exist or are not known,
+	# and the least recently used ones above MaxFiles.
+	def cleanUp(self):
+		self.cleanUpTime = time()
+		path = resolveFilename(SCOPE_CONFIG, "moviecache")
+		index = self.getIndex()
+		try:
+			names = [x for x in listdir(path) if x.endswith(".json") and x != "index.json"]
+		except OSError:
+			return
+		used = []
+		removed = []
+		for name in names:
+			directory = index.get(name)
+			try:
+				if directory is None or not isdir(directory):
+					removed.append(name)
+				else:
+					used.append((stat(join(path, name)).st_mtime, name))
+			except OSError:
+				removed.append(name)
+		used.sort(reverse=True)
+		removed.extend([name for mtime, name in used[self.MaxFiles:]])
+		for name in removed:
+			try:
+				remove(join(path, name))
+			except OSError:
+				pass
+		kept = set(names) - set(removed)
+		for name in [x for x in index if x not in kept]:
+			del index[name]
+			self.indexChanged = True
+		if removed:
+			print("[MovieMetadataCache] Removed %d saved directories." % len(removed))
+
+
+movieMetadataCache = MovieMetadataCache()
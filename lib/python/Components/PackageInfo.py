@@ -1,5 +1,7 @@
 import xml.sax
 from Tools.Directories import crawlDirectory, resolveFilename, SCOPE_CONFIG, SCOPE_SKIN, copyfile, copytree
+from Components.BouquetIndex import bouquetIndex
+from Components.ServiceMetadataIndex import serviceMetadataIndex
 from Components.NimManager import nimmanager
 from Components.Ipkg import IpkgComponent
 from Components.config import config, configfile
@@ -304,6 +306,7 @@ class PackageInfoHandler:
 		if self.reloadFavourites:
 			self.reloadFavourites = False
 			eDVBDB.getInstance().reloadBouquets()
+			bouquetIndex.invalidate()
 
 		self.currentIndex += 1
 		attributes = self.installingAttributes
@@ -394,6 +397,7 @@ class PackageInfoHandler:
 		if path.isfile(directory + name):
 			db = eDVBDB.getInstance()
 			db.reloadServicelist()
+			serviceMetadataIndex.invalidate()
 			db.loadServicelist(directory + name)
 			db.saveServicelist()
 		self.installNext()
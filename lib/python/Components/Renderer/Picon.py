@@ -1,5 +1,7 @@
-from os import listdir, path as ospath
+from collections import OrderedDict
+from os import listdir, stat, path as ospath
 from re import sub
+from time import time
 
 from enigma import ePixmap, eServiceReference
 
@@ -10,11 +12,18 @@ from Tools.Directories import pathExists, SCOPE_CURRENT_SKIN, resolveFilename, s
 
 
 class PiconLocator:
+	CacheSize = 1000  # resolved service references kept, including the ones without a picon
+	IndexCheckInterval = 10  # seconds between directory mtime checks of a search path
+
 	def __init__(self, piconDirectories=["picon"]):
 		harddiskmanager.on_partition_list_change.append(self.__onPartitionChange)
 		self.piconDirectories = piconDirectories
 		self.activePiconPath = None
 		self.searchPaths = []
+		self.pathIndex = {}  # path -> [mtime, last mtime check, set of picon file names]
+		self.piconCache = OrderedDict()  # service reference -> picon file name or ""
+		self.cacheHits = 0
+		self.cacheMisses = 0
 		for mp in ("/usr/share/enigma2/", "/"):
 			self.__onMountpointAdded(mp)
 		for part in harddiskmanager.getMountedPartitions():
@@ -25,11 +34,12 @@ class PiconLocator:
 			try:
 				path = ospath.join(mountpoint, piconDirectory) + "/"
 				if ospath.isdir(path) and path not in self.searchPaths:
-					for fn in listdir(path):
-						if fn.endswith(".png") or fn.endswith(".svg"):
-							print("[PiconLocator] adding path:", path)
-							self.searchPaths.append(path)
-							break
+					if self.__indexPath(path):
+						print("[PiconLocator] adding path:", path)
+						self.searchPaths.append(path)
+						self.piconCache.clear()
+					else:
+						del self.pathIndex[path]
 			except:
 				pass
 
@@ -41,6 +51,10 @@ class PiconLocator:
 				print("[PiconLocator] removed path:", path)
 			except:
 				pass
+			self.pathIndex.pop(path, None)
+			if self.activePiconPath == path:
+				self.activePiconPath = None
+		self.piconCache.clear()
 
 	def __onPartitionChange(self, why, part):
 		if why == "add":
@@ -48,19 +62,50 @@ class PiconLocator:
 		elif why == "remove":
 			self.__onMountpointRemoved(part.mountpoint)
 
+	# Read the picon file names of a search path, returns True if there are any.
+	def __indexPath(self, path):
+		try:
+			mtime = stat(path).st_mtime
+			files = set([fn for fn in listdir(path) if fn.endswith(".png") or fn.endswith(".svg")])
+		except OSError:
+			mtime = None
+			files = set()
+		self.pathIndex[path] = [mtime, time(), files]
+		return len(files) > 0
+
+	# Return the picon file names of a search path, re-reading the directory
+	# if its mtime changed since it was indexed (checked every IndexCheckInterval).
+	def __getPathIndex(self, path):
+		index = self.pathIndex.get(path)
+		if index is None:
+			self.__indexPath(path)
+			self.piconCache.clear()
+		else:
+			now = time()
+			if now - index[1] >= self.IndexCheckInterval or now < index[1]:
+				index[1] = now
+				try:
+					mtime = stat(path).st_mtime
+				except OSError:
+					mtime = None
+				if mtime != index[0]:
+					self.__indexPath(path)
+					self.piconCache.clear()
+		return self.pathIndex[path][2]
+
 	def findPicon(self, service):
 		if self.activePiconPath is not None:
+			files = self.__getPathIndex(self.activePiconPath)
 			for ext in (".png", ".svg"):
-				pngname = self.activePiconPath + service + ext
-				if pathExists(pngname):
-					return pngname
+				if service + ext in files:
+					return self.activePiconPath + service + ext
 		else:
 			for path in self.searchPaths:
+				files = self.__getPathIndex(path)
 				for ext in (".png", ".svg"):
-					pngname = path + service + ext
-					if pathExists(pngname):
+					if service + ext in files:
 						self.activePiconPath = path
-						return pngname
+						return path + service + ext
 		return ""
 
 	def addSearchPath(self, value):
@@ -69,8 +114,25 @@ class PiconLocator:
 				value += "/"
 			if not value.startswith(("/media/net", "/media/autofs")) and value not in self.searchPaths:
 				self.searchPaths.append(value)
+				self.__indexPath(value)
+				self.piconCache.clear()
 
 	def getPiconName(self, serviceRef):
+		for path in self.searchPaths:
+			self.__getPathIndex(path)  # clears the cache if a directory changed
+		pngname = self.piconCache.get(serviceRef)
+		if pngname is not None:
+			self.piconCache.move_to_end(serviceRef)
+			self.cacheHits += 1
+			return pngname
+		self.cacheMisses += 1
+		pngname = self.__resolvePiconName(serviceRef)
+		self.piconCache[serviceRef] = pngname
+		if len(self.piconCache) > self.CacheSize:
+			self.piconCache.popitem(last=False)
+		return pngname
+
+	def __resolvePiconName(self, serviceRef):
 		# remove the path and name fields, and replace ":" by "_"
 		fields = GetWithAlternative(serviceRef).split(":", 10)[:10]
 		if not fields or len(fields) < 10:
@@ -137,7 +199,7 @@ class Picon(Renderer):
 		if self.instance:
 			if what[0] in (self.CHANGED_DEFAULT, self.CHANGED_ALL, self.CHANGED_SPECIFIC):
 				pngname = piconLocator.getPiconName(self.source.text)
-				if not pathExists(pngname):  # no picon for service found
+				if not pngname:  # no picon for service found
 					pngname = self.defaultpngname
 				if self.pngname != pngname:
 					if pngname:
@@ -0,0 +1,164 @@
+from collections import OrderedDict
+from os import fsync, remove, rename, stat
+from os.path import exists, ismount, realpath
+from pickle import load as pickle_load
+from time import time
+
+from enigma import eTimer
+
+from Components.Harddisk import findMountPoint
+from Tools.Directories import SCOPE_CONFIG, resolveFilename
+
+
+# Resume points of the played services, ordered from the least to the most
+# recently used. They are kept in an append-only journal, one
+# "S<TAB>lru<TAB>position<TAB>length<TAB>service" line per change and a
+# "D<TAB>service" line per removal. Changes are written in batches a few
+# seconds after playback stopped and the journal is rewritten when most of it
+# is obsolete. Resume points of files which no longer exist are dropped on the
+# rewrite, the oldest ones when there are more than MaxEntries.
+class ResumePoints:
+	MaxEntries = 1000  # resume points kept
+	SaveDelay = 10000  # msec after a change before the pending changes are written
+	CompactMinimum = 64  # obsolete lines tolerated before the journal is rewritten
+
+	def __init__(self):
+		self.filename = resolveFilename(SCOPE_CONFIG, "resumepoints.journal")
+		self.legacyFilename = resolveFilename(SCOPE_CONFIG, "resumepoints.pkl")
+		self.entries = OrderedDict()  # service reference string -> [lru, position, length]
+		self.pending = []  # journal lines not written yet
+		self.journalLines = 0
+		self.compact = False
+		self.mtime = None
+		self.saveTimer = eTimer()
+		self.saveTimer.callback.append(self.save)
+		self.load()
+
+	def load(self):
+		self.entries = OrderedDict()
+		self.journalLines = 0
+		try:
+			with open(self.filename, "r") as file:
+				for line in file:
+					self.journalLines += 1
+					fields = line.rstrip("\n").split("\t", 4)
+					try:
+						if fields[0] == "S" and len(fields) == 5:
+							key = fields[4]
+							self.entries.pop(key, None)
+							self.entries[key] = [int(fields[1]), int(fields[2]) if fields[2] else None, int(fields[3]) if fields[3] else None]
+						elif fields[0] == "D" and len(fields) > 1:
+							self.entries.pop(line.rstrip("\n")[2:], None)
+						else:
+							raise ValueError
+					except ValueError:
+						print("[ResumePoints] Ignoring broken journal line: %s" % line.rstrip("\n"))
+		except FileNotFoundError:
+			self.loadLegacy()
+		except (IOError, OSError) as err:
+			print("[ResumePoints] Error: Unable to load the resume points!", err)
+		self.mtime = self.getMtime()
+
+	def loadLegacy(self):
+		try:
+			with open(self.legacyFilename, "rb") as file:
+				entries = pickle_load(file)
+			for key, value in sorted(entries.items(), key=lambda item: item[1][0]):
+				self.entries[key] = list(value)
+			self.compact = True
+			self.saveTimer.start(0, True)
+		except Exception as err:
+			if not isinstance(err, FileNotFoundError):
+				print("[ResumePoints] Error: Unable to load the legacy resume points!", err)
+
+	def getMtime(self):
+		try:
+			return stat(self.filename).st_mtime_ns
+		except OSError:
+			return None
+
+	# Loads the journal again when it was changed by something else.
+	def reload(self):
+		if not self.pending and self.getMtime() != self.mtime:
+			self.load()
+
+	def journalLine(self, key, entry=None):
+		if entry is None:
+			return "D\t%s\n" % key
+		return "S\t%d\t%s\t%s\t%s\n" % (entry[0], "" if entry[1] is None else entry[1], "" if entry[2] is None else entry[2], key)
+
+	def get(self, key, default=None):
+		return self.entries.get(key, default)
+
+	def __contains__(self, key):
+		return key in self.entries
+
+	def __len__(self):
+		return len(self.entries)
+
+	# Returns the resume point and marks it as used, the new use time is written
+	# with the next change.
+	def use(self, key):
+		entry = self.entries.get(key)
+		if entry is not None:
+			entry[0] = int(time())
+			self.entries.move_to_end(key)
+		return entry
+
+	def set(self, key, position, length):
+		entry = [int(time()), position, length]
+		self.entries.pop(key, None)
+		self.entries[key] = entry
+		self.pending.append(self.journalLine(key, entry))
+		while len(self.entries) > self.MaxEntries:
+			oldest = next(iter(self.entries))
+			del self.entries[oldest]
+			self.pending.append(self.journalLine(oldest))
+		self.saveTimer.start(self.SaveDelay, True)
+
+	def remove(self, key):
+		if self.entries.pop(key, None) is not None:
+			self.pending.append(self.journalLine(key))
+			self.saveTimer.start(self.SaveDelay, True)
+
+	# Writes the pending changes, or the whole journal when most of it is
+	# obsolete.
+	def save(self):
+		self.saveTimer.stop()
+		if self.compact or self.journalLines + len(self.pending) > 2 * len(self.entries) + self.CompactMinimum:
+			self.compactJournal()
+		elif self.pending:
+			try:
+				with open(self.filename, "a") as file:
+					file.writelines(self.pending)
+				self.journalLines += len(self.pending)
+			except (IOError, OSError) as err:
+				print("[ResumePoints] Error: Unable to append to the resume points journal!", err)
+				self.compact = True
+			self.pending = []
+		self.mtime = self.getMtime()
+
+	def compactJournal(self):
+		for key in list(self.entries.keys()):
+			filepath = key.split(":")[-1]
+			if filepath.startswith("/"):
+				filepath = realpath(filepath)
+				if ismount(findMountPoint(filepath)) and not exists(filepath):
+					del self.entries[key]
+		lines = [self.journalLine(key, entry) for key, entry in self.entries.items()]
+		try:
+			with open(self.filename + ".writing", "w") as file:
+				file.writelines(lines)
+				file.flush()
+				fsync(file.fileno())
+			rename(self.filename + ".writing", self.filename)
+			self.journalLines = len(lines)
+			self.pending = []
+			self.compact = False
+			if exists(self.legacyFilename):
+				remove(self.legacyFilename)
+		except (IOError, OSError) as err:
+			print("[ResumePoints] Error: Unable to write the resume points journal!", err)
+
+
+resumePoints = ResumePoints()
@@ -1,7 +1,7 @@
 from Plugins.Plugin import PluginDescriptor
+from Components.MediaIndex import getMediaIndex
 from Components.PluginComponent import plugins
-
-import os
+from twisted.internet import threads
 # from mimetypes import guess_type, add_type
 
 # start: temporary workaround until we discover why mimetypes.add_type() is not updating the map
@@ -99,6 +99,20 @@ def getType(file):
 	return type
 
 
+# Mime type of a file found by scanDevice().
+def getScanType(file):
+	name = file.rsplit("/", 1)[-1]
+	if name.endswith(".wav") and name.startswith("track"):
+		return "audio/x-cda"
+	return getType(file)
+
+
+# Changes when types are added, the mime types in the media indexes are
+# determined again then.
+def getTypesVersion():
+	return len(types_map_dict)
+
+
 class Scanner:
 	def __init__(self, name, mimetypes=None, paths_to_scan=None, description="", openfnc=None):
 		if not mimetypes:
@@ -115,8 +129,13 @@ class Scanner:
 		return True
 
 	def handleFile(self, res, file):
-		if file.mimetype and file.mimetype.lower() in list(map(lambda x: x.lower(), self.mimetypes)) and self.checkFile(file):
-			res.setdefault(self, []).append(file)
+		self.handleFiles(res, [file])
+
+	def handleFiles(self, res, files):
+		mimetypes = set([x.lower() for x in self.mimetypes])
+		files = [file for file in files if file.mimetype and file.mimetype.lower() in mimetypes and self.checkFile(file)]
+		if files:
+			res.setdefault(self, []).extend(files)
 
 	def __repr__(self):
 		return "<Scanner " + self.name + ">"
@@ -170,18 +189,18 @@ def execute(option):
 	scanner.open(files, session)
 
 
-def scanDevice(mountpoint):
+def getScanners():
 	scanner = []
-
 	for p in plugins.getPlugins(PluginDescriptor.WHERE_FILESCAN):
 		scanDev = p()
 		if not isinstance(scanDev, list):
 			scanDev = [scanDev]
 		scanner += scanDev
 	print("[Scanner] ", scanner)
+	return scanner
 
-	res = {}
 
+def getPathsToScan(scanner):
 	# merge all to-be-scanned paths, with priority to
 	# with_subdirs.
 
@@ -196,49 +215,52 @@ def scanDevice(mountpoint):
 	for p in paths_to_scan.copy():
 		if p.with_subdirs is True and ScanPath(path=p.path) in paths_to_scan:
 			paths_to_scan.remove(ScanPath(path=p.path))
+	return sorted(paths_to_scan)
 
-	# now scan the paths
-	for p in paths_to_scan:
-		path = os.path.join(mountpoint, p.path)
-
-		for root, dirs, files in os.walk(path):
-			for f in files:
-				path = os.path.join(root, f)
-				if f.endswith(".wav") and f.startswith("track"):
-					sfile = ScanFile(path, "audio/x-cda")
-				else:
-					sfile = ScanFile(path)
-				for s in scanner:
-					s.handleFile(res, sfile)
-
-			# if we really don't want to scan subdirs, stop here.
-			if not p.with_subdirs:
-				del dirs[:]
 
+# Passes the files to every scanner at once.
+def dispatchFiles(scanner, files):
+	files = [ScanFile(path, mimetype, autodetect=False) for path, mimetype in files]
+	res = {}
+	for s in scanner:
+		s.handleFiles(res, files)
 	# res is a dict with scanner -> [ScanFiles]
 	return res
 
 
+# The files are taken from the media index of the file system, which only
+# lists the directories changed since the last scan.
+def scanDevice(mountpoint):
+	scanner = getScanners()
+	return dispatchFiles(scanner, getMediaIndex(mountpoint).update(mountpoint, getPathsToScan(scanner)))
+
+
+# Scans the device like scanDevice(), the directories are walked in a thread
+# and the callback gets the result in the main loop. It does not wait in the
+# job queue behind copies or backups, a failed scan is only logged.
+def scanDeviceInBackground(mountpoint, callback):
+	def scanned(files):
+		callback(dispatchFiles(scanner, files))
+
+	def failed(failure):
+		print("[Scanner] Scanning %s failed: %s" % (mountpoint, failure.getErrorMessage()))
+
+	scanner = getScanners()
+	deferred = threads.deferToThread(getMediaIndex(mountpoint).update, mountpoint, getPathsToScan(scanner))
+	deferred.addCallbacks(scanned, failed)
+	return deferred
+
+
 def openList(session, files):
 	if not isinstance(files, list):
 		files = [files]
 
-	scanner = []
-
-	for p in plugins.getPlugins(PluginDescriptor.WHERE_FILESCAN):
-		scanDev = p()
-		if not isinstance(scanDev, list):
-			scanner.append(scanDev)
-		else:
-			scanner += scanDev
-
-	print("[Scanner] ", scanner)
+	scanner = getScanners()
 
 	res = {}
 
-	for file in files:
-		for s in scanner:
-			s.handleFile(res, file)
+	for s in scanner:
+		s.handleFiles(res, files)
 
 	choices = [(r.description, r, res[r], session) for r in res]
 	Len = len(choices)
@@ -0,0 +1,123 @@
+from os import stat
+
+from enigma import eEnv, eServiceCenter, eServiceReference, eTimer, iServiceInformation
+
+from Components.BouquetIndex import bouquetIndex
+from Components.config import config
+from Tools.Transponder import ConvertToHumanReadable
+
+
+# Provider of every service and the stream/alternative content of the
+# bouquets, for the converters which show them on every service change.
+# The provider map is filled from the provider lists of the service list in
+# small steps from the main loop, a lookup before it is complete queries the
+# providers of the service's transponder like before and remembers the
+# result. The transponder data of services without frontend data (recordings,
+# streams) is converted once per service. Both are rebuilt when lamedb is
+# written or invalidate() is called after the service list was reloaded.
+class ServiceMetadataIndex:
+	ProvidersPerTick = 10  # provider lists read per timer tick while building
+	MaxTransponders = 200  # converted transponder data kept
+
+	def __init__(self):
+		self.directory = eEnv.resolve("${sysconfdir}/enigma2/")
+		self.providers = {}  # service compare string -> provider name
+		self.transponders = {}  # service reference string -> (transponder data, human readable transponder data)
+		self.pending = []  # provider directories not read yet
+		self.complete = False
+		self.key = None
+		self.generation = 0
+		self.buildTimer = eTimer()
+		self.buildTimer.callback.append(self.buildStep)
+
+	def invalidate(self):
+		self.generation += 1
+
+	def validate(self):
+		key = [self.generation]
+		for filename in ("lamedb", "lamedb5"):
+			try:
+				key.append(stat(self.directory + filename).st_mtime_ns)
+			except OSError:
+				key.append(None)
+		if key != self.key:
+			self.key = key
+			self.providers = {}
+			self.transponders = {}
+			self.complete = False
+			self.startBuild()
+
+	def startBuild(self):
+		from Screens.ChannelSelection import service_types_radio, service_types_tv
+		self.pending = []
+		serviceHandler = eServiceCenter.getInstance()
+		for typestr in (service_types_tv, service_types_radio):
+			providerlist = serviceHandler.list(eServiceReference("%s FROM PROVIDERS ORDER BY name" % typestr))
+			if providerlist is not None:
+				self.pending.extend([provider for provider in providerlist.getContent("R", False) if provider.flags & eServiceReference.isDirectory])
+		self.buildTimer.start(0, True)
+
+	def buildStep(self):
+		serviceHandler = eServiceCenter.getInstance()
+		for provider in self.pending[:self.ProvidersPerTick]:
+			self.addProvider(serviceHandler, provider)
+		del self.pending[:self.ProvidersPerTick]
+		if self.pending:
+			self.buildTimer.start(0, True)
+		else:
+			self.complete = True
+			print("[ServiceMetadataIndex] Providers of %d services indexed." % len(self.providers))
+
+	def addProvider(self, serviceHandler, provider):
+		info = serviceHandler.info(provider)
+		name = info and info.getName(provider) or "Unknown"
+		servicelist = serviceHandler.list(provider)
+		if servicelist is not None:
+			for service in servicelist.getContent("R", False):
+				self.providers[service.toCompareString()] = name
+
+	def lookupProvider(self, ref):
+		from Screens.ChannelSelection import service_types_radio, service_types_tv
+		typestr = ref.getData(0) in (2, 10) and service_types_radio or service_types_tv
+		pos = typestr.rfind(':')
+		rootstr = '%s (channelID == %08x%04x%04x) && %s FROM PROVIDERS ORDER BY name' % (typestr[:pos + 1], ref.getUnsignedData(4), ref.getUnsignedData(2), ref.getUnsignedData(3), typestr[pos + 1:])
+		serviceHandler = eServiceCenter.getInstance()
+		providerlist = serviceHandler.list(eServiceReference(rootstr))
+		if providerlist is not None:
+			for provider in providerlist.getContent("R", False):
+				if provider.flags & eServiceReference.isDirectory:
+					self.addProvider(serviceHandler, provider)
+
+	def getProviderName(self, ref):
+		self.validate()
+		key = ref.toCompareString()
+		if key not in self.providers and not self.complete:
+			self.lookupProvider(ref)
+			self.providers.setdefault(key, "")
+		return self.providers.get(key, "")
+
+	# Returns the raw and human readable transponder data of the service of
+	# the service information.
+	def getTransponderData(self, info):
+		self.validate()
+		refstr = info.getInfoString(iServiceInformation.sServiceref)
+		data = self.transponders.get(refstr)
+		if data is None:
+			if len(self.transponders) >= self.MaxTransponders:
+				self.transponders = {}
+			feraw = info.getInfoObject(iServiceInformation.sTransponderData)
+			self.transponders[refstr] = data = (feraw, ConvertToHumanReadable(feraw))
+		return data
+
+	# Returns whether the tv bouquets contain streams and alternatives.
+	def getAdditionalServices(self):
+		if config.usage.multibouquet.value:
+			bouquets = [bouquet for bouquet, offset in bouquetIndex.getBouquets(eServiceReference('1:7:1:0:0:0:0:0:0:0:FROM BOUQUET "bouquets.tv" ORDER BY bouquet'))]
+		else:
+			service_types_tv = '1:7:1:0:0:0:0:0:0:0:(type == 1) || (type == 17) || (type == 22) || (type == 25) || (type == 134) || (type == 195)'
+			bouquets = [eServiceReference('%s FROM BOUQUET "userbouquet.favourites.tv" ORDER BY bouquet' % service_types_tv)]
+		entries = [bouquetIndex.getEntry(bouquet) for bouquet in bouquets]
+		return bool([x for x in entries if x.streams]), bool([x for x in entries if x.alternatives])
+
+
+serviceMetadataIndex = ServiceMetadataIndex()
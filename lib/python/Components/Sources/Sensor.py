@@ -1,31 +1,38 @@
+from time import monotonic
+
 from Components.Sources.Source import Source
 from Components.Sensors import sensors
-
-from enigma import eTimer
+from Components.SystemMetrics import systemMetrics
 
 
+# The sensors are read by the shared system metrics sampler. The source is
+# changed at most every update_interval msec, but not more often than the
+# sampler reads the sensors.
 class SensorSource(Source):
 	def __init__(self, update_interval=500, sensorid=None):
 		self.update_interval = update_interval
 		self.sensorid = sensorid
+		self.updated = 0  # time of the last change
 		Source.__init__(self)
 
 		if sensorid is not None:
-			self.update_timer = eTimer()
-			self.update_timer.callback.append(self.updateValue)
-			self.update_timer.start(self.update_interval)
+			systemMetrics.subscribe("sensors", self.updateValue)
 
 	def getValue(self):
 		if self.sensorid is not None:
-			return sensors.getSensorValue(self.sensorid)
+			return systemMetrics.snapshot("sensors").get(self.sensorid)
 		return None
 
 	def getUnit(self):
 		return sensors.getSensorUnit(self.sensorid)
 
-	def updateValue(self):
-		self.changed((self.CHANGED_POLL,))
+	def updateValue(self, values=None):
+		now = monotonic()
+		# The samples are not exactly SampleInterval apart, half of it is allowed early.
+		if (now - self.updated) * 1000 >= self.update_interval - systemMetrics.SampleInterval / 2:
+			self.updated = now
+			self.changed((self.CHANGED_POLL,))
 
 	def destroy(self):
 		if self.sensorid is not None:
-			self.update_timer.callback.remove(self.updateValue)
+			systemMetrics.unsubscribe("sensors", self.updateValue)
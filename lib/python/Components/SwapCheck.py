@@ -1,12 +1,12 @@
 from os import path, statvfs
 
 from Components.Console import Console
+from Components.Harddisk import getProcMounts
 swapdevice = None
 
 
 def bigStorage(minFree):
-	mounts = open('/proc/mounts', 'rb').readlines()
-	mountpoints = [x.split(' ', 2)[1] for x in mounts]
+	mountpoints = [x[1] for x in getProcMounts()]
 	for candidate in mountpoints:
 		if not candidate.startswith('/media'):
 			continue
@@ -0,0 +1,193 @@
+from collections import deque
+from os import listdir
+from os.path import join
+from time import monotonic
+
+from Components.Converter.Poll import Poll
+
+
+def readLines(filename):
+	try:
+		with open(filename, "r") as fd:
+			return fd.readlines()
+	except (IOError, OSError):
+		return []
+
+
+# One sampler for the /proc and /sys values shown by the skins. Every tick
+# reads each source with subscribers once, keeps a short history of the
+# samples and passes the snapshot of the source to its subscribers. Sources
+# read on demand through sample() are only read again when the last sample
+# is older than half a tick, so all users share the same values and rates.
+class SystemMetrics(Poll):
+	SampleInterval = 1000  # msec between the samples of the subscribed sources
+	HistoryLength = 60  # samples kept per source
+
+	def __init__(self):
+		Poll.__init__(self)
+		self.readers = {
+			"cpu": self.readCpu,
+			"loadavg": self.readLoadAvg,
+			"meminfo": self.readMemInfo,
+			"netdev": self.readNetDev,
+			"diskstats": self.readDiskStats,
+			"drivetemp": self.readDriveTemp,
+			"sensors": self.readSensors
+		}
+		self.snapshots = {
+			"cpu": self.getCpuUsage,
+			"netdev": self.getNetRates
+		}
+		self.histories = {}  # source -> deque([(time, value)])
+		self.subscribers = {}  # source -> [callback]
+		self.driveTempInputs = []  # temp*_input files of the drivetemp hwmon devices
+		self.poll_interval = self.SampleInterval
+
+	def subscribe(self, source, callback):
+		subscribers = self.subscribers.setdefault(source, [])
+		if callback not in subscribers:
+			subscribers.append(callback)
+		if not self.poll_enabled:
+			self.poll_enabled = True
+
+	def unsubscribe(self, source, callback):
+		subscribers = self.subscribers.get(source, [])
+		if callback in subscribers:
+			subscribers.remove(callback)
+		if self.poll_enabled and not [x for x in self.subscribers.values() if x]:
+			self.poll_enabled = False
+
+	def poll(self):
+		for source, subscribers in list(self.subscribers.items()):
+			if subscribers:
+				self.sample(source)
+				snapshot = self.snapshot(source)
+				for callback in subscribers[:]:
+					callback(snapshot)
+
+	def sample(self, source):
+		now = monotonic()
+		history = self.histories.get(source)
+		if history is None:
+			self.histories[source] = history = deque(maxlen=self.HistoryLength)
+		elif history and now - history[-1][0] < self.SampleInterval / 2000.0:
+			return history[-1][1]
+		value = self.readers[source]()
+		history.append((now, value))
+		return value
+
+	# Returns the published form of the last sample of a source, rates for
+	# the counters and the value itself for the others.
+	def snapshot(self, source):
+		if not self.histories.get(source):
+			self.sample(source)
+		snapshot = self.snapshots.get(source)
+		return snapshot() if snapshot else self.histories[source][-1][1]
+
+	def getHistory(self, source):
+		return list(self.histories.get(source, ()))
+
+	def lastTwo(self, source):
+		history = self.histories.get(source)
+		if not history:
+			return None, None, 0
+		if len(history) == 1:
+			return None, history[-1][1], 0
+		return history[-2][1], history[-1][1], history[-1][0] - history[-2][0]
+
+	def readCpu(self):
+		result = []
+		for line in readLines("/proc/stat"):
+			if line.startswith("cpu"):
+				# fields = [cpu, usr, nic, sys, idle, iowait, irq, softirq, steal]
+				fields = line.split()
+				total = sum([int(x) for x in fields[1:]])
+				result.append((fields[0], total, total - int(fields[4]) - int(fields[5])))  # (cpu, total, busy)
+		return result
+
+	# Busy percentage of all cpus (first entry) and each cpu since the
+	# previous sample.
+	def getCpuUsage(self):
+		previous, current, seconds = self.lastTwo("cpu")
+		if not previous or len(previous) != len(current):
+			return [0] * len(current or [])
+		result = []
+		for (name, total, busy), (prevName, prevTotal, prevBusy) in zip(current, previous):
+			result.append(100 * (busy - prevBusy) // (total - prevTotal) if total != prevTotal else 0)
+		return result
+
+	def getCpusCount(self):
+		return len(self.sample("cpu")) - 1
+
+	def readLoadAvg(self):
+		lines = readLines("/proc/loadavg")
+		return lines[0].strip() if lines else ""
+
+	def readMemInfo(self):
+		result = {}
+		for line in readLines("/proc/meminfo"):
+			fields = line.split()
+			if len(fields) > 1:
+				result[fields[0].rstrip(":")] = int(fields[1]) * 1024 if fields[2:] == ["kB"] else int(fields[1])
+		return result
+
+	def readNetDev(self):
+		result = {}
+		for line in readLines("/proc/net/dev")[2:]:
+			if ":" in line:
+				name, counters = line.split(":", 1)
+				counters = [int(x) for x in counters.split()]
+				# (rx bytes, rx errors, rx dropped, tx bytes, tx errors, tx dropped)
+				result[name.strip()] = (counters[0], counters[2], counters[3], counters[8], counters[10], counters[11])
+		return result
+
+	# Returns interface -> (counters, rx bytes/sec, tx bytes/sec).
+	def getNetRates(self):
+		previous, current, seconds = self.lastTwo("netdev")
+		result = {}
+		for name, counters in (current or {}).items():
+			prevCounters = previous and previous.get(name)
+			if prevCounters and seconds > 0:
+				result[name] = (counters, max(counters[0] - prevCounters[0], 0) / seconds, max(counters[3] - prevCounters[3], 0) / seconds)
+			else:
+				result[name] = (counters, 0.0, 0.0)
+		return result
+
+	def readDiskStats(self):
+		result = {}
+		for line in readLines("/proc/diskstats"):
+			fields = line.split()
+			if len(fields) > 7:
+				result[fields[2]] = (int(fields[3]), int(fields[7]))  # (read I/Os, write I/Os)
+		return result
+
+	# Disk temperatures of the drivetemp hwmon driver, in degrees Celsius.
+	def readDriveTemp(self):
+		if not self.driveTempInputs:  # Look again, a disk may have been connected.
+			self.driveTempInputs = []
+			try:
+				for hwmon in sorted(listdir("/sys/class/hwmon")):
+					path = join("/sys/class/hwmon", hwmon)
+					if readLines(join(path, "name"))[:1] == ["drivetemp\n"]:
+						self.driveTempInputs.extend([join(path, x) for x in sorted(listdir(path)) if x.startswith("temp") and x.endswith("_input")])
+			except (IOError, OSError):
+				pass
+		result = []
+		for filename in self.driveTempInputs:
+			lines = readLines(filename)
+			if lines:
+				result.append(int(lines[0]) // 1000)
+		return result
+
+	def readSensors(self):
+		from Components.Sensors import sensors
+		result = {}
+		for sensorid in range(len(sensors.sensors_list)):
+			try:
+				result[sensorid] = sensors.getSensorValue(sensorid)
+			except (IOError, OSError, ValueError):
+				result[sensorid] = None
+		return result
+
+
+systemMetrics = SystemMetrics()
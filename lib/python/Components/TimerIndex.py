@@ -0,0 +1,245 @@
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from operator import attrgetter
+from time import localtime, mktime
+
+from timer import TimerEntry
+
+
+# Normalise a service reference (string or eServiceReference) to the key used
+# for timer matching.  The service type and flags are ignored so that, for
+# example, a 4097 stream entry matches a timer converted to type 1.
+def serviceKey(service):
+	if isinstance(service, str):
+		refstr = ":".join(service.split(":")[:11])
+	else:
+		refstr = service.toCompareString()
+	parts = refstr.split(":", 2)
+	return parts[2] if len(parts) > 2 else refstr
+
+
+# Return the (begin, end) occurrences of a repeated timer which may touch the
+# span [begin, end].  Occurrences before the current one (timer.begin) are not
+# returned, like the week expansion of TimerSanityCheck.
+def repeatedOccurrences(timer, begin, end):
+	occurrences = []
+	length = timer.end - timer.begin
+	first = localtime(timer.begin)
+	day = localtime(max(begin - length, timer.begin) - 86400)
+	day = date(day.tm_year, day.tm_mon, day.tm_mday)
+	while True:
+		occurrenceBegin = int(mktime((day.year, day.month, day.day, first.tm_hour, first.tm_min, first.tm_sec, 0, 0, -1)))
+		if occurrenceBegin > end:
+			break
+		if timer.repeated & (1 << day.weekday()) and occurrenceBegin >= timer.begin and occurrenceBegin + length >= begin:
+			occurrences.append((occurrenceBegin, occurrenceBegin + length))
+		day += timedelta(days=1)
+	return occurrences
+
+
+# One sweep over the timers, returns a dict timer -> set of the timers which
+# are chained to it by overlapping (touching) recording times, the same
+# clusters as TimerIndex.overlapping() finds for one timer, for all timers at
+# once.  Repeated timers take part with their occurrences in the span of the
+# one shot timers.  Repeated timers and the timers of a cluster spanning more
+# than two weeks map to None, they have to be checked against everything.
+def overlapClusters(timers):
+	oneShot = [timer for timer in timers if not timer.repeated]
+	clusters = dict([(timer, None) for timer in timers if timer.repeated])
+	if not oneShot:
+		return clusters
+	spanBegin = min([timer.begin for timer in oneShot])
+	spanEnd = max([timer.end for timer in oneShot])
+	intervals = [(timer.begin, timer.end, timer) for timer in oneShot]
+	for timer in clusters:
+		intervals.extend([(begin, end, timer) for begin, end in repeatedOccurrences(timer, spanBegin, spanEnd)])
+	intervals.sort(key=lambda interval: interval[0])
+	parent = {}  # timer -> timer it was chained to, the root timer stands for the cluster
+
+	def root(timer):
+		while parent.get(timer, timer) is not timer:
+			timer = parent[timer]
+		return timer
+
+	first = None
+	clusterEnd = None
+	for begin, end, timer in intervals:
+		if clusterEnd is not None and begin <= clusterEnd:
+			clusterEnd = max(clusterEnd, end)
+			if root(timer) is not root(first):  # a repeated timer may chain clusters
+				parent[root(timer)] = root(first)
+		else:
+			first = timer
+			clusterEnd = end
+	members = {}  # root -> [begin, end, timers]
+	for begin, end, timer in intervals:
+		cluster = members.get(root(timer))
+		if cluster is None:
+			members[root(timer)] = [begin, end, set([timer])]
+		else:
+			cluster[0], cluster[1] = min(cluster[0], begin), max(cluster[1], end)
+			cluster[2].add(timer)
+	for begin, end, cluster in members.values():
+		for timer in cluster:
+			if not timer.repeated:
+				clusters[timer] = cluster if end - begin <= 2 * 604800 else None
+	return clusters
+
+
+class TimerIndexBucket:
+	def __init__(self):
+		self.begins = []  # sorted begin times of the one shot timers
+		self.timers = []  # one shot timers, in the same order as self.begins
+		self.repeated = []  # repeated timers, matched on every query
+		self.maxLength = 0  # longest one shot timer ever stored, bounds the search window
+
+	def add(self, timer, begin, length):
+		if timer.repeated:
+			self.repeated.append(timer)
+		else:
+			pos = bisect_right(self.begins, begin)
+			self.begins.insert(pos, begin)
+			self.timers.insert(pos, timer)
+			if length > self.maxLength:
+				self.maxLength = length
+
+	def remove(self, timer, begin, repeated):
+		if repeated:
+			self.repeated.remove(timer)
+			return
+		pos = bisect_left(self.begins, begin)
+		end = bisect_right(self.begins, begin)
+		while pos < end:
+			if self.timers[pos] is timer:
+				del self.begins[pos]
+				del self.timers[pos]
+				break
+			pos += 1
+		if not self.timers:
+			self.maxLength = 0
+
+	def lookup(self, startAt, endAt):
+		lo = bisect_left(self.begins, startAt - self.maxLength)
+		hi = bisect_left(self.begins, endAt)
+		# repeat timers represent all their future repetitions, so they are
+		# only expanded to a given day when the caller checks them
+		return self.timers[lo:hi] + self.repeated
+
+	# Sweep outwards from [begin, end] and return the set of timers which are
+	# chained to it by overlapping (touching) recording times.  Timers outside
+	# that cluster can't influence the tuner allocation inside it.
+	# Returns None when the cluster grows beyond two weeks (e.g. chained daily
+	# repeated timers), the caller must then check against everything.
+	def overlapCluster(self, begin, end, accept=None):
+		cluster = set()
+		lo, hi = begin, end
+		changed = True
+		while changed:
+			if hi - lo > 2 * 604800:
+				return None
+			changed = False
+			for timer in self.timers[bisect_left(self.begins, lo - self.maxLength):bisect_right(self.begins, hi)]:
+				if timer not in cluster and timer.end >= lo and timer.begin <= hi and (accept is None or accept(timer)):
+					cluster.add(timer)
+					if timer.begin < lo or timer.end > hi:
+						lo, hi = min(lo, timer.begin), max(hi, timer.end)
+						changed = True
+			for timer in self.repeated:
+				if accept is None or accept(timer):
+					for occurrenceBegin, occurrenceEnd in repeatedOccurrences(timer, lo, hi):
+						cluster.add(timer)
+						if occurrenceBegin < lo or occurrenceEnd > hi:
+							lo, hi = min(lo, occurrenceBegin), max(hi, occurrenceEnd)
+							changed = True
+		return cluster
+
+	def __len__(self):
+		return len(self.timers) + len(self.repeated)
+
+
+class TimerIndex:
+	"""Per service interval index of the waiting/running record timers.
+
+	Timers are bucketed on their normalised service reference and kept sorted
+	on their begin time so that a lookup only touches the timers of one service
+	inside the requested window, regardless of how many timers exist in total.
+	"""
+	def __init__(self):
+		self.buckets = {}
+		self.all = TimerIndexBucket()  # every indexed timer, for the conflict checks
+		self.entries = {}  # timer -> (key, begin, repeated) as it was indexed
+		self.generation = 0  # bumped on every change, usable as a cache key
+		self.serviceGenerations = {}  # service key -> generation of its last change
+
+	def update(self, timer):
+		self.remove(timer)
+		if timer.state >= TimerEntry.StateEnded:
+			return  # processed timers are not looked up
+		key = serviceKey(timer.service_ref)
+		bucket = self.buckets.get(key)
+		if bucket is None:
+			self.buckets[key] = bucket = TimerIndexBucket()
+		bucket.add(timer, timer.begin, timer.end - timer.begin)
+		self.all.add(timer, timer.begin, timer.end - timer.begin)
+		self.entries[timer] = (key, timer.begin, timer.repeated)
+		self.generation += 1
+		self.serviceGenerations[key] = self.generation
+
+	def remove(self, timer):
+		indexed = self.entries.pop(timer, None)
+		if indexed is None:
+			return
+		key, begin, repeated = indexed
+		bucket = self.buckets[key]
+		bucket.remove(timer, begin, repeated)
+		self.all.remove(timer, begin, repeated)
+		if not len(bucket):
+			del self.buckets[key]
+		self.generation += 1
+		self.serviceGenerations[key] = self.generation
+
+	def clear(self):
+		self.buckets = {}
+		self.all = TimerIndexBucket()
+		self.entries = {}
+		self.generation += 1
+		self.serviceGenerations = {}
+
+	# Return a value which changes whenever a timer of the given service changes,
+	# usable as a cache key for whatever is drawn for that service.
+	def serviceGeneration(self, service):
+		return self.serviceGenerations.get(serviceKey(service), -1)
+
+	@staticmethod
+	def _filter(timers, startAt, endAt):
+		return [timer for timer in timers if (startAt <= timer.end or timer.repeated) and timer.begin < endAt and timer.state < TimerEntry.StateEnded]
+
+	# Return the timers of the given service that may overlap [startAt, endAt),
+	# sorted on their begin time.
+	def lookup(self, service, startAt, endAt):
+		bucket = self.buckets.get(serviceKey(service))
+		if bucket is None:
+			return []
+		return sorted(self._filter(bucket.lookup(startAt, endAt), startAt, endAt), key=attrgetter("begin"))
+
+	# Return the timers of all services that may overlap [startAt, endAt).
+	def lookupRange(self, startAt, endAt):
+		timers = []
+		for bucket in self.buckets.values():
+			timers.extend(self._filter(bucket.lookup(startAt, endAt), startAt, endAt))
+		return sorted(timers, key=attrgetter("begin"))
+
+	# Return the set of indexed timers which may take part in a tuner conflict
+	# with the given timer, i.e. its overlap cluster, or None if every timer
+	# has to be considered (repeated timers).
+	# The timer itself is included when it is indexed.
+	def overlapping(self, timer):
+		if timer.repeated:
+			return None
+		cluster = self.all.overlapCluster(timer.begin, timer.end, lambda x: x.state < TimerEntry.StateEnded)
+		if cluster is not None and timer in self.entries:
+			cluster.add(timer)
+		return cluster
+
+	def __len__(self):
+		return len(self.entries)
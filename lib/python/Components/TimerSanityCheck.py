@@ -54,6 +54,10 @@ class TimerSanityCheck:
 						return True
 		return False
 
+	@staticmethod
+	def skipTimer(timer):
+		return timer.disabled or not timer.conflict_detection or not timer.service_ref or '%3a//' in timer.service_ref.ref.toString() or timer.state == TimerEntry.StateEnded
+
 	def checkTimerlist(self, ext_timer=None):
 		# with special service for external plugins
 		# Entries in eventlist
@@ -111,13 +115,27 @@ class TimerSanityCheck:
 		else:
 			self.nrep_eventlist.extend([(self.newtimer.begin, self.bflag, -1), (self.newtimer.end, self.eflag, -1)])
 
+		##################################################################################
+		# only the timers chained to the new timer by overlapping recording times
+		# can take part in a conflict with it, so don't simulate the rest. The
+		# cluster comes from the timer index of the record timers, timers which
+		# are not indexed are always simulated. With an empty cluster the new
+		# timer is still simulated on its own (its service may not be tunable).
+		timerlist = self.timerlist
+		recordTimer = getattr(NavigationInstance.instance, "RecordTimer", None)  # not set yet while the timers are loaded
+		if recordTimer is not None:
+			timerIndex = recordTimer.timerIndex
+			cluster = timerIndex.overlapping(self.newtimer)
+			if cluster is not None:
+				timerlist = [timer for timer in timerlist if timer in cluster or timer not in timerIndex.entries]
+
 		##################################################################################
 		# now process existing timers
 		self.check_timerlist = []
 		idx = 0
-		for timer in self.timerlist:
+		for timer in timerlist:
 			if timer != self.newtimer:
-				if timer.disabled or not timer.conflict_detection or not timer.service_ref or '%3a//' in timer.service_ref.ref.toString() or timer.state == TimerEntry.StateEnded:
+				if self.skipTimer(timer):
 					continue
 				if timer.repeated:
 					rflags = timer.repeated
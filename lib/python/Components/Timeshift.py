@@ -135,6 +135,8 @@ class InfoBarTimeshift:
 		self.pts_mergeRecords_timer = eTimer()
 		self.pts_mergeRecords_timer.callback.append(self.ptsMergeRecords)
 
+		self.pts_metafiles = {}  # meta file name -> ((mtime, size), lines) read by ptsMergeRecords
+
 		# Init PTS Merge Cleanup-Timer
 		self.pts_mergeCleanUp_timer = eTimer()
 		self.pts_mergeCleanUp_timer.callback.append(self.ptsMergePostCleanUp)
@@ -933,17 +935,13 @@ class InfoBarTimeshift:
 
 		if filelist is not None:
 			filelist.sort()
+		metafiles = set(["%s%s" % (config.usage.default_path.value, filename) for filename in filelist if filename.endswith(".meta")])
+		self.pts_metafiles = dict([(filename, entry) for filename, entry in self.pts_metafiles.items() if filename in metafiles])
 
 		for filename in filelist:
 			if filename.endswith(".meta"):
 				# Get Event Info from meta file
-				readmetafile = open("%s%s" % (config.usage.default_path.value, filename), "r")
-				servicerefname = readmetafile.readline()[0:-1]
-				eventname = readmetafile.readline()[0:-1]
-				eventtitle = readmetafile.readline()[0:-1]
-				eventtime = readmetafile.readline()[0:-1]
-				eventtag = readmetafile.readline()[0:-1]
-				readmetafile.close()
+				servicerefname, eventname, eventtitle, eventtime, eventtag = self.ptsReadMetaFile("%s%s" % (config.usage.default_path.value, filename))
 
 				if ptsgetnextfile:
 					ptsgetnextfile = False
@@ -954,14 +952,8 @@ class InfoBarTimeshift:
 						if fileExists("%s%s.eit" % (config.usage.default_path.value, ptsmergeSRC[0:-3])):
 							copyfile("%s%s.eit" % (config.usage.default_path.value, ptsmergeSRC[0:-3]), "%s%s.eit" % (config.usage.default_path.value, ptsmergeDEST[0:-3]))
 
-						# Delete AP and SC Files
-						if ospath.exists("%s%s.ap" % (config.usage.default_path.value, ptsmergeDEST)):
-							self.BgFileEraser.erase("%s%s.ap" % (config.usage.default_path.value, ptsmergeDEST))
-						if ospath.exists("%s%s.sc" % (config.usage.default_path.value, ptsmergeDEST)):
-							self.BgFileEraser.erase("%s%s.sc" % (config.usage.default_path.value, ptsmergeDEST))
-
-						# Add Merge Job to JobManager
-						JobManager.AddJob(MergeTimeshiftJob(self, "cat \"%s%s\" >> \"%s%s\"" % (config.usage.default_path.value, ptsmergeSRC, config.usage.default_path.value, ptsmergeDEST), ptsmergeSRC, ptsmergeDEST, eventname))
+						# Add Merge Job to JobManager, it also merges the AP, SC and cuts files
+						JobManager.AddJob(MergeTimeshiftJob(self, ptsmergeSRC, ptsmergeDEST, eventname), onFail=self.ptsMergeJobFailed)
 						config.timeshift.isRecording.value = True
 						ptsfilemerged = True
 					else:
@@ -989,6 +981,22 @@ class InfoBarTimeshift:
 		if not ptsfilemerged and ptsgetnextfile:
 			Notifications.AddNotification(MessageBox, _("[Timeshift] Merging records failed!"), MessageBox.TYPE_ERROR)
 
+	# Returns the service reference, event name, description, begin time and
+	# tag lines of a meta file, the merge check reads the meta files of all
+	# recordings on every pass so they are kept until they change.
+	def ptsReadMetaFile(self, filename):
+		try:
+			info = osstat(filename)
+			key = (info.st_mtime_ns, info.st_size)
+		except OSError:
+			key = None
+		entry = self.pts_metafiles.get(filename)
+		if entry is None or entry[0] != key:
+			with open(filename, "r") as readmetafile:
+				lines = [readmetafile.readline()[0:-1] for x in range(5)]
+			self.pts_metafiles[filename] = entry = (key, lines)
+		return entry[1]
+
 	def ptsCreateAPSCFiles(self, filename):
 		if fileExists(filename, "r"):
 			if fileExists(filename + ".meta", "r"):
@@ -1024,7 +1032,7 @@ class InfoBarTimeshift:
 			# Create AP and SC Files
 			self.ptsCreateAPSCFiles(destfile)
 
-	def ptsMergeFilefinished(self, srcfile, destfile):
+	def ptsMergeFilefinished(self, srcfile, destfile, indexed=False):
 		if self.session.nav.RecordTimer.isRecording() or len(JobManager.getPendingJobs()) >= 1:
 			# Rename files and delete them later ...
 			self.pts_mergeCleanUp_timer.start(120000, True)
@@ -1038,12 +1046,26 @@ class InfoBarTimeshift:
 			self.BgFileEraser.erase("%s.cuts" % srcfile)
 			self.BgFileEraser.erase("%s.eit" % (srcfile[0:-3]))
 
-		# Create AP and SC Files
-		self.ptsCreateAPSCFiles(destfile)
+		# Create AP and SC Files, unless they were merged too
+		if indexed:
+			self.ptsSaveTimeshiftFinished()
+		else:
+			self.ptsCreateAPSCFiles(destfile)
 
 		# Run Merge-Process one more time to check if there are more records to merge
 		self.pts_mergeRecords_timer.start(10000, True)
 
+	# The failed merge is already reported by ptsMergeFilefailed(), the job
+	# manager does not show its own message or offer a retry.
+	def ptsMergeJobFailed(self, job, task, problems):
+		return False
+
+	def ptsMergeFilefailed(self, srcfile, destfile):
+		if not self.pts_mergeCleanUp_timer.isActive():
+			self.ptsFrontpanelActions("stop")
+			config.timeshift.isRecording.value = False
+		Notifications.AddNotification(MessageBox, _("[Timeshift] Merging records failed!"), MessageBox.TYPE_ERROR)
+
 	def ptsSaveTimeshiftFinished(self):
 		if not self.pts_mergeCleanUp_timer.isActive():
 			self.ptsFrontpanelActions("stop")
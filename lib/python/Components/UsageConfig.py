@@ -86,6 +86,12 @@ def InitUsageConfig():
 	config.usage.quickzap_bouquet_change = ConfigYesNo(default=False)
 	config.usage.e1like_radio_mode = ConfigYesNo(default=True)
 
+	def pixmapCacheSizeChange(configElement):
+		from Tools.LoadPixmap import pixmapCache
+		pixmapCache.setBudget(int(configElement.value) * 1024 * 1024)
+	config.usage.pixmap_cache_size = ConfigSelection(default="16", choices=[("0", _("Disabled"))] + [(str(i), "%d MB" % i) for i in (4, 8, 16, 32, 64)])
+	config.usage.pixmap_cache_size.addNotifier(pixmapCacheSizeChange)
+
 	choicelist = [("0", _("No timeout"))] + \
 		[(str(i), ngettext("%d second", "%d seconds", i) % i) for i in range(1, 21)]
 	config.usage.infobar_timeout = ConfigSelection(default="5", choices=choicelist)
@@ -0,0 +1,193 @@
+from base64 import b64encode
+from hashlib import md5
+from os import urandom
+from re import findall
+from urllib.parse import urlsplit
+from xml.etree.ElementTree import ParseError, XMLParser
+
+from twisted.internet import reactor
+from twisted.internet.defer import CancelledError, Deferred
+from twisted.internet.error import TimeoutError
+from twisted.internet.protocol import Protocol
+from twisted.python.failure import Failure
+from twisted.web.client import Agent, HTTPConnectionPool, PotentialDataLoss, ResponseDone
+from twisted.web.http_headers import Headers
+
+
+class WebIfError(Exception):
+	def __init__(self, code, reason):
+		Exception.__init__(self, "%d %s" % (code, reason))
+		self.code = code
+		self.reason = reason
+
+
+# Collects the body of a response, or feeds it to an XML parser while it is
+# received so the document is built when the last chunk arrives.
+class WebIfBodyReceiver(Protocol):
+	def __init__(self, xml):
+		self.parser = XMLParser() if xml else None
+		self.chunks = []
+		self.error = None
+		self.finished = Deferred(self.cancel)
+
+	def cancel(self, deferred):
+		deferred.errback(Failure(CancelledError()))
+		self.transport.stopProducing()
+
+	def dataReceived(self, data):
+		if self.error is None:
+			if self.parser is None:
+				self.chunks.append(data)
+			else:
+				try:
+					self.parser.feed(data)
+				except ParseError as err:
+					self.error = err
+					self.transport.stopProducing()
+
+	def connectionLost(self, reason):
+		if self.finished.called:
+			return
+		if self.error is None and reason.check(ResponseDone, PotentialDataLoss):
+			try:
+				self.finished.callback(b"".join(self.chunks) if self.parser is None else self.parser.close())
+			except ParseError as err:
+				self.finished.errback(Failure(err))
+		else:
+			self.finished.errback(Failure(self.error) if self.error else reason)
+
+
+# HTTP client for the web interfaces of the softcams, running on the reactor
+# instead of blocking the main loop. Connections are kept open and reused,
+# every request has a time limit and requests of the same page which are
+# still running are joined, so screens refreshing the same page at the same
+# time cause a single request. Basic and digest authentication are answered
+# when the server asks for them and sent with the following requests right
+# away.
+class WebIfClient:
+	ConnectTimeout = 5  # seconds to connect to the web interface
+	Timeout = 15  # seconds for a whole request including the body
+	MaxPersistentPerHost = 2  # idle connections kept open per web interface
+	IdleTimeout = 60  # seconds an idle connection is kept open
+
+	def __init__(self):
+		self.pool = None
+		self.agent = None
+		self.pending = {}  # (url, username, password, xml) -> [deferreds of the callers]
+		self.auth = {}  # scheme://host:port -> [scheme, challenge parameters, nonce count]
+
+	def getAgent(self):
+		if self.agent is None:
+			self.pool = HTTPConnectionPool(reactor, persistent=True)
+			self.pool.maxPersistentPerHost = self.MaxPersistentPerHost
+			self.pool.cachedConnectionTimeout = self.IdleTimeout
+			self.agent = Agent(reactor, connectTimeout=self.ConnectTimeout, pool=self.pool)
+		return self.agent
+
+	# Returns a deferred firing with the body of the page, or the root element
+	# of the page parsed as XML when xml is True. It fails with a WebIfError
+	# for HTTP errors and a TimeoutError when the request took too long.
+	def getPage(self, url, username=None, password=None, xml=False):
+		key = (url, username, password, xml)
+		deferred = Deferred()
+		waiting = self.pending.get(key)
+		if waiting is not None:
+			waiting.append(deferred)
+		else:
+			self.pending[key] = [deferred]
+			request = self.request(url, username, password, xml, True)
+			timer = reactor.callLater(self.Timeout, self.timedOut, request)
+			request.addBoth(self.finished, key, timer)
+		return deferred
+
+	def timedOut(self, request):
+		request.cancel()
+
+	def finished(self, result, key, timer):
+		if timer.active():
+			timer.cancel()
+		elif isinstance(result, Failure):
+			result = Failure(TimeoutError(string="No answer within %s seconds" % self.Timeout))
+		if isinstance(result, Failure):
+			print("[WebIfClient] Error: Unable to get '%s'!" % key[0], result.getErrorMessage())
+		for deferred in self.pending.pop(key, []):
+			if not deferred.called:  # Not cancelled by the caller.
+				if isinstance(result, Failure):
+					deferred.errback(result)
+				else:
+					deferred.callback(result)
+
+	def request(self, url, username, password, xml, retry):
+		headers = Headers({b"User-Agent": [b"enigma2"]})
+		if username:
+			authorization = self.getAuthorization(url, username, password)
+			if authorization:
+				headers.setRawHeaders(b"Authorization", [authorization.encode("UTF-8")])
+		deferred = self.getAgent().request(b"GET", url.encode("UTF-8"), headers)
+		deferred.addCallback(self.responseReceived, url, username, password, xml, retry)
+		return deferred
+
+	def responseReceived(self, response, url, username, password, xml, retry):
+		if response.code == 401 and username and retry and self.setChallenge(url, response.headers.getRawHeaders(b"WWW-Authenticate", [])):
+			deferred = self.readBody(response, False)  # Read the body so the connection can be used again.
+			deferred.addCallback(lambda body: self.request(url, username, password, xml, False))
+			return deferred
+		if response.code >= 400:
+			deferred = self.readBody(response, False)
+			deferred.addCallback(lambda body: Failure(WebIfError(response.code, response.phrase.decode("UTF-8", "replace"))))
+			return deferred
+		return self.readBody(response, xml)
+
+	def readBody(self, response, xml):
+		receiver = WebIfBodyReceiver(xml)
+		response.deliverBody(receiver)
+		return receiver.finished
+
+	def getOrigin(self, url):
+		parts = urlsplit(url)
+		return "%s://%s" % (parts.scheme, parts.netloc)
+
+	# Remembers the authentication the server asked for, returns False when
+	# the server did not ask for a supported one.
+	def setChallenge(self, url, challenges):
+		for challenge in challenges:
+			challenge = challenge.decode("UTF-8", "replace")
+			scheme = challenge.split(" ", 1)[0].lower()
+			if scheme in ("basic", "digest"):
+				parameters = dict([(name.lower(), quoted or plain) for name, quoted, plain in findall(r'(\w+)\s*=\s*(?:"([^"]*)"|([^\s,]*))', challenge)])
+				self.auth[self.getOrigin(url)] = [scheme, parameters, 0]
+				return True
+		return False
+
+	def getAuthorization(self, url, username, password):
+		auth = self.auth.get(self.getOrigin(url))
+		if auth is None:
+			return None
+		scheme, parameters, count = auth
+		if scheme == "basic":
+			return "Basic %s" % b64encode(("%s:%s" % (username, password or "")).encode("UTF-8")).decode()
+		auth[2] = count = count + 1
+		parts = urlsplit(url)
+		uri = parts.path or "/"
+		if parts.query:
+			uri = "%s?%s" % (uri, parts.query)
+		realm = parameters.get("realm", "")
+		nonce = parameters.get("nonce", "")
+		ha1 = md5(("%s:%s:%s" % (username, realm, password or "")).encode("UTF-8")).hexdigest()
+		ha2 = md5(("GET:%s" % uri).encode("UTF-8")).hexdigest()
+		fields = ['username="%s"' % username, 'realm="%s"' % realm, 'nonce="%s"' % nonce, 'uri="%s"' % uri]
+		if "auth" in [x.strip() for x in parameters.get("qop", "").split(",")]:
+			cnonce = urandom(8).hex()
+			response = md5(("%s:%s:%08x:%s:auth:%s" % (ha1, nonce, count, cnonce, ha2)).encode("UTF-8")).hexdigest()
+			fields.extend(["qop=auth", "nc=%08x" % count, 'cnonce="%s"' % cnonce])
+		else:
+			response = md5(("%s:%s:%s" % (ha1, nonce, ha2)).encode("UTF-8")).hexdigest()
+		fields.append('response="%s"' % response)
+		if "opaque" in parameters:
+			fields.append('opaque="%s"' % parameters["opaque"])
+		if "algorithm" in parameters:
+			fields.append("algorithm=%s" % parameters["algorithm"])
+		return "Digest %s" % ", ".join(fields)
+
+
+webIfClient = WebIfClient()
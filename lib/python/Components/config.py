@@ -1,9 +1,10 @@
 from copy import copy as copy_copy
-from os import fsync, path as os_path, rename, sep
-from time import localtime, strftime, mktime
+from marshal import dumps as marshal_dumps, loads as marshal_loads
+from os import fsync, path as os_path, rename, sep, stat
+from time import localtime, strftime, mktime, time
 
 # DO NOT CHANGE THE ORDER OF THESE IMPORTS OR Harddisk will crash!!
-from enigma import getPrevAsciiCode
+from enigma import eTimer, getPrevAsciiCode
 from Tools.Directories import fileExists, resolveFilename, SCOPE_CONFIG
 from Tools.NumericalTextInput import NumericalTextInput
 from Components.Harddisk import harddiskmanager
@@ -69,9 +70,18 @@ KEY_9 = ACTIONKEY_9
 #            loads the default if saved_value is 'None' (default) or invalid.
 #   save()   stores _value into saved_value, or stores 'None' if it should not be stored.
 #
+# A change of saved_value is reported to the subsections holding the element, so
+# that Config.pickle() only serializes the subsections which actually changed.
+#
+def markPickleChanged(item):
+	for parent in item.__dict__.get("configParents", ()):
+		parent.pickleChanged()
+
+
 class ConfigElement:
 	def __init__(self):
 		self.extra_args = []
+		self.configParents = []
 		self.saved_value = None
 		self.save_forced = False
 		self.last_value = None
@@ -101,6 +111,16 @@ class ConfigElement:
 
 	notifiers_final = property(getNotifiersFinal, setNotifiersFinal)
 
+	def getSavedValue(self):
+		return self.__dict__.get("_saved_value")
+
+	def setSavedValue(self, value):
+		if self.__dict__.get("_saved_value") != value:
+			self._saved_value = value
+			markPickleChanged(self)
+
+	saved_value = property(getSavedValue, setSavedValue)
+
 	# you need to override this to do input validation
 	def setValue(self, value):
 		prev = self._value if hasattr(self, "_value") else None
@@ -2094,8 +2114,10 @@ class ConfigSubDict(dict):
 class ConfigSubsection:
 	def __init__(self):
 		self.__dict__["content"] = ConfigSubsectionContent()
+		self.__dict__["configParents"] = []
 		self.content.items = {}
 		self.content.stored_values = {}
+		self.content.pickled = None  # (prefix, text) of the last pickle, None when changed since
 
 	def __setattr__(self, name, value):
 		if name == "saved_value":
@@ -2103,6 +2125,10 @@ class ConfigSubsection:
 		assert isinstance(value, (ConfigSubsection, ConfigElement, ConfigSubList, ConfigSubDict)), "ConfigSubsections can only store ConfigSubsections, ConfigSubLists, ConfigSubDicts or ConfigElements"
 		content = self.content
 		content.items[name] = value
+		parents = value.__dict__.get("configParents")
+		if parents is not None and not [parent for parent in parents if parent is self]:
+			parents.append(self)
+		self.pickleChanged()
 		val = content.stored_values.get(name, None)
 		if val is not None:
 			# print(f"[Config] Ok, now we have a new item '{name}' and have the following value for it '{str(val)}'.")
@@ -2127,6 +2153,7 @@ class ConfigSubsection:
 	def setSavedValue(self, values):
 		values = dict(values)
 		self.content.stored_values = values
+		self.pickleChanged()
 		for (key, val) in self.content.items.items():
 			value = values.get(key, None)
 			if value is not None:
@@ -2134,6 +2161,12 @@ class ConfigSubsection:
 
 	saved_value = property(getSavedValue, setSavedValue)
 
+	def pickleChanged(self):
+		# the parents are already marked when this subsection was marked before
+		if self.content.pickled is not None:
+			self.content.pickled = None
+			markPickleChanged(self)
+
 	def save(self):
 		for item in self.content.items.values():
 			item.save()
@@ -2156,6 +2189,13 @@ class ConfigSubsection:
 
 
 class Config(ConfigSubsection):
+	# The settings file is the only source of truth.  The snapshot next to it holds
+	# the parsed tree of that file in marshal format and is only used as long as the
+	# size and modification time of the settings file match the ones it was made from.
+	snapshotEnabled = True
+	SNAPSHOT_SUFFIX = ".cache"
+	SNAPSHOT_VERSION = 1
+
 	def __init__(self):
 		ConfigSubsection.__init__(self)
 
@@ -2171,10 +2211,59 @@ class Config(ConfigSubsection):
 
 	def pickle(self):
 		result = []
-		self.pickle_this("config", self.saved_value, result)
+		self.pickle_section("config", self, result)
 		return ''.join(result)
 
+	# Same output as pickle_this() on the saved_value of the subsection, but the text of
+	# subsections which didn't change since the last pickle is reused.  The text of
+	# subsections holding a ConfigSubList or ConfigSubDict (directly or below) isn't
+	# kept, as changes to those aren't tracked.  Returns True in that case.
+	def pickle_section(self, prefix, section, result):
+		content = section.content
+		pickled = content.pickled
+		if pickled is not None and pickled[0] == prefix:
+			result.append(pickled[1])
+			return False
+		values = content.stored_values
+		sections = {}
+		volatile = False
+		for (key, val) in content.items.items():
+			if isinstance(val, ConfigSubsection):
+				sections[key] = val
+				values[key] = val.content.stored_values
+			else:
+				saved = val.saved_value
+				if saved is not None:
+					values[key] = saved
+				elif key in values:
+					del values[key]
+				if not isinstance(val, ConfigElement):
+					volatile = True
+		text = []
+		for (key, val) in sorted(values.items(), key=lambda x: int(x[0]) if x[0].isdigit() else x[0].lower()):
+			name = '.'.join((prefix, key))
+			if key in sections:
+				volatile = self.pickle_section(name, sections[key], text) or volatile
+			elif isinstance(val, dict):
+				self.pickle_this(name, val, text)
+			elif isinstance(val, tuple):
+				text += [name, '=', str(val[0]), '\n']
+			else:
+				text += [name, '=', str(val), '\n']
+		text = ''.join(text)
+		content.pickled = None if volatile else (prefix, text)
+		result.append(text)
+		return volatile
+
 	def unpickle(self, lines, base_file=True):
+		tree = self.unpickleTree(lines, base_file)
+		# we inherit from ConfigSubsection, so ...
+		# object.__setattr__(self, "saved_value", tree["config"])
+		if "config" in tree:
+			self.setSavedValue(tree["config"])
+		return tree
+
+	def unpickleTree(self, lines, base_file=True):
 		tree = {}
 		configbase = tree.setdefault("config", {})
 		for element in lines:
@@ -2203,14 +2292,13 @@ class Config(ConfigSubsection):
 						configEntry.value = val
 				except (SyntaxError, KeyError):
 					pass
+		return tree
 
-		# we inherit from ConfigSubsection, so ...
-		# object.__setattr__(self, "saved_value", tree["config"])
-		if "config" in tree:
-			self.setSavedValue(tree["config"])
-
-	def saveToFile(self, filename):
-		text = self.pickle()
+	# The text must be the one pickle() just returned, the snapshot is made from the
+	# saved values it was pickled from.
+	def saveToFile(self, filename, text=None):
+		if text is None:
+			text = self.pickle()
 		try:
 			with open(filename + ".writing", "w", encoding="UTF-8") as f:
 				f.write(text)
@@ -2219,10 +2307,55 @@ class Config(ConfigSubsection):
 			rename(filename + ".writing", filename)
 		except OSError:
 			print("[Config] Couldn't write %s" % filename)
+			return False
+		if self.snapshotEnabled:
+			self.saveSnapshot(filename, {"config": self.snapshotTree(self.content.stored_values)})
+		return True
+
+	# Returns the tree unpickleTree() makes of the pickled text of the values.
+	def snapshotTree(self, values):
+		tree = {}
+		for (key, val) in values.items():
+			if isinstance(val, dict):
+				val = self.snapshotTree(val)
+				if val:
+					tree[key] = val
+			else:
+				tree[key] = str(val[0] if isinstance(val, tuple) else val).strip()
+		return tree
 
 	def loadFromFile(self, filename, base_file=True):
+		if base_file and self.snapshotEnabled:
+			tree = self.loadSnapshot(filename)
+			if tree is not None:
+				if "config" in tree:
+					self.setSavedValue(tree["config"])
+				return
 		with open(filename, "r", encoding="UTF-8") as f:
-			self.unpickle(f, base_file)
+			tree = self.unpickle(f, base_file)
+		if base_file and self.snapshotEnabled:
+			self.saveSnapshot(filename, tree)
+
+	def saveSnapshot(self, filename, tree):
+		try:
+			st = stat(filename)
+			data = marshal_dumps((self.SNAPSHOT_VERSION, st.st_size, st.st_mtime_ns, tree))
+			with open(filename + self.SNAPSHOT_SUFFIX + ".writing", "wb") as f:
+				f.write(data)
+			rename(filename + self.SNAPSHOT_SUFFIX + ".writing", filename + self.SNAPSHOT_SUFFIX)
+		except (OSError, ValueError) as err:
+			print("[Config] Couldn't write snapshot of %s: %s" % (filename, str(err)))
+
+	def loadSnapshot(self, filename):
+		try:
+			with open(filename + self.SNAPSHOT_SUFFIX, "rb") as f:
+				version, size, mtime, tree = marshal_loads(f.read())
+			st = stat(filename)
+		except (OSError, EOFError, ValueError, TypeError):
+			return None
+		if version != self.SNAPSHOT_VERSION or size != st.st_size or mtime != st.st_mtime_ns or not isinstance(tree, dict):
+			return None
+		return tree
 
 
 config = Config()
@@ -2230,12 +2363,26 @@ config.misc = ConfigSubsection()
 
 
 class ConfigFile:
+	# Saves are coalesced, the settings are written when no further save was
+	# requested for SaveIdleTime ms, but at the latest SaveMaxDelay seconds after
+	# the first pending request.  Use flush() when the file is needed right away.
+	SaveIdleTime = 500
+	SaveMaxDelay = 5
+
 	def __init__(self):
-		pass
+		self.saveTimer = None
+		self.savePendingSince = None
+		self.savedText = None  # the settings as last written or loaded
+		self.saveRequests = 0
+		self.saveWrites = 0
 
 	CONFIG_FILE = resolveFilename(SCOPE_CONFIG, "settings")
 
 	def load(self):
+		if self.saveTimer is not None:
+			self.saveTimer.stop()
+		self.savePendingSince = None
+		self.savedText = None
 		try:
 			config.loadFromFile(self.CONFIG_FILE, True)
 			print("[Config] Config file loaded ok...")
@@ -2244,7 +2391,29 @@ class ConfigFile:
 
 	def save(self):
 		# config.save()
-		config.saveToFile(self.CONFIG_FILE)
+		self.saveRequests += 1
+		if self.saveTimer is None:
+			self.saveTimer = eTimer()
+			self.saveTimer.callback.append(self.flush)
+		now = time()
+		if self.savePendingSince is None:
+			self.savePendingSince = now
+		delay = min(self.SaveIdleTime, int((self.savePendingSince + self.SaveMaxDelay - now) * 1000))
+		self.saveTimer.start(max(delay, 0), True)
+
+	def flush(self):
+		if self.saveTimer is not None:
+			self.saveTimer.stop()
+		if self.savePendingSince is None:
+			return
+		self.savePendingSince = None
+		text = config.pickle()
+		if text != self.savedText and config.saveToFile(self.CONFIG_FILE, text):
+			self.savedText = text
+			self.saveWrites += 1
+
+	def getStats(self):
+		return {"requests": self.saveRequests, "writes": self.saveWrites, "pending": self.savePendingSince is not None}
 
 	def __resolveValue(self, pickles, cmap):
 		key = pickles[0]
@@ -692,7 +692,7 @@ class MediaPlayer(Screen, InfoBarBase, InfoBarScreenSaver, InfoBarSeek, InfoBarA
 
 	def skip_listend(self):
 		if self.currList == "filelist":
-			idx = len(self.filelist.list)
+			idx = len(self.filelist.getFileList())
 			self.filelist.moveToIndex(idx - 1)
 		else:
 			self.playlist.moveToIndex(len(self.playlist) - 1)
@@ -1,6 +1,6 @@
 from os import access as osaccess, path as ospath, F_OK, R_OK
 from Components.Harddisk import harddiskmanager
-from Components.Scanner import scanDevice
+from Components.Scanner import scanDeviceInBackground
 from Plugins.Plugin import PluginDescriptor
 from Screens.ChoiceBox import ChoiceBox
 from Screens.InfoBar import InfoBar
@@ -21,16 +21,19 @@ def mountpoint_chosen(option):
 
 	# print("[MediaScanner][ mountpoint_chosen] scanning", option)
 	(description, mountpoint, session) = option
-	res = scanDevice(mountpoint)
+	scanDeviceInBackground(mountpoint, lambda res: scan_finished(res, mountpoint, session))
+
+
+def scan_finished(res, mountpoint, session):
 	list = [(r.description, r, res[r], session) for r in res]
-	# print("[MediaScanner][ mountpoint_chosen]  description=%s, mountpoint=%s res=%s list=%s" % (description, mountpoint, res, list))
+	# print("[MediaScanner][scan_finished] mountpoint=%s res=%s list=%s" % (mountpoint, res, list))
 
 	if not list:
 		from Screens.MessageBox import MessageBox
 		if osaccess(mountpoint, F_OK | R_OK):
 			session.open(MessageBox, _("No displayable files on this medium found!"), MessageBox.TYPE_INFO, simple=True, timeout=5)
 		else:
-			print("[MediaScanner][ mountpoint_chosen] ignore", mountpoint, "because its not accessible")
+			print("[MediaScanner][scan_finished] ignore", mountpoint, "because its not accessible")
 		return
 
 	session.openWithCallback(execute, ChoiceBox,
@@ -2,6 +2,7 @@ from os import unlink
 from enigma import eTimer, eDVBDB
 
 from Components.NimManager import nimmanager
+from Components.ServiceMetadataIndex import serviceMetadataIndex
 from Plugins.Plugin import PluginDescriptor
 from Screens.ScanSetup import ScanSetup
 from Screens.ServiceScan import ServiceScan
@@ -42,6 +43,7 @@ class DefaultServiceScan(ServiceScan):
 			pass
 		db = eDVBDB.getInstance()
 		db.reloadServicelist()
+		serviceMetadataIndex.invalidate()
 		ServiceScan.__init__(self, session, scanList)
 		self.timer = eTimer()
 		self.timer.callback.append(self.ok)
@@ -121,6 +123,7 @@ class DefaultServicesScannerPlugin(ScanSetup):
 			confdir = resolveFilename(SCOPE_CONFIG)
 			copyfile(confdir + "/lamedb.backup", confdir + "/lamedb")
 			db.reloadServicelist()
+			serviceMetadataIndex.invalidate()
 			self.close()
 		else:
 			self.selectSat(self.scanIndex)
@@ -3,6 +3,7 @@ import re
 
 from Components.config import config, configfile
 from Components.NimManager import nimmanager
+from Components.ServiceMetadataIndex import serviceMetadataIndex
 
 from Screens.ChannelSelection import ChannelSelection
 from Screens.MessageBox import MessageBox
@@ -741,6 +742,7 @@ class Opentv_Zapper():
 			writer.writeLamedb(lamedb_path, transponders)
 			writer.writeLamedb5(lamedb_path, transponders)
 			eDVBDB.getInstance().reloadServicelist()
+			serviceMetadataIndex.invalidate()
 		self.initialized = provider
 		print("[%s] initialize completed." % (debug_name))
 
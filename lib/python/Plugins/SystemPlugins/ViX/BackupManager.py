@@ -1,19 +1,27 @@
+from collections import OrderedDict
 from datetime import date, datetime
-from os import path, stat, mkdir, listdir, remove, statvfs, chmod
+from hashlib import sha256
+from os import path, stat, lstat, mkdir, makedirs, listdir, readlink, remove, rename, statvfs, chmod, lchown, symlink, utime, walk
+from stat import S_IMODE, S_ISDIR, S_ISLNK, S_ISREG
 from time import localtime, time, strftime, mktime
+import gzip
+import json
 import tarfile
 import glob
+from twisted.internet import reactor, threads
 from enigma import eTimer, eEnv, eDVBDB, quitMainloop
 
 from Components.About import about
 from Components.ActionMap import ActionMap
 from Components.Button import Button
+from Components.BouquetIndex import bouquetIndex
 from Components.config import configfile, config, ConfigSubsection, ConfigYesNo, ConfigSelection, ConfigText, ConfigNumber, ConfigLocations, NoSave, ConfigClock, ConfigDirectory
 from Components.Console import Console
 from Components.FileList import MultiFileSelectList, FileList
 from Components.Harddisk import harddiskmanager
 from Components.Label import Label
 from Components.MenuList import MenuList
+from Components.ServiceMetadataIndex import serviceMetadataIndex
 from Components.Sources.StaticText import StaticText
 from Components.SystemInfo import SystemInfo
 import Components.Task
@@ -21,6 +29,7 @@ from Screens.MessageBox import MessageBox
 from Screens.Screen import Screen
 from Screens.Setup import Setup
 from Screens.TextBox import TextBox
+from Tools.Directories import MTIME_RESOLUTION
 from Tools.Notifications import AddPopupWithCallback
 
 autoBackupManagerTimer = None
@@ -118,6 +127,252 @@ def isRestorableKernel(kernelversion):
 	# return kernelversion == about.getKernelVersionString()
 
 
+# Settings backups as content addressed generations. Every file is stored
+# once as a gzip compressed object named by the SHA256 of its content in the
+# objects directory of the backup directory, a backup is a small manifest of
+# the files with their attributes and objects. Files with the size and mtime
+# they had in the previous backup are not read again. Old backups are pruned
+# by deleting their manifest and then the objects no longer referenced.
+class BackupStore:
+	Version = 1
+	ManifestSuffix = ".manifest"
+	ObjectsDirectory = ".objects"
+	ChunkSize = 65536
+
+	def __init__(self, directory):
+		self.directory = directory
+		self.objects = path.join(directory, self.ObjectsDirectory)
+		self.files = 0
+		self.hashed = 0
+		self.stored = 0
+		self.storedBytes = 0
+		self.duration = 0
+
+	def getManifests(self):
+		return [path.join(self.directory, x) for x in listdir(self.directory) if isBackupManifest(x)]
+
+	# Returns {path: (size, mtime, sha256)} of the files of the newest backup
+	# which cannot have changed unnoticed since.
+	def getPreviousHashes(self):
+		manifests = self.getManifests()
+		if manifests:
+			filename = max(manifests, key=path.getmtime)
+			try:
+				manifest = loadBackupManifest(filename)
+				racy = (manifest["created"] - MTIME_RESOLUTION) * 1000000000  # a file changed this shortly before the previous backup is read again
+				return {x["path"]: (x["size"], x["mtime"], x["sha256"]) for x in manifest["files"] if x["type"] == "f" and x["mtime"] < racy}
+			except (IOError, OSError, ValueError, KeyError) as err:
+				print("[BackupManager] Unable to use the previous backup %s:" % filename, err)
+		return {}
+
+	# Writes the backup of the files and directories in sources to the
+	# manifest filename.
+	def create(self, filename, sources):
+		start = time()
+		makedirs(self.objects, exist_ok=True)
+		previous = self.getPreviousHashes()
+		entries = OrderedDict()
+		for source in sources:
+			source = path.normpath(source)
+			try:
+				info = lstat(source)
+			except OSError as err:
+				print("[BackupManager] Skipping %s:" % source, err)
+				continue
+			self.addEntry(entries, previous, source, info)
+			if S_ISDIR(info.st_mode):
+				for root, dirs, files in walk(source):
+					dirs.sort()
+					for name in dirs + sorted(files):
+						try:
+							self.addEntry(entries, previous, path.join(root, name), lstat(path.join(root, name)))
+						except OSError as err:
+							print("[BackupManager] Skipping %s:" % path.join(root, name), err)
+		self.duration = time() - start
+		manifest = {"version": self.Version, "created": int(start), "duration": round(self.duration, 3), "files": list(entries.values())}
+		temporary = path.join(self.objects, "manifest.tmp")
+		with open(temporary, "w") as fd:
+			json.dump(manifest, fd)
+		chmod(temporary, 0o644)
+		rename(temporary, filename)
+		print("[BackupManager] Backup of %d files took %.1f seconds, %d files read, %d new objects with %d bytes stored." % (self.files, self.duration, self.hashed, self.stored, self.storedBytes))
+
+	def addEntry(self, entries, previous, filename, info):
+		name = filename.lstrip("/")
+		if name in entries:
+			return
+		entry = {"path": name, "mode": S_IMODE(info.st_mode), "uid": info.st_uid, "gid": info.st_gid, "mtime": info.st_mtime_ns}
+		if S_ISDIR(info.st_mode):
+			entry["type"] = "d"
+		elif S_ISLNK(info.st_mode):
+			entry["type"] = "l"
+			entry["target"] = readlink(filename)
+		elif S_ISREG(info.st_mode):
+			entry["type"] = "f"
+			entry["size"] = info.st_size
+			known = previous.get(name)
+			if known and known[:2] == (info.st_size, info.st_mtime_ns) and path.exists(self.getObject(known[2])):
+				entry["sha256"] = known[2]
+			else:
+				entry["sha256"] = self.storeFile(filename)
+			self.files += 1
+		else:
+			print("[BackupManager] Skipping special file %s." % filename)
+			return
+		entries[name] = entry
+
+	def getObject(self, checksum):
+		return path.join(self.objects, checksum[:2], checksum)
+
+	# Compresses the file into a new object while it is hashed, the object is
+	# dropped when one with the same content exists.
+	def storeFile(self, filename):
+		self.hashed += 1
+		checksum = sha256()
+		temporary = path.join(self.objects, "object.tmp")
+		try:
+			size = 0
+			with open(filename, "rb") as source, gzip.open(temporary, "wb") as destination:
+				while True:
+					data = source.read(self.ChunkSize)
+					if not data:
+						break
+					checksum.update(data)
+					destination.write(data)
+					size += len(data)
+			objectFile = self.getObject(checksum.hexdigest())
+			if not path.exists(objectFile):
+				makedirs(path.dirname(objectFile), exist_ok=True)
+				rename(temporary, objectFile)
+				self.stored += 1
+				self.storedBytes += size
+		finally:
+			if path.exists(temporary):
+				remove(temporary)
+		return checksum.hexdigest()
+
+	# Removes the objects no longer referenced by any backup.
+	def collectGarbage(self):
+		referenced = set()
+		try:
+			for filename in self.getManifests():
+				referenced.update([x["sha256"] for x in loadBackupManifest(filename)["files"] if x["type"] == "f"])
+		except (IOError, OSError, ValueError, KeyError) as err:
+			print("[BackupManager] Not removing unused backup objects, a manifest is unreadable:", err)
+			return 0
+		removed = 0
+		for root, dirs, files in walk(self.objects):
+			for name in files:
+				if name not in referenced:
+					remove(path.join(root, name))
+					removed += 1
+		print("[BackupManager] %d unused backup objects removed." % removed)
+		return removed
+
+	def getStats(self):
+		return {"files": self.files, "hashed": self.hashed, "stored": self.stored, "storedBytes": self.storedBytes, "duration": self.duration}
+
+
+def isBackupManifest(filename):
+	return filename.endswith(BackupStore.ManifestSuffix)
+
+
+def loadBackupManifest(filename):
+	with open(filename, "r") as fd:
+		manifest = json.load(fd)
+	if manifest.get("version") != BackupStore.Version:
+		raise ValueError("Unsupported backup manifest version %s" % manifest.get("version"))
+	return manifest
+
+
+def getBackupObject(filename, checksum):
+	return path.join(path.dirname(filename), BackupStore.ObjectsDirectory, checksum[:2], checksum)
+
+
+# Returns the content of the file name in the backup, None when the backup
+# does not have it.
+def readBackupFile(filename, name):
+	for entry in loadBackupManifest(filename)["files"]:
+		if entry["path"] == name and entry["type"] == "f":
+			with gzip.open(getBackupObject(filename, entry["sha256"]), "rb") as fd:
+				return fd.read()
+	return None
+
+
+# Restores the files of the backup below destination in one pass over the
+# manifest, only the members and their contents when members are given.
+# Returns the number of restored and failed files.
+def restoreBackup(filename, destination="/", members=None):
+	restored = 0
+	failed = 0
+	for entry in loadBackupManifest(filename)["files"]:
+		if members and not [x for x in members if entry["path"] == x or entry["path"].startswith(x + "/")]:
+			continue
+		try:
+			restoreEntry(filename, entry, path.join(destination, entry["path"]))
+			restored += 1
+		except (IOError, OSError, ValueError) as err:
+			print("[BackupManager] Unable to restore %s:" % entry["path"], err)
+			failed += 1
+	print("[BackupManager] %d files restored from %s, %d failed." % (restored, filename, failed))
+	return restored, failed
+
+
+def restoreEntry(filename, entry, target):
+	if entry["type"] == "d":
+		makedirs(target, exist_ok=True)
+		chmod(target, entry["mode"])
+		return
+	makedirs(path.dirname(target), exist_ok=True)
+	temporary = target + ".restoring"
+	if path.lexists(temporary):
+		remove(temporary)
+	if entry["type"] == "l":
+		symlink(entry["target"], temporary)
+	else:
+		checksum = sha256()
+		with gzip.open(getBackupObject(filename, entry["sha256"]), "rb") as source, open(temporary, "wb") as destination:
+			while True:
+				data = source.read(BackupStore.ChunkSize)
+				if not data:
+					break
+				checksum.update(data)
+				destination.write(data)
+		if checksum.hexdigest() != entry["sha256"]:
+			remove(temporary)
+			raise ValueError("The backup object is damaged")
+		chmod(temporary, entry["mode"])
+	try:
+		lchown(temporary, entry["uid"], entry["gid"])
+	except OSError:
+		pass
+	if entry["type"] == "f":
+		utime(temporary, ns=(entry["mtime"], entry["mtime"]))
+	rename(temporary, target)
+
+
+backupConsole = Console(binary=True)
+
+
+# Extracts the members, or everything, of a backup to / like "tar -xzvf"
+# and calls callback(result, retval, extra_args) when done. Manifests are
+# restored in a thread.
+def extractBackup(filename, members=None, callback=None):
+	if isBackupManifest(filename):
+		def restored(result):
+			if isinstance(result, tuple):
+				retval = 1 if result[1] else 0
+				result = "%d files restored, %d failed" % result
+			else:
+				print("[BackupManager] Restoring %s failed:" % filename, result)
+				retval = 2
+			if callback:
+				callback(str(result), retval, None)
+		threads.deferToThread(restoreBackup, filename, "/", members).addBoth(restored)
+	else:
+		backupConsole.ePopen("tar -xzvf " + filename + " -C /" + "".join([" " + x for x in members or []]), callback)
+
+
 def BackupManagerautostart(reason, session=None, **kwargs):
 	"""called with reason=1 to during /sbin/shutdown.sysvinit, with reason=0 at startup?"""
 	global autoBackupManagerTimer
@@ -273,7 +528,7 @@ class VIXBackupManager(Screen):
 				del self.emlist[:]
 				mtimes = []
 				for fil in images:
-					if fil.endswith(".tar.gz") and "vix" in fil.lower() or fil.startswith("%s" % defaultprefix):
+					if (fil.endswith(".tar.gz") or isBackupManifest(fil)) and "vix" in fil.lower() or fil.startswith("%s" % defaultprefix):
 						if fil.startswith(defaultprefix):   # Ensure the current image backup are sorted to the top
 							prefix = "B"
 						else:
@@ -336,6 +591,8 @@ class VIXBackupManager(Screen):
 		if self.sel is not None:
 			self["list"].moveToIndex(self["list"].getSelectionIndex() if len(self["list"].list) > self["list"].getSelectionIndex() + 1 else max(len(self["list"].list) - 2, 0))  # hold the selection current possition if the list is long enough, else go to last item
 			remove(self.BackupDirectory + self.sel)
+			if isBackupManifest(self.sel):
+				BackupStore(self.BackupDirectory).collectGarbage()
 			self.populate_List()
 
 	def GreenPressed(self):
@@ -368,7 +625,7 @@ class VIXBackupManager(Screen):
 					remove("/tmp/ExtraInstalledPlugins")
 				if path.exists("/tmp/backupkernelversion"):
 					remove("/tmp/backupkernelversion")
-				self.ConsoleB.ePopen("tar -xzvf " + self.BackupDirectory + self.sel + " -C / tmp/ExtraInstalledPlugins tmp/backupkernelversion tmp/backupimageversion", self.settingsRestoreCheck)
+				extractBackup(self.BackupDirectory + self.sel, ["tmp/ExtraInstalledPlugins", "tmp/backupkernelversion", "tmp/backupimageversion"], self.settingsRestoreCheck)
 			else:
 				self.session.open(MessageBox, _("There is no backup to restore."), MessageBox.TYPE_INFO, timeout=10)
 		else:
@@ -482,9 +739,9 @@ class VIXBackupManager(Screen):
 	def Stage1(self, answer=None):
 		print("[BackupManager] Restoring Stage 1:")
 		if answer is True:
-			self.ConsoleB.ePopen("tar -xzvf " + self.BackupDirectory + self.sel + " -C /", self.Stage1SettingsComplete)
+			extractBackup(self.BackupDirectory + self.sel, None, self.Stage1SettingsComplete)
 		elif answer is False:
-			self.ConsoleB.ePopen("tar -xzvf " + self.BackupDirectory + self.sel + " -C / tmp/ExtraInstalledPlugins tmp/backupkernelversion tmp/backupimageversion  tmp/3rdPartyPlugins", self.Stage1PluginsComplete)
+			extractBackup(self.BackupDirectory + self.sel, ["tmp/ExtraInstalledPlugins", "tmp/backupkernelversion", "tmp/backupimageversion", "tmp/3rdPartyPlugins"], self.Stage1PluginsComplete)
 
 	def Stage1SettingsComplete(self, result, retval, extra_args):
 		print("[BackupManager] Restoring Stage 1 RESULT:", result)
@@ -494,7 +751,9 @@ class VIXBackupManager(Screen):
 			self.didSettingsRestore = True
 			self.Stage1Completed = True
 			eDVBDB.getInstance().reloadServicelist()
+			serviceMetadataIndex.invalidate()
 			eDVBDB.getInstance().reloadBouquets()
+			bouquetIndex.invalidate()
 			self.session.nav.PowerTimer.loadTimer()
 			self.session.nav.RecordTimer.loadTimer(justLoad=True)  # Don't check RecordTimers for conflicts. On a restore we may not have the correct tuner configuration (and no USB tuners)...
 			configfile.load()
@@ -735,9 +994,8 @@ class VIXBackupManager(Screen):
 		self.Stage5Completed = True
 		if self.didPluginsRestore or self.didSettingsRestore:
 			if self.didSettingsRestore:
-				self.ConsoleB.ePopen("tar -xzvf " + self.BackupDirectory + self.sel + " -C /" + " etc/enigma2/settings")
-				print("[BackupManager] Restoring Stage 6: restored settings file again")
-				self.ConsoleB.ePopen("killall -9 enigma2 && init 6")
+				print("[BackupManager] Restoring Stage 6: restoring settings file again")
+				extractBackup(self.BackupDirectory + self.sel, ["etc/enigma2/settings"], lambda *args: self.ConsoleB.ePopen("killall -9 enigma2 && init 6"))
 			else:
 				print("[BackupManager] Stage 6 Restoring Completed rebooting")
 				quitMainloop(2)
@@ -961,9 +1219,13 @@ class VIXBackupManagerLogView(TextBox):
 		self.setTitle(_("Logs"))
 		self.skinName = "VIXBackupManagerLogView"
 		filedate = str(date.fromtimestamp(stat(filename).st_mtime))
-		tar = tarfile.open(filename, "r")
-		self["list"].setText("\n".join([_("Backup created") + ": " + filedate + "\n"] + [str(tarinfo.name) for tarinfo in tar]))
-		tar.close()
+		if isBackupManifest(filename):
+			names = [entry["path"] for entry in loadBackupManifest(filename)["files"]]
+		else:
+			tar = tarfile.open(filename, "r")
+			names = [str(tarinfo.name) for tarinfo in tar]
+			tar.close()
+		self["list"].setText("\n".join([_("Backup created") + ": " + filedate + "\n"] + names))
 
 
 class AutoBackupManagerTimer:
@@ -1208,6 +1470,7 @@ class BackupFiles(Screen):
 		config.backupmanager.backupdirs.setValue(self.selectedFiles)
 		config.backupmanager.backupdirs.save()
 		configfile.save()
+		configfile.flush()
 
 		try:
 			if not path.exists(self.BackupDirectory):
@@ -1287,8 +1550,6 @@ class BackupFiles(Screen):
 				output.close()
 		self.Stage4Completed = True
 
-	tar_flist = "/tmp/_backup-files.list"					# Filename for backup list
-
 	def Stage5(self):
 		tmplist = config.backupmanager.backupdirs.value
 		tmplist.append("/tmp/ExtraInstalledPlugins")
@@ -1302,6 +1563,7 @@ class BackupFiles(Screen):
 		config.misc.restorewizardrun.setValue(True)
 		config.misc.restorewizardrun.save()
 		configfile.save()
+		configfile.flush()
 		print("[BackupManager] Backup running")
 		backupdate = datetime.now()
 		backupType = "-"
@@ -1319,26 +1581,26 @@ class BackupFiles(Screen):
 		boxname = ""
 		if config.backupmanager.showboxname.value:
 			boxname = "-" + SystemInfo["machinebuild"]
-		self.Backupfile = self.BackupDirectory + config.backupmanager.folderprefix.value + boxname + "-" + SystemInfo["imagetype"][0:3] + backupType + SystemInfo["imageversion"] + "." + SystemInfo["imagebuild"] + imageSubBuild + "-" + backupdate.strftime("%Y%m%d-%H%M") + ".tar.gz"
-		with open(BackupFiles.tar_flist, "w") as tfl:			# Need to create a list of what to backup, so that spaces and special characters don't get lost on, or mangle, the command line
-			for fn in tmplist:
-				tfl.write(fn + "\n")
-		self.ConsoleB.ePopen("tar -T " + BackupFiles.tar_flist + " -czvf " + self.Backupfile, self.Stage4Complete)
+		self.Backupfile = self.BackupDirectory + config.backupmanager.folderprefix.value + boxname + "-" + SystemInfo["imagetype"][0:3] + backupType + SystemInfo["imageversion"] + "." + SystemInfo["imagebuild"] + imageSubBuild + "-" + backupdate.strftime("%Y%m%d-%H%M") + BackupStore.ManifestSuffix
+		self.backupStore = BackupStore(self.BackupDirectory)
+		try:
+			self.backupStore.create(self.Backupfile, tmplist)
+			result = None
+		except (IOError, OSError) as err:
+			result = err
+		reactor.callFromThread(self.Stage4Complete, result)  # Stage5 is the work of a PythonTask, the result is shown from the main loop
 
-	def Stage4Complete(self, result, retval, extra_args):
+	def Stage4Complete(self, result=None, retval=None, extra_args=None):
 		if path.exists(self.Backupfile):
-			chmod(self.Backupfile, 0o644)
 			print("[BackupManager] Complete.")
+			with open("/var/log/backupmanager.log", "a") as output:
+				output.write(datetime.now().strftime("%Y-%m-%d %H:%M") + ": Backup of %(files)d files finished in %(duration).1f seconds, %(stored)d new files stored\n" % self.backupStore.getStats())
 			remove("/tmp/ExtraInstalledPlugins")
 			self.Stage5Completed = True
 		else:
 			self.session.openWithCallback(self.BackupComplete, MessageBox, _("Backup failed - e. g. wrong backup destination or no space left on backup device."), MessageBox.TYPE_INFO, timeout=10)
 			print("[BackupManager] Result.", result)
 			print("{BackupManager] Backup failed - e. g. wrong backup destination or no space left on backup device")
-		try:  # Delete the list of backup files now that it's finished. Ignore any failure here, as there's nothing useful we could do anyway...
-			remove(BackupFiles.tar_flist)
-		except:
-			pass
 
 	def BackupComplete(self, answer=None):
 		self.Stage1Completed = True
@@ -1354,7 +1616,7 @@ class BackupFiles(Screen):
 				images = listdir(self.BackupDirectory)
 				emlist = []					# Only try to delete backups with the current user prefix
 				for fil in images:
-					if (fil.startswith(config.backupmanager.folderprefix.value) and fil.endswith(".tar.gz")):
+					if (fil.startswith(config.backupmanager.folderprefix.value) and (fil.endswith(".tar.gz") or isBackupManifest(fil))):
 						if config.backupmanager.types_to_prune.value == "all":
 							emlist.append(fil)
 						elif config.backupmanager.types_to_prune.value == "sch" and "-Sch-" in fil:
@@ -1370,6 +1632,7 @@ class BackupFiles(Screen):
 					emlist = emlist[0:len(emlist) - config.backupmanager.number_to_keep.value]
 					for fil in emlist:
 						remove(self.BackupDirectory + fil)
+					BackupStore(self.BackupDirectory).collectGarbage()
 		except:
 			pass
 		if config.backupmanager.schedule.value:
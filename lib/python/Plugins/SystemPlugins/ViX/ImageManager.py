@@ -1,11 +1,15 @@
+from bz2 import BZ2Compressor
+from hashlib import sha256
+from subprocess import PIPE, Popen
 from urllib.parse import urlparse
 from urllib.request import urlopen
+from zipfile import ZIP64_LIMIT, ZIP_DEFLATED, ZIP_STORED, ZipFile, ZipInfo
 import json
 import tempfile
 
 from enigma import eTimer, fbClass
 from os import path, stat, system, mkdir, makedirs, listdir, remove, rename, rmdir, sep as ossep, statvfs, chmod, walk
-from shutil import copy, copyfile, move, rmtree
+from shutil import copy, copyfile, move, rmtree, which
 from time import localtime, time, strftime, mktime
 
 from Components.ActionMap import ActionMap
@@ -673,9 +677,7 @@ class VIXImageManager(Screen):
 
 	def VuKexecCopyimage(self):
 		installedHDD = False
-		with open("/proc/mounts", "r") as fd:
-			lines = fd.readlines()
-		result = [line.strip().split(" ") for line in lines]
+		result = getProcMounts()
 		print("[ImageManager][VuKexecCopyimage] result", result)
 		for item in result:
 			if '/media/hdd' in item[1] and "/dev/sd" in item[0]:
@@ -854,6 +856,128 @@ class AutoImageManagerTimer:
 		# self.close()
 
 
+# Returns the command of the fastest bzip2 compressor found, the block
+# parallel ones use all cores and write normal bzip2 files.
+def getCompressor():
+	for name in ("lbzip2", "pbzip2", "bzip2"):
+		command = which(name)
+		if command:
+			return [command, "-c"]
+	return None
+
+
+# Returns the bytes a process has read so far.
+def getReadBytes(pid):
+	try:
+		with open("/proc/%d/io" % pid, "r") as fd:
+			for line in fd:
+				if line.startswith("rchar:"):
+					return int(line.split()[1])
+	except (IOError, OSError, ValueError):
+		pass
+	return 0
+
+
+# The zip file of an image backup, written directly. The kernel and the root
+# file system archive are streamed into it while they are read instead of
+# being staged on the backup device and then zipped again, their SHA256 sums
+# are computed on the way. The progress and throughput of every stream are
+# shown in its task.
+class ImageArchive:
+	ChunkSize = 1024 * 1024
+
+	def __init__(self, filename):
+		self.filename = filename
+		self.zip = ZipFile(filename, "w", ZIP_DEFLATED)
+		self.checksums = []
+
+	# Adds the data returned by read() as the file name. expected is the
+	# number of input bytes and consumed() returns the input bytes done, for
+	# the progress of compressed streams.
+	def addStream(self, name, read, task, expected, consumed=None):
+		info = ZipInfo(name, localtime()[:6])
+		info.compress_type = ZIP_STORED  # the data is compressed already
+		info.external_attr = 0o644 << 16
+		title = task.name
+		checksum = sha256()
+		written = 0
+		done = 0
+		start = time()
+		with self.zip.open(info, "w", force_zip64=expected > ZIP64_LIMIT) as output:
+			while True:
+				data = read(self.ChunkSize)
+				if not data:
+					break
+				checksum.update(data)
+				output.write(data)
+				written += len(data)
+				done = max(done, consumed() if consumed else written)
+				if expected:
+					task.pos = min(done * 100 // expected, 99)
+				task.name = "%s (%.1f MB/s)" % (title, done / max(time() - start, 0.001) / 1048576)
+		task.name = title
+		self.checksums.append("%s  %s\n" % (checksum.hexdigest(), name))
+		print("[ImageManager] %s: %d bytes read, %d bytes written in %d seconds (%.1f MB/s), SHA256 %s" % (name, done, written, time() - start, done / max(time() - start, 0.001) / 1048576, checksum.hexdigest()))
+
+	def addDevice(self, source, name, task):
+		with open(source, "rb") as fd:
+			size = fd.seek(0, 2)  # block devices have no size in stat()
+			fd.seek(0)
+			self.addStream(name, fd.read, task, size)
+
+	# Adds the source directory as a bzip2 compressed tar file.
+	def addDirectory(self, source, excludes, name, task):
+		info = statvfs(source)
+		expected = (info.f_blocks - info.f_bfree) * info.f_frsize
+		tar = Popen(["/bin/tar", "-cf", "-", "-C", source] + ["--exclude=%s" % exclude for exclude in excludes] + ["."], stdout=PIPE)
+		compressor = getCompressor()
+		if compressor:
+			process = Popen(compressor, stdin=tar.stdout, stdout=PIPE)
+			tar.stdout.close()
+			read = process.stdout.read
+		else:
+			process = None
+			chunks = self.compress(tar.stdout)
+			read = lambda size: next(chunks, b"")
+		try:
+			self.addStream(name, read, task, expected, lambda: getReadBytes(tar.pid))
+		finally:
+			if process:
+				process.stdout.close()
+				process.wait()
+			else:
+				tar.stdout.close()
+			tar.wait()
+		if tar.returncode > 1 or (process and process.returncode):  # tar returns 1 for files changed while they were read
+			raise IOError("Creating %s failed, tar returned %s, the compressor %s" % (name, tar.returncode, process and process.returncode))
+
+	def compress(self, stream):
+		compressor = BZ2Compressor(9)
+		while True:
+			data = stream.read(self.ChunkSize)
+			if not data:
+				break
+			data = compressor.compress(data)
+			if data:
+				yield data
+		yield compressor.flush()
+
+	def addFile(self, source, name):
+		self.zip.write(source, name)
+
+	def close(self):
+		self.zip.writestr("checksums.sha256", "".join(self.checksums))
+		self.zip.close()
+
+	def abort(self):
+		try:
+			self.zip.close()
+		except Exception:
+			pass
+		if path.exists(self.filename):
+			remove(self.filename)
+
+
 class ImageBackup(Screen):
 	skin = ["""
 	<screen name="VIXImageManager" position="center,center" size="%d,%d">
@@ -958,6 +1082,10 @@ class ImageBackup(Screen):
 		self.Stage4Completed = False
 		self.Stage5Completed = False
 		self.Stage6Completed = False
+		# The kernel and a tar.bz2 root file system are streamed into the zip.
+		# mkupdate builds usb_update.bin from the kernel and root file system in WORKDIR, so those are not streamed.
+		self.streamBackup = self.EMMCIMG != "usb_update.bin" and "jffs2" not in self.ROOTFSTYPE.split() and not ("ubi" in self.ROOTFSTYPE.split() and self.ROOTFSTYPE != "octagonubi")
+		self.archive = None
 
 	def createBackupJob(self):
 		job = Components.Task.Job(_("Image manager"))
@@ -976,19 +1104,21 @@ class ImageBackup(Screen):
 
 		task = Components.Task.PythonTask(job, _("Backing up kernel..."))
 		task.work = self.doBackup1
-		task.weighting = 5
+		task.weighting = 35 if self.streamBackup else 5
+		self.kernelTask = task
 
 		task = Components.Task.ConditionTask(job, _("Backing up kernel..."), timeoutCount=900)
 		task.check = lambda: self.Stage1Completed
-		task.weighting = 35
+		task.weighting = 5 if self.streamBackup else 35
 
 		task = Components.Task.PythonTask(job, _("Backing up root file system..."))
 		task.work = self.doBackup2
-		task.weighting = 5
+		task.weighting = 15 if self.streamBackup else 5
+		self.rootTask = task
 
 		task = Components.Task.ConditionTask(job, _("Backing up root file system..."), timeoutCount=2700)
 		task.check = lambda: self.Stage2Completed
-		task.weighting = 15
+		task.weighting = 5 if self.streamBackup else 15
 
 		task = Components.Task.PythonTask(job, _("Backing up eMMC partitions for USB flash ..."))
 		task.work = self.doBackup3
@@ -1126,6 +1256,21 @@ class ImageBackup(Screen):
 		if SystemInfo["canMultiBoot"]:
 			slot = SystemInfo["MultiBootSlot"]
 		print("[ImageManager] Stage1: Making Kernel Image.")
+		if self.streamBackup:
+			if SystemInfo["HasKexecMultiboot"] and slot != 0:
+				source = "/boot/%s" % SystemInfo["canMultiBoot"][slot]["kernel"].rsplit("/", 1)[1]
+			else:
+				source = "/dev/%s" % self.MTDKERNEL
+			self.archive = ImageArchive(self.getArchiveName())
+			try:
+				self.archive.addDevice(source, self.getArchivePath(self.KERNELFILE), self.kernelTask)
+			except Exception:
+				self.archive.abort()
+				self.archive = None
+				raise
+			self.Stage1Completed = True
+			print("[ImageManager] Stage1: Complete.")
+			return
 		if "bin" or "uImage" in self.KERNELFILE:
 			if SystemInfo["HasKexecMultiboot"]:
 				# boot = "boot" if slot > 0 and slot < 4 else "dev/%s/%s"  %(self.MTDROOTFS, self.ROOTFSSUBDIR)
@@ -1206,12 +1351,24 @@ class ImageBackup(Screen):
 					self.commands.append("mount /dev/%s %s/root" % (self.MTDROOTFS, self.TMPDIR))
 			else:
 				self.commands.append("mount --bind / %s/root" % self.TMPDIR)
+			excludes = ["./var/nmbd", "./.resizerootfs", "./.resize-rootfs", "./.resize-linuxrootfs", "./.resize-userdata", "./var/lib/samba/private/msg.sock"]
+			source = "%s/root" % self.TMPDIR
 			if SystemInfo["canMultiBoot"] and SystemInfo["MultiBootSlot"] == 0:
-				self.commands.append("/bin/tar -jcf %s/rootfs.tar.bz2 -C %s/root --exclude ./var/nmbd --exclude ./.resizerootfs --exclude ./linuxrootfs* --exclude ./.resize-rootfs --exclude ./.resize-linuxrootfs --exclude ./.resize-userdata --exclude ./var/lib/samba/private/msg.sock ." % (self.WORKDIR, self.TMPDIR))
+				excludes.insert(2, "./linuxrootfs*")
 			elif SystemInfo["HasRootSubdir"]:
-				self.commands.append("/bin/tar -jcf %s/rootfs.tar.bz2 -C %s/root/%s --exclude ./var/nmbd --exclude ./.resizerootfs --exclude ./.resize-rootfs --exclude ./.resize-linuxrootfs --exclude ./.resize-userdata --exclude ./var/lib/samba/private/msg.sock ." % (self.WORKDIR, self.TMPDIR, self.ROOTFSSUBDIR))
+				source = "%s/root/%s" % (self.TMPDIR, self.ROOTFSSUBDIR)
+			if self.archive:
+				for command in self.commands:  # the mount
+					system(command)
+				self.commands = []
+				try:
+					self.archive.addDirectory(source, excludes, self.getArchivePath(self.ROOTFSFILE), self.rootTask)
+				except Exception:
+					self.archive.abort()
+					self.archive = None
+					raise
 			else:
-				self.commands.append("/bin/tar -jcf %s/rootfs.tar.bz2 -C %s/root --exclude ./var/nmbd --exclude ./.resizerootfs --exclude ./.resize-rootfs --exclude ./.resize-linuxrootfs --exclude ./.resize-userdata --exclude ./var/lib/samba/private/msg.sock ." % (self.WORKDIR, self.TMPDIR))
+				self.commands.append("/bin/tar -jcf %s/rootfs.tar.bz2 -C %s %s ." % (self.WORKDIR, source, " ".join(["--exclude %s" % exclude for exclude in excludes])))
 			self.commands.append("sync")
 			if SystemInfo["model"] in ("gb7252", "gbx34k"):
 				self.commands.append("dd if=/dev/mmcblk0p1 of=%s/boot.bin" % self.WORKDIR)
@@ -1407,7 +1564,9 @@ class ImageBackup(Screen):
 			if fileExists("/usr/share/apploader.bin"):
 				system("cp -f /usr/share/apploader.bin %s/apploader.bin" % self.MAINDEST2)
 
-		if "bin" or "uImage" in self.KERNELFILE and path.exists("%s/vmlinux.bin" % self.WORKDIR):
+		if self.archive:
+			pass  # the kernel and root file system are in the zip already
+		elif "bin" or "uImage" in self.KERNELFILE and path.exists("%s/vmlinux.bin" % self.WORKDIR):
 			move("%s/vmlinux.bin" % self.WORKDIR, "%s/%s" % (self.MAINDEST, self.KERNELFILE))
 		else:
 			move("%s/vmlinux.gz" % self.WORKDIR, "%s/%s" % (self.MAINDEST, self.KERNELFILE))
@@ -1427,7 +1586,7 @@ class ImageBackup(Screen):
 				else:
 					self.h9root = False
 					move("%s/rootfs.%s" % (self.WORKDIR, self.ROOTFSTYPE), "%s/%s" % (self.MAINDEST, self.ROOTFSFILE))
-		else:
+		elif not self.archive:
 			move("%s/rootfs.%s" % (self.WORKDIR, self.ROOTFSTYPE), "%s/%s" % (self.MAINDEST, self.ROOTFSFILE))
 
 		if SystemInfo["model"] in ("gb7252", "gbx34k"):
@@ -1478,7 +1637,7 @@ class ImageBackup(Screen):
 			remove(self.swapdevice + config.imagemanager.folderprefix.value + "-" + SystemInfo["machinebuild"] + "-" + SystemInfo["imagetype"] + "-swapfile_backup")
 		if path.exists(self.WORKDIR):
 			rmtree(self.WORKDIR)
-		if (path.exists(self.MAINDEST + "/" + self.ROOTFSFILE) and path.exists(self.MAINDEST + "/" + self.KERNELFILE)) or (SystemInfo["model"] in ("h9", "i55plus") and self.h9root):
+		if self.archive or (path.exists(self.MAINDEST + "/" + self.ROOTFSFILE) and path.exists(self.MAINDEST + "/" + self.KERNELFILE)) or (SystemInfo["model"] in ("h9", "i55plus") and self.h9root):
 			for root, dirs, files in walk(self.MAINDEST):
 				for momo in dirs:
 					chmod(path.join(root, momo), 0o644)
@@ -1494,7 +1653,24 @@ class ImageBackup(Screen):
 		self.Stage5Completed = True
 		print("[ImageManager] Stage5: Complete.")
 
+	def getArchiveName(self):
+		if SystemInfo["HasRootSubdir"]:
+			return "%s/%s-%s-%s-%s-%s%s_mmc.zip" % (self.BackupDirectory, self.IMAGEDISTRO, self.DISTROVERSION, self.DISTROBUILD, self.MODEL, self.BackupDate, self.VuSlot0)
+		return self.MAINDESTROOT + ".zip"
+
+	def getArchivePath(self, filename):
+		return path.relpath(path.join(self.MAINDEST, filename), self.MAINDESTROOT)
+
 	def doBackup6(self):
+		if self.archive:
+			for root, dirs, files in walk(self.MAINDESTROOT):
+				for filename in sorted(files):
+					self.archive.addFile(path.join(root, filename), path.relpath(path.join(root, filename), self.MAINDESTROOT))
+			self.archive.close()
+			self.archive = None
+			rmtree(self.MAINDESTROOT)
+			self.Stage6Complete()
+			return
 		self.commands = []
 		if SystemInfo["HasRootSubdir"]:
 			self.commands.append("7za a -r -bt -bd %s/%s-%s-%s-%s-%s%s_mmc.zip %s/*" % (self.BackupDirectory, self.IMAGEDISTRO, self.DISTROVERSION, self.DISTROBUILD, self.MODEL, self.BackupDate, self.VuSlot0, self.MAINDESTROOT))
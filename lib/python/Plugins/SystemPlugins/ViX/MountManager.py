@@ -9,6 +9,7 @@ from Components.Label import Label
 from Components.ConfigList import ConfigListScreen
 from Components.config import getConfigListEntry, ConfigSelection, NoSave
 from Components.Console import Console
+from Components.Harddisk import getProcMounts
 from Components.Sources.List import List
 from Components.SystemInfo import SystemInfo, BoxInfo
 from Screens.MessageBox import MessageBox
@@ -122,22 +123,12 @@ def buildPartitionInfo(partition, partitionList):
 	_format = _("unavailable")
 	rw = _("None")
 
-	with open("/proc/mounts", "r") as f:
-		for line in f.readlines():
-			if line.find(partition) != -1:
-				parts = line.strip().split()
-				mediamount = parts[1]		# media mount e.g. /media/xxxxx
-				_format = parts[2]		# _format e.g. ext4
-# Also, map any fuseblk fstype to the real file-system behind it...
-# Use blkid to get the info we need....
-#
-				if _format == 'fuseblk':
-					import subprocess
-					res = subprocess.run(['blkid', '-sTYPE', '-ovalue', parts[0]], capture_output=True)
-					if res.returncode == 0:
-						_format = res.stdout.decode().strip()
-				rw = parts[3]			# read/write
-				break
+	for parts in getProcMounts():  # A fuseblk fstype is already mapped to the real file-system behind it.
+		if " ".join(parts).find(partition) != -1:
+			mediamount = parts[1]		# media mount e.g. /media/xxxxx
+			_format = parts[2]		# _format e.g. ext4
+			rw = parts[3]			# read/write
+			break
 	print("[MountManager1][buildPartitionInfo] mediamount", mediamount)
 	if mediamount == "/" and SystemInfo["HasKexecMultiboot"]:
 		return
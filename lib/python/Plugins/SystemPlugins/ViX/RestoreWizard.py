@@ -1,5 +1,5 @@
 from os import listdir, path, stat
-from .BackupManager import isRestorableSettings, isRestorablePlugins, isRestorableKernel
+from .BackupManager import extractBackup, isBackupManifest, isRestorableSettings, isRestorablePlugins, isRestorableKernel
 
 from Components.About import about
 from Components.config import config
@@ -57,7 +57,7 @@ class RestoreWizard(WizardLanguage, Rc):
 					files = []
 				if len(files):
 					for file in files:
-						if file.endswith(".tar.gz") and "vix" in file.lower() or file.startswith("%s" % defaultprefix):
+						if (file.endswith(".tar.gz") or isBackupManifest(file)) and "vix" in file.lower() or file.startswith("%s" % defaultprefix):
 							mtimes.append((path.join(devpath, file), stat(path.join(devpath, file)).st_mtime))  # (filname, mtime)
 		for file in [x[0] for x in sorted(mtimes, key=lambda x: x[1], reverse=True)]:  # sort by mtime
 			list.append((file, file))
@@ -129,17 +129,18 @@ class RestoreWizard(WizardLanguage, Rc):
 				text = createInfo(slot)
 				bootmviSlot(text=text, slot=slot)
 			if self.didSettingsRestore:
-				self.Console.ePopen("tar -xzvf " + self.fullbackupfilename + " -C /" + " etc/enigma2/settings")
-			self.Console.ePopen("killall -9 enigma2 && init 6")
+				extractBackup(self.fullbackupfilename, ["etc/enigma2/settings"], lambda *args: self.Console.ePopen("killall -9 enigma2 && init 6"))
+			else:
+				self.Console.ePopen("killall -9 enigma2 && init 6")
 		elif self.NextStep == "settingsquestion" or self.NextStep == "settingsrestore" or self.NextStep == "pluginsquestion" or self.NextStep == "pluginsrestoredevice" or self.NextStep == "end" or self.NextStep == "noplugins":
 			self.buildListfinishedCB(False)
 		elif self.NextStep == "settingrestorestarted":
-			self.Console.ePopen("tar -xzvf " + self.fullbackupfilename + " -C / tmp/ExtraInstalledPlugins tmp/backupkernelversion tmp/backupimageversion", self.settingsRestore_Started)
+			extractBackup(self.fullbackupfilename, ["tmp/ExtraInstalledPlugins", "tmp/backupkernelversion", "tmp/backupimageversion"], self.settingsRestore_Started)
 			self.buildListRef = self.session.openWithCallback(self.buildListfinishedCB, MessageBox, _("Please wait while the system gathers information..."), type=MessageBox.TYPE_INFO, enable_input=False, wizard=True)
 			self.buildListRef.setTitle(_("Restore wizard"))
 		elif self.NextStep == "plugindetection":
 			print("[RestoreWizard] Stage 2: Restoring plugins")
-			self.Console.ePopen("tar -xzvf " + self.fullbackupfilename + "  -C / tmp/ExtraInstalledPlugins tmp/backupkernelversion tmp/backupimageversion", self.pluginsRestore_Started)
+			extractBackup(self.fullbackupfilename, ["tmp/ExtraInstalledPlugins", "tmp/backupkernelversion", "tmp/backupimageversion"], self.pluginsRestore_Started)
 			self.buildListRef = self.session.openWithCallback(self.buildListfinishedCB, MessageBox, _("Please wait while the system gathers information..."), type=MessageBox.TYPE_INFO, enable_input=False, wizard=True)
 			self.buildListRef.setTitle(_("Restore wizard"))
 		elif self.NextStep == "pluginrestore":
@@ -201,7 +202,7 @@ class RestoreWizard(WizardLanguage, Rc):
 
 	def doRestoreSettings2(self):
 		print("[RestoreWizard] Stage 2: Restoring settings")
-		self.Console.ePopen("tar -xzvf " + self.fullbackupfilename + " -C /", self.settingRestore_Finished)
+		extractBackup(self.fullbackupfilename, None, self.settingRestore_Finished)
 		self.pleaseWait = self.session.open(MessageBox, _("Please wait while settings restore completes..."), type=MessageBox.TYPE_INFO, enable_input=False, wizard=True)
 		self.pleaseWait.setTitle(_("Restore wizard"))
 
@@ -1,7 +1,13 @@
 import re
-from os import path, makedirs, remove, rename, symlink, mkdir, listdir, unlink
+from glob import glob
+from os import path, kill, makedirs, remove, rename, symlink, mkdir, listdir, truncate, unlink
 from datetime import datetime
-from time import time, sleep
+from shutil import copyfile, rmtree
+from signal import SIGKILL
+from time import time
+from urllib.error import HTTPError, URLError
+from urllib.request import urlopen
+from twisted.internet import threads
 from enigma import eTimer, eConsoleAppContainer
 
 from Components.ActionMap import ActionMap
@@ -15,7 +21,6 @@ from Components.PluginComponent import plugins
 from Components.ScrollLabel import ScrollLabel
 from Components.Sources.StaticText import StaticText
 from Components.SystemInfo import SystemInfo
-import Components.Task
 from Screens.Screen import Screen
 from Screens.MessageBox import MessageBox
 from Tools.Directories import resolveFilename, SCOPE_PLUGINS
@@ -26,8 +31,6 @@ config.softcammanager.softcamtimerenabled = ConfigYesNo(default=False)
 config.softcammanager.softcamtimer = ConfigNumber(default=6)
 config.softcammanager.showinextensions = ConfigYesNo(default=False)
 
-softcamautopoller = None
-
 
 def updateExtensions(configElement):
 	plugins.clearPluginList()
@@ -39,7 +42,6 @@ config.softcammanager.showinextensions.addNotifier(updateExtensions, initial_cal
 
 def SoftcamAutostart(reason, session=None, **kwargs):
 	"""called with reason=1 to during shutdown, with reason=0 at startup?"""
-	global softcamautopoller
 	if reason == 0:
 		link = "/etc/init.d/softcam"
 		print("[SoftcamAutostart] config.misc.softcams.value=%s" % (config.misc.softcams.value))
@@ -52,15 +54,9 @@ def SoftcamAutostart(reason, session=None, **kwargs):
 			eConsoleAppContainer().execute(cmd)
 		else:
 			print("[SoftcamManager] AutoStart Enabled")
-			if path.exists("/tmp/SoftcamsDisableCheck"):
-				remove("/tmp/SoftcamsDisableCheck")
-			softcamautopoller = SoftcamAutoPoller()
-			softcamautopoller.start()
+			softcamSupervisor.start()
 	elif reason == 1:
-		# Stop Poller
-		if softcamautopoller is not None:
-			softcamautopoller.stop()
-			softcamautopoller = None
+		softcamSupervisor.stop()
 
 
 def spinnerSkin(skinName):
@@ -139,7 +135,6 @@ class VIXSoftcamManager(Screen):
 		self.currentactivecam = ""
 		self.activityTimer = eTimer()
 		self.activityTimer.timeout.get().append(self.getActivecam)
-		self.Console = Console()
 		self.showActivecam()
 		if self.selectionChanged not in self["list"].onSelectionChanged:
 			self["list"].onSelectionChanged.append(self.selectionChanged)
@@ -213,33 +208,17 @@ class VIXSoftcamManager(Screen):
 		active = []
 		for x in self["list"].list:
 			active.append(x[0][0])
-		activelist = ",".join(active)
-		if activelist:
-			self.Console.ePopen("ps.procps -C " + activelist + " | grep -v 'CMD' | sed 's/</ /g' | awk '{print $4}' | awk '{a[$1] = $0} END { for (x in a) { print a[x] } }'", self.showActivecam2)
-		else:
-			self["activecam"].setText("")
-			self["activecam"].show()
-		# self.Console.ePopen("ps.procps | grep softcams | grep -v 'grep' | sed 's/</ /g' | awk '{print $5}' | awk '{a[$1] = $0} END { for (x in a) { print a[x] } }' | awk -F'[/] '{print $4}'", self.showActivecam2)
-
-	def showActivecam2(self, result, retval, extra_args):
-		if retval == 0:
-			self.currentactivecamtemp = result
-			self.currentactivecam = "".join([s for s in self.currentactivecamtemp.splitlines(True) if s.strip("\r\n")])
-			self.currentactivecam = self.currentactivecam.replace("\n", ", ")
-			if path.exists("/tmp/SoftcamsScriptsRunning"):
-				file = open("/tmp/SoftcamsScriptsRunning")
-				SoftcamsScriptsRunning = file.read()
-				file.close()
-				SoftcamsScriptsRunning = SoftcamsScriptsRunning.replace("\n", ", ")
-				self.currentactivecam += SoftcamsScriptsRunning
+		if active:
+			self.currentactivecam = "".join([x + ", " for x in softcamSupervisor.getActiveCams(active)])
 			self["activecam"].setText(self.currentactivecam)
 			print("[SoftcamManager] Active:%s ScriptCam=%s" % (self.currentactivecam, config.misc.softcams.value))
 			if config.misc.softcams.value != "None":
 				self["activecam"].setText("SoftcamScript running")
 			self["activecam"].show()
+			self.selectionChanged()
 		else:
-			print("[SoftcamManager] RESULT FAILED: " + str(result))
-		self.selectionChanged()
+			self["activecam"].setText("")
+			self["activecam"].show()
 
 	def keyStart(self):
 		cams = []
@@ -294,26 +273,14 @@ class VIXSoftcamManager(Screen):
 			cams = listdir("/usr/softcams")
 		if cams:
 			self.sel = self["list"].getCurrent()[0]
-			selectedcam = self.sel[0]
-			self.Console.ePopen("pidof " + selectedcam, self.keyRestart, selectedcam)
+			self.keyRestart(self.sel[0])
 
-	def keyRestart(self, result, retval, extra_args):
-		selectedcam = extra_args
+	def keyRestart(self, selectedcam):
 		strpos = self.currentactivecam.find(selectedcam)
 		if strpos < 0:
 			return
 		else:
-			if retval == 0:
-				stopcam = result
-				print("[SoftcamManager] Stopping " + selectedcam + " PID " + stopcam.replace("\n", ""))
-				output = open("/tmp/cam.check.log", "a")
-				now = datetime.now()
-				output.write(now.strftime("%Y-%m-%d %H:%M") + ": Stopping: " + selectedcam + "\n")
-				output.close()
-				self.Console.ePopen("kill -9 " + stopcam.replace("\n", ""))
-				sleep(4)
-			else:
-				print("[SoftcamManager] RESULT FAILED: " + result)
+			softcamSupervisor.stopCam(selectedcam)
 			if selectedcam.lower().startswith("cccam") and path.exists("/etc/CCcam.cfg"):
 				if self.currentactivecam.lower().find("mgcam") < 0:
 					self.session.openWithCallback(self.showActivecam, VIXStartCam, self.sel[0])
@@ -366,7 +333,6 @@ class VIXStartCam(Screen):
 		global startselectedcam
 		startselectedcam = selectedcam
 		# print("[SoftcamManager][VIXStartCam] init selectedCam=%s" % selectedcam)
-		self.Console = Console()
 		self.activityTimer = eTimer()
 		self.activityTimer.timeout.get().append(self.updatepix)
 		self.onShow.append(self.startShow)
@@ -375,70 +341,7 @@ class VIXStartCam(Screen):
 	def startShow(self):
 		self.count = 0
 		self["connect"].setPixmapNum(0)
-		if startselectedcam.endswith(".sh"):
-			if path.exists("/tmp/SoftcamsScriptsRunning"):
-				file = open("/tmp/SoftcamsScriptsRunning")
-				data = file.read()
-				file.close()
-				if data.find(startselectedcam) >= 0:
-					filewrite = open("/tmp/SoftcamsScriptsRunning.tmp", "w")
-					fileread = open("/tmp/SoftcamsScriptsRunning")
-					filewrite.writelines([cam for cam in fileread.readlines() if startselectedcam not in cam])
-					fileread.close()
-					filewrite.close()
-					rename("/tmp/SoftcamsScriptsRunning.tmp", "/tmp/SoftcamsScriptsRunning")
-				elif data.find(startselectedcam) < 0:
-					fileout = open("/tmp/SoftcamsScriptsRunning", "a")
-					line = startselectedcam + "\n"
-					fileout.write(line)
-					fileout.close()
-			else:
-				fileout = open("/tmp/SoftcamsScriptsRunning", "w")
-				line = startselectedcam + "\n"
-				fileout.write(line)
-				fileout.close()
-			print("[SoftcamManager] Starting " + startselectedcam)
-			output = open("/tmp/cam.check.log", "a")
-			now = datetime.now()
-			output.write(now.strftime("%Y-%m-%d %H:%M") + ": Starting " + startselectedcam + "\n")
-			output.close()
-			self.Console.ePopen("/usr/softcams/" + startselectedcam + " start")
-		else:
-			if path.exists("/tmp/SoftcamsDisableCheck"):
-				file = open("/tmp/SoftcamsDisableCheck")
-				data = file.read()
-				file.close()
-				if data.find(startselectedcam) >= 0:
-					output = open("/tmp/cam.check.log", "a")
-					now = datetime.now()
-					output.write(now.strftime("%Y-%m-%d %H:%M") + ": Initialised timed check for " + stopselectedcam + "\n")
-					output.close()
-					fileread = open("/tmp/SoftcamsDisableCheck")
-					filewrite = open("/tmp/SoftcamsDisableCheck.tmp", "w")
-					filewrite.writelines([cam for cam in fileread.readlines() if startselectedcam not in cam])
-					fileread.close()
-					filewrite.close()
-					rename("/tmp/SoftcamsDisableCheck.tmp", "/tmp/SoftcamsDisableCheck")
-			print("[SoftcamManager] Starting " + startselectedcam)
-			output = open("/tmp/cam.check.log", "a")
-			now = datetime.now()
-			output.write(now.strftime("%Y-%m-%d %H:%M") + ": Starting " + startselectedcam + "\n")
-			output.close()
-			if startselectedcam.lower().startswith("hypercam"):
-				self.Console.ePopen("ulimit -s 1024;/usr/softcams/" + startselectedcam + " -c /etc/hypercam.cfg")
-			elif startselectedcam.lower().startswith("oscam"):
-				# print("[SoftcamManager][VIXStartCam] ePopen start command selectedCam=%s" % startselectedcam)
-				self.Console.ePopen("rm -rf /tmp/.ncam /tmp/*.pid* /tmp/ncam.* /tmp/*.ncam /tmp/status.*")
-				self.Console.ePopen("ulimit -s 1024;/usr/softcams/" + startselectedcam + " -b")
-			elif startselectedcam.lower().startswith("ncam"):
-				self.Console.ePopen("rm -rf /tmp/.oscam /tmp/*.pid* /tmp/oscam.* /tmp/*.oscam /tmp/status.*")
-				self.Console.ePopen("ulimit -s 1024;/usr/softcams/" + startselectedcam + " -b")
-			elif startselectedcam.lower().startswith("gbox"):
-				self.Console.ePopen("ulimit -s 1024;/usr/softcams/" + startselectedcam)
-				sleep(3)
-				self.Console.ePopen("start-stop-daemon --start --quiet --background --exec /usr/bin/gbox")
-			else:
-				self.Console.ePopen("ulimit -s 1024;/usr/softcams/" + startselectedcam)
+		softcamSupervisor.startCam(startselectedcam)
 		self.activityTimer.start(1)
 
 	def updatepix(self):
@@ -468,71 +371,16 @@ class VIXStopCam(Screen):
 			VIXStopCam.skin = spinnerSkin("VIXStopCam")
 		self["connect"] = MultiPixmap()
 		self["lab1"] = Label(_("Please wait while stopping\n") + selectedcam + "...")
-		self.Console = Console()
 		self.activityTimer = eTimer()
 		self.activityTimer.timeout.get().append(self.updatepix)
 		self.onShow.append(self.getStopPID)
 		self.onClose.append(self.delTimer)
 
 	def getStopPID(self):
-		if stopselectedcam.endswith(".sh"):
-			self.curpix = 0
-			self.count = 0
-			self["connect"].setPixmapNum(0)
-			print("[SoftcamManager] Stopping " + stopselectedcam)
-			output = open("/tmp/cam.check.log", "a")
-			now = datetime.now()
-			output.write(now.strftime("%Y-%m-%d %H:%M") + ": Stopping " + stopselectedcam + "\n")
-			output.close()
-			self.Console.ePopen("/usr/softcams/" + stopselectedcam + " stop")
-			if path.exists("/tmp/SoftcamsScriptsRunning"):
-				remove("/tmp/SoftcamsScriptsRunning")
-			if path.exists("/etc/SoftcamsAutostart"):
-				file = open("/etc/SoftcamsAutostart")
-				data = file.read()
-				file.close()
-				if data.find(stopselectedcam) >= 0:
-					print("[SoftcamManager] Temporarily disabled timed check for " + stopselectedcam)
-					output = open("/tmp/cam.check.log", "a")
-					now = datetime.now()
-					output.write(now.strftime("%Y-%m-%d %H:%M") + ": Temporarily disabled timed check for " + stopselectedcam + "\n")
-					output.close()
-					fileout = open("/tmp/SoftcamsDisableCheck", "a")
-					line = stopselectedcam + "\n"
-					fileout.write(line)
-					fileout.close()
-			self.activityTimer.start(1)
-		else:
-			# print("[SoftcamManager][VIXStopCam] ePopen start command selectedCam=%s" % stopselectedcam)
-			self.Console.ePopen("pidof " + stopselectedcam, self.startShow)
-
-	def startShow(self, result, retval, extra_args):
-		if retval == 0:
-			self.count = 0
-			self["connect"].setPixmapNum(0)
-			stopcam = result
-			print("[SoftcamManager][startShow] stopcam=%s" % stopcam)
-			if path.exists("/etc/SoftcamsAutostart"):
-				file = open("/etc/SoftcamsAutostart")
-				data = file.read()
-				file.close()
-				if data.find(stopselectedcam) >= 0:
-					print("[SoftcamManager] Temporarily disabled timed check for " + stopselectedcam)
-					output = open("/tmp/cam.check.log", "a")
-					now = datetime.now()
-					output.write(now.strftime("%Y-%m-%d %H:%M") + ": Temporarily disabled timed check for " + stopselectedcam + "\n")
-					output.close()
-					fileout = open("/tmp/SoftcamsDisableCheck", "a")
-					line = stopselectedcam + "\n"
-					fileout.write(line)
-					fileout.close()
-			print("[SoftcamManager] Stopping " + stopselectedcam + " PID " + stopcam.replace("\n", ""))
-			output = open("/tmp/cam.check.log", "a")
-			now = datetime.now()
-			output.write(now.strftime("%Y-%m-%d %H:%M") + ": Stopping " + stopselectedcam + "\n")
-			output.close()
-			self.Console.ePopen("kill -9 " + stopcam.replace("\n", ""))
-			self.activityTimer.start(1)
+		self.count = 0
+		self["connect"].setPixmapNum(0)
+		softcamSupervisor.stopCam(stopselectedcam)
+		self.activityTimer.start(1)
 
 	def updatepix(self):
 		self.activityTimer.stop()
@@ -562,12 +410,11 @@ class VIXSoftcamLog(Screen):
 		Screen.__init__(self, session)
 		self.setTitle(_("Logs"))
 
-		if path.exists("/var/volatile/tmp/cam.check.log"):
-			file = open("/var/volatile/tmp/cam.check.log")
-			softcamlog = file.read()
-			file.close()
-		else:
-			softcamlog = ""
+		softcamlog = ""
+		for filename in ("/var/volatile/tmp/cam.check.log.1", "/var/volatile/tmp/cam.check.log"):
+			if path.exists(filename):
+				with open(filename) as file:
+					softcamlog += file.read()
 		self["list"] = ScrollLabel(str(softcamlog))
 		self["setupActions"] = ActionMap(["SetupActions", "ColorActions", "DirectionActions"],
 			{
@@ -581,11 +428,89 @@ class VIXSoftcamLog(Screen):
 		self.close()
 
 
-class SoftcamAutoPoller:
-	"""Automatically Poll SoftCam"""
+# Returns the name of the program a process runs, None when there is no such
+# process. Zombies have no command line and are reported as "".
+def getProcessName(pid):
+	try:
+		with open("/proc/%d/cmdline" % pid, "rb") as fd:
+			return path.basename(fd.read().split(b"\0")[0].decode("UTF-8", "replace"))
+	except (IOError, OSError):
+		return None
+
+
+# Returns {name: [pid]} of the processes running the named programs, read
+# from /proc instead of spawning ps or pidof.
+def findProcesses(names):
+	found = {}
+	for pid in listdir("/proc"):
+		if pid.isdigit():
+			name = getProcessName(int(pid))
+			if name in names:
+				found.setdefault(name, []).append(int(pid))
+	return found
+
+
+# Returns whether the web interface on the port answers. A refused connection
+# counts as an answer like it always did, the cam only runs without it.
+def isResponding(url):
+	try:
+		urlopen(url, timeout=SoftcamSupervisor.FreezeTimeout).close()
+	except HTTPError:
+		pass
+	except URLError as err:
+		return isinstance(err.reason, ConnectionRefusedError)
+	except (IOError, OSError):
+		return False
+	return True
+
+
+class SupervisedCam:
+	def __init__(self, name):
+		self.name = name
+		self.pid = None
+		self.container = None
+		self.started = 0  # time of the last start
+		self.crashes = 0  # crashes since it last ran stable
+		self.restartTime = None  # time of the pending restart
+
+
+# Starts the softcams and keeps the autostart ones running. The cams are
+# started from enigma2 and found by name in /proc, their pid is then checked
+# every second and the exit of a cam running in the foreground is reported by
+# its container right away. A crashed cam is restarted on the next check,
+# repeated crashes wait longer and longer. Killed cams are waited for by a
+# timer and cams are only started once they are gone, they may still hold
+# their ports and files. The web interfaces of OScam, Ncam and CCcam are
+# checked for freezes every configured period. Cams stopped by the user are
+# left alone until they are started again.
+class SoftcamSupervisor:
+	CamDirectory = "/usr/softcams/"
+	LogFile = "/tmp/cam.check.log"
+	CheckInterval = 1000  # msec between the checks of the supervised cams
+	StartTimeout = 15  # seconds a started cam has to show up in /proc
+	RestartDelays = (0, 1, 2, 5, 10, 30, 60)  # seconds before a restart after 1, 2, ... crashes in a row
+	StableTime = 300  # seconds a cam has to run before its crashes are forgotten
+	StopTimeout = 4  # seconds to wait for a killed cam to exit
+	StopCheckInterval = 100  # msec between the checks of the killed cams
+	FreezeTimeout = 2  # seconds the web interface has to answer
+	LogSize = 40000  # bytes a log file may grow before it is rotated
+	LogCheckInterval = 60  # seconds between the log size checks
 
 	def __init__(self):
-		# Init Timer
+		self.cams = {}  # cam name -> SupervisedCam of the supervised autostart cams
+		self.scripts = []  # started cam scripts
+		self.console = Console()
+		self.checkTimer = eTimer()
+		self.checkTimer.callback.append(self.check)
+		self.kills = []  # [pids, timeout] of the killed cams not gone yet
+		self.startQueue = []  # SupervisedCam of the cams to start once the killed cams are gone
+		self.killTimer = eTimer()
+		self.killTimer.callback.append(self.checkKills)
+		self.supervising = False
+		self.freezeTime = 0
+		self.logTime = 0
+
+	def start(self):
 		if not path.exists("/usr/softcams"):
 			mkdir("/usr/softcams", 0o755)
 		if not path.exists("/etc/scce"):
@@ -602,303 +527,261 @@ class SoftcamAutoPoller:
 			symlink("/usr/keys", "/etc/keys")
 		if not path.islink("/var/scce"):
 			symlink("/etc/scce", "/var/scce")
-		self.timer = eTimer()
-
-	def start(self):
-		if self.softcam_check not in self.timer.callback:
-			self.timer.callback.append(self.softcam_check)
-		self.timer.startLongTimer(1)
+		self.supervising = config.softcammanager.softcamtimerenabled.value
+		self.log("Supervision enabled" if self.supervising else "Supervision disabled")
+		self.freezeTime = time() + config.softcammanager.softcamtimer.value * 60
+		running = findProcesses(self.getAutostartCams())
+		for name in self.getAutostartCams():
+			if name.endswith(".sh"):
+				if name not in self.scripts:
+					self.startCam(name)
+			elif name in running:
+				print("[SoftcamManager] " + name + " already running")
+				self.log(name + " running OK")
+				cam = self.cams[name] = SupervisedCam(name)
+				cam.pid = running[name][0]
+				cam.started = time()
+			else:
+				self.log("Couldn't find " + name + " running, Starting " + name)
+				self.startCam(name)
+		self.checkTimer.start(self.CheckInterval if self.supervising else self.LogCheckInterval * 1000)
 
 	def stop(self):
-		if self.softcam_check in self.timer.callback:
-			self.timer.callback.remove(self.softcam_check)
-		self.timer.stop()
-
-	def softcam_check(self):
-		now = int(time())
-		if path.exists("/tmp/SoftcamRuningCheck.tmp"):
-			remove("/tmp/SoftcamRuningCheck.tmp")
-
-		if config.softcammanager.softcams_autostart:
-			Components.Task.job_manager.AddJob(self.createCheckJob())
-
-		if config.softcammanager.softcamtimerenabled.value:
-			# 			print "[SoftcamManager] Timer Check Enabled"
-			output = open("/tmp/cam.check.log", "a")
-			now = datetime.now()
-			output.write(now.strftime("%Y-%m-%d %H:%M") + ": Timer Check Enabled\n")
-			output.close()
-			self.timer.startLongTimer(config.softcammanager.softcamtimer.value * 60)
+		self.checkTimer.stop()
+
+	def getAutostartCams(self):
+		return [path.basename(x.strip()) for x in config.softcammanager.softcams_autostart.value]
+
+	def log(self, text):
+		with open(self.LogFile, "a") as output:
+			output.write(datetime.now().strftime("%Y-%m-%d %H:%M") + ": " + text + "\n")
+
+	def getCommand(self, name):
+		lower = name.lower()
+		if lower.startswith("hypercam"):
+			return "ulimit -s 1024; exec " + self.CamDirectory + name + " -c /etc/hypercam.cfg"
+		if lower.startswith(("oscam", "ncam")):
+			return "ulimit -s 1024; exec " + self.CamDirectory + name + " -b"
+		if lower.startswith("gbox"):
+			return "ulimit -s 1024; " + self.CamDirectory + name + "; sleep 3; exec start-stop-daemon --start --quiet --background --exec /usr/bin/gbox"
+		return "ulimit -s 1024; exec " + self.CamDirectory + name
+
+	# Removes what the other of OScam and Ncam left behind and stops a running
+	# CCcam, they cannot run together.
+	def prepareStart(self, name):
+		other = "ncam" if name.lower().startswith("oscam") else "oscam"
+		for pattern in ("/tmp/.%s" % other, "/tmp/*.pid*", "/tmp/%s.*" % other, "/tmp/*.%s" % other, "/tmp/status.*"):
+			for filename in glob(pattern):
+				try:
+					if path.isdir(filename) and not path.islink(filename):
+						rmtree(filename)
+					else:
+						remove(filename)
+				except OSError:
+					pass
+		cccams = [x for x in listdir(self.CamDirectory) if x.lower().startswith("cccam")] if path.isdir(self.CamDirectory) else []
+		for cccam, pids in findProcesses(cccams).items():
+			print("[SoftcamManager] Stopping ", cccam)
+			self.log("AutoStopping: " + cccam)
+			self.killProcesses(pids)
+
+	def startCam(self, name):
+		print("[SoftcamManager] Starting " + name)
+		self.log("Starting " + name)
+		if name.endswith(".sh"):
+			if name not in self.scripts:
+				self.scripts.append(name)
+			self.console.ePopen(self.CamDirectory + name + " start", self.scriptFinished)
+			return
+		if name.lower().startswith(("oscam", "ncam")):
+			self.prepareStart(name)
+		cam = self.cams.get(name)
+		if cam is None:
+			cam = SupervisedCam(name)
+			if name in self.getAutostartCams():
+				self.cams[name] = cam
+		cam.pid = None
+		cam.restartTime = None
+		cam.started = time()
+		cam.container = eConsoleAppContainer()
+		cam.container.appClosed.append(lambda retval: self.camExited(cam, retval))
+		if self.kills:
+			if cam not in self.startQueue:
+				self.startQueue.append(cam)
 		else:
-			output = open("/tmp/cam.check.log", "a")
-			now = datetime.now()
-			output.write(now.strftime("%Y-%m-%d %H:%M") + ": Timer Check Disabled\n")
-			output.close()
-			# 			print "[SoftcamManager] Timer Check Disabled"
-			softcamautopoller.stop()
-
-	def createCheckJob(self):
-		job = Components.Task.Job(_("SoftcamCheck"))
-
-		task = Components.Task.PythonTask(job, _("Checking softcams..."))
-		task.work = self.JobStart
-		task.weighting = 1
-
-		return job
-
-	def JobStart(self):
-		self.autostartcams = config.softcammanager.softcams_autostart.value
-		self.Console = Console()
-		if path.exists("/tmp/cam.check.log"):
-			if path.getsize("/tmp/cam.check.log") > 40000:
-				fh = open("/tmp/cam.check.log", "rb+")
-				fh.seek(-40000, 2)
-				data = fh.read()
-				fh.seek(0)  # rewind
-				fh.write(data)
-				fh.truncate()
-				fh.close()
-
+			cam.container.execute(self.getCommand(name))
+
+	def stopCam(self, name):
+		print("[SoftcamManager] Stopping " + name)
+		self.log("Stopping " + name)
+		cam = self.cams.pop(name, None)
+		self.startQueue = [x for x in self.startQueue if x.name != name]
+		if cam and cam.container:
+			del cam.container.appClosed[:]
+			cam.container = None
+		if name.endswith(".sh"):
+			if name in self.scripts:
+				self.scripts.remove(name)
+			self.console.ePopen(self.CamDirectory + name + " stop", self.scriptFinished)
+		else:
+			self.killProcesses(findProcesses([name]).get(name, []))
+
+	def scriptFinished(self, result, retval, extra_args):
+		if retval:
+			print("[SoftcamManager] Cam script failed:", result)
+
+	def killProcesses(self, pids):
+		for pid in pids:
+			try:
+				kill(pid, SIGKILL)
+			except OSError:
+				pass
+		if pids:
+			self.kills.append([pids, time() + self.StopTimeout])
+			self.killTimer.start(self.StopCheckInterval, True)
+
+	def checkKills(self):
+		now = time()
+		self.kills = [x for x in self.kills if now < x[1] and [pid for pid in x[0] if getProcessName(pid)]]
+		if self.kills:
+			self.killTimer.start(self.StopCheckInterval, True)
+		else:
+			startQueue = self.startQueue
+			self.startQueue = []
+			for cam in startQueue:
+				cam.started = time()
+				cam.container.execute(self.getCommand(cam.name))
+
+	# Returns the running cams of the names and the started cam scripts.
+	def getActiveCams(self, names):
+		running = findProcesses(names)
+		return [x for x in names if x in running] + self.scripts
+
+	def camExited(self, cam, retval):
+		cam.container = None
+		if self.supervising and self.cams.get(cam.name) is cam:
+			self.checkCam(cam, time())
+
+	def check(self):
+		now = time()
+		if self.supervising:
+			for cam in list(self.cams.values()):
+				self.checkCam(cam, now)
+			if now >= self.freezeTime:
+				self.freezeTime = now + config.softcammanager.softcamtimer.value * 60
+				for cam in self.cams.values():
+					if cam.pid:
+						self.checkFrozen(cam)
+		if now >= self.logTime:
+			self.logTime = now + self.LogCheckInterval
+			self.rotateLogs()
+
+	def checkCam(self, cam, now):
+		if cam in self.startQueue:  # waiting for the killed cams
+			return
+		if cam.pid:
+			if getProcessName(cam.pid) == cam.name:
+				if cam.crashes and now - cam.started > self.StableTime:
+					cam.crashes = 0
+				return
+			print("[SoftcamManager] " + cam.name + " stopped running, restarting")
+			self.log(cam.name + " stopped running, restarting")
+			self.scheduleRestart(cam, now)
+		elif cam.restartTime is not None:
+			if now >= cam.restartTime:
+				self.startCam(cam.name)
+		else:
+			pids = findProcesses([cam.name]).get(cam.name)
+			if pids:
+				cam.pid = pids[0]
+			elif cam.container is None or now - cam.started > self.StartTimeout:
+				print("[SoftcamManager] " + cam.name + " failed to start")
+				self.log(cam.name + " failed to start")
+				self.scheduleRestart(cam, now)
+
+	def scheduleRestart(self, cam, now):
+		cam.pid = None
+		cam.restartTime = now + self.RestartDelays[min(cam.crashes, len(self.RestartDelays) - 1)]
+		cam.crashes += 1
+		if cam.restartTime <= now:
+			self.startCam(cam.name)
+
+	# Returns the address of the web interface of the cam, None when it has
+	# none that can be checked.
+	def getStatusUrl(self, name):
+		lower = name.lower()
+		if lower.startswith(("oscam", "ncam")):
+			port = ""
+			camconf = "/etc/tuxbox/config/%s.conf" % ("oscam" if lower.startswith("oscam") else "ncam")
+			if not path.exists(camconf):
+				print("[SoftcamManager] oscam.conf or ncam.conf not defined")
+				return None
+			with open(camconf, "r") as f:
+				for line in f.readlines():
+					if line.find("httpport") != -1:
+						port = re.sub(r"\D", "", line)
+			return "http://127.0.0.1:%s/status.html" % (port or "16000")
+		if lower.startswith("cccam") and path.exists("/etc/CCcam.cfg"):
+			allow = "no"
+			port = ""
+			with open("/etc/CCcam.cfg", "r") as f:
+				for line in f.readlines():
+					if line.find("ALLOW WEBINFO") != -1 and not line.startswith("#"):
+						parts = line.replace("ALLOW WEBINFO", "").replace(":", "").replace(" ", "").strip().split()
+						if parts and parts[0].lower().startswith("yes"):
+							allow = "yes"
+					if line.find("WEBINFO LISTEN PORT") != -1:
+						port = re.sub(r"\D", "", line)
+			if allow == "yes":
+				return "http://127.0.0.1:%s" % (port or "16001")
+			print("[SoftcamManager] Webinfo info not allowed, can not check if frozen")
+			self.log("Webinfo info not allowed, can not check if frozen,\n\tplease enable 'ALLOW WEBINFO: YES'")
+		return None
+
+	def checkFrozen(self, cam):
+		url = self.getStatusUrl(cam.name)
+		if url:
+			print("[SoftcamManager] Checking if " + cam.name + " is frozen")
+			threads.deferToThread(isResponding, url).addBoth(lambda responding: self.frozenChecked(cam, responding))
+
+	def frozenChecked(self, cam, responding):
+		if responding is True:
+			print("[SoftcamManager] " + cam.name + " is responding like it should")
+			self.log(cam.name + " is responding like it should")
+		elif responding is not False:
+			print("[SoftcamManager] Checking if " + cam.name + " is frozen failed:", responding)
+		elif cam.pid and self.cams.get(cam.name) is cam:
+			print("[SoftcamManager] " + cam.name + " is frozen, Restarting...")
+			self.log(cam.name + " is frozen, Restarting...")
+			self.killProcesses([cam.pid])
+			self.scheduleRestart(cam, time())
+
+	# Rotates the logs which grew too big. The CCcam warnings log is kept open
+	# by CCcam and is copied and truncated instead.
+	def rotateLogs(self):
+		self.rotateLog(self.LogFile, False)
 		if path.exists("/etc/CCcam.cfg"):
-			f = open("/etc/CCcam.cfg", "r")
 			logwarn = ""
-			for line in f.readlines():
-				if line.find("LOG WARNINGS") != -1:
-					parts = line.strip().split()
-					logwarn = parts[2]
-					if logwarn.find(":") >= 0:
-						logwarn = logwarn.replace(":", "")
-					if logwarn == "":
-						logwarn = parts[3]
-				else:
-					logwarn = ""
-			if path.exists(logwarn):
-				if path.getsize(logwarn) > 40000:
-					fh = open(logwarn, "rb+")
-					fh.seek(-40000, 2)
-					data = fh.read()
-					fh.seek(0)  # rewind
-					fh.write(data)
-					fh.truncate()
-					fh.close()
-			f.close()
-
-		for softcamcheck in self.autostartcams:
-			softcamcheck = softcamcheck.replace("/usr/softcams/", "")
-			softcamcheck = softcamcheck.replace("\n", "")
-			if softcamcheck.endswith(".sh"):
-				if path.exists("/tmp/SoftcamsDisableCheck"):
-					file = open("/tmp/SoftcamsDisableCheck")
-					data = file.read()
-					file.close()
-				else:
-					data = ""
-				if data.find(softcamcheck) < 0:
-					if path.exists("/tmp/SoftcamsScriptsRunning"):
-						file = open("/tmp/SoftcamsScriptsRunning")
-						data = file.read()
-						file.close()
-						if data.find(softcamcheck) < 0:
-							fileout = open("/tmp/SoftcamsScriptsRunning", "a")
-							line = softcamcheck + "\n"
-							fileout.write(line)
-							fileout.close()
-							print("[SoftcamManager] Starting " + softcamcheck)
-							self.Console.ePopen("/usr/softcams/" + softcamcheck + " start")
-					else:
-						fileout = open("/tmp/SoftcamsScriptsRunning", "w")
-						line = softcamcheck + "\n"
-						fileout.write(line)
-						fileout.close()
-						print("[SoftcamManager] Starting " + softcamcheck)
-						self.Console.ePopen("/usr/softcams/" + softcamcheck + " start")
-			else:
-				if path.exists("/tmp/SoftcamsDisableCheck"):
-					file = open("/tmp/SoftcamsDisableCheck")
-					data = file.read()
-					file.close()
+			with open("/etc/CCcam.cfg", "r") as f:
+				for line in f.readlines():
+					if line.find("LOG WARNINGS") != -1:
+						parts = line.strip().split()
+						logwarn = parts[2].replace(":", "") if len(parts) > 2 else ""
+						if logwarn == "" and len(parts) > 3:
+							logwarn = parts[3]
+			if logwarn:
+				self.rotateLog(logwarn, True)
+
+	def rotateLog(self, filename, copy):
+		try:
+			if path.getsize(filename) > self.LogSize:
+				if copy:
+					copyfile(filename, filename + ".1")
+					truncate(filename, 0)
 				else:
-					data = ""
-				if data.find(softcamcheck) < 0:
-					import process
-
-					p = process.ProcessList()
-					softcamcheck_process = str(p.named(softcamcheck)).strip("[]")
-					if softcamcheck_process != "":
-						if path.exists("/tmp/frozen"):
-							remove("/tmp/frozen")
-						if path.exists("/tmp/status.html"):
-							remove("/tmp/status.html")
-						if path.exists("/tmp/index.html"):
-							remove("/tmp/index.html")
-						print("[SoftcamManager] " + softcamcheck + " already running")
-						output = open("/tmp/cam.check.log", "a")
-						now = datetime.now()
-						output.write(now.strftime("%Y-%m-%d %H:%M") + ": " + softcamcheck + " running OK\n")
-						output.close()
-						if softcamcheck.lower().startswith(("oscam", "ncam")):
-							if path.exists("/tmp/status.html"):
-								remove("/tmp/status.html")
-							camconf = port = ""
-							if softcamcheck.lower().startswith("oscam"):
-								if path.exists("/etc/tuxbox/config/oscam.conf"):
-									camconf = "/etc/tuxbox/config/oscam.conf"
-							elif softcamcheck.lower().startswith("ncam"):
-								if path.exists("/etc/tuxbox/config/ncam.conf"):
-									camconf = "/etc/tuxbox/config/ncam.conf"
-							if not camconf:
-								print("[SoftcamManager] oscam.conf or ncam.conf not defined")
-								return
-							f = open(camconf, "r")
-							for line in f.readlines():
-								if line.find("httpport") != -1:
-									port = re.sub(r"\D", "", line)
-							f.close()
-							print("[SoftcamManager] Checking if " + softcamcheck + " is frozen")
-							if port == "":
-								port = "16000"
-							self.Console.ePopen("wget -T 1 http://127.0.0.1:" + port + "/status.html -O /tmp/status.html &> /tmp/frozen")
-							sleep(2)
-							f = open("/tmp/frozen")
-							frozen = f.read()
-							f.close()
-							if frozen.find("Unauthorized") != -1 or frozen.find("Authorization Required") != -1 or frozen.find("Forbidden") != -1 or frozen.find("Connection refused") != -1 or frozen.find("100%") != -1 or path.exists("/tmp/status.html"):
-								print("[SoftcamManager] " + softcamcheck + " is responding like it should")
-								output = open("/tmp/cam.check.log", "a")
-								now = datetime.now()
-								output.write(now.strftime("%Y-%m-%d %H:%M") + ": " + softcamcheck + " is responding like it should\n")
-								output.close()
-							else:
-								print("[SoftcamManager] " + softcamcheck + " is frozen, Restarting...")
-								output = open("/tmp/cam.check.log", "a")
-								now = datetime.now()
-								output.write(now.strftime("%Y-%m-%d %H:%M") + ": " + softcamcheck + " is frozen, Restarting...\n")
-								output.close()
-								print("[SoftcamManager] Stopping " + softcamcheck)
-								output = open("/tmp/cam.check.log", "a")
-								now = datetime.now()
-								output.write(now.strftime("%Y-%m-%d %H:%M") + ": AutoStopping: " + softcamcheck + "\n")
-								output.close()
-								self.Console.ePopen("killall -9 " + softcamcheck)
-								sleep(1)
-								if softcamcheck.lower().startswith("oscam"):
-									self.Console.ePopen("ps.procps | grep softcams | grep -v grep | awk 'NR==1' | awk '{print $5}'| awk  -F'[/]' '{print $4}' > /tmp/oscamRuningCheck.tmp")
-									sleep(2)
-									file = open("/tmp/oscamRuningCheck.tmp")
-								elif softcamcheck.lower().startswith("ncam"):
-									self.Console.ePopen("ps.procps | grep softcams | grep -v grep | awk 'NR==1' | awk '{print $5}'| awk  -F'[/]' '{print $4}' > /tmp/ncamRuningCheck.tmp")
-									sleep(2)
-									file = open("/tmp/ncamRuningCheck.tmp")
-								cccamcheck_process = file.read()
-								file.close()
-								cccamcheck_process = cccamcheck_process.replace("\n", "")
-								if cccamcheck_process.lower().find("cccam") != -1:
-									try:
-										print("[SoftcamManager] Stopping ", cccamcheck_process)
-										output = open("/tmp/cam.check.log", "a")
-										now = datetime.now()
-										output.write(now.strftime("%Y-%m-%d %H:%M") + ": AutoStopping: " + cccamcheck_process + "\n")
-										output.close()
-										self.Console.ePopen("killall -9 /usr/softcams/" + str(cccamcheck_process))
-									except:
-										pass
-								print("[SoftcamManager] Starting " + softcamcheck)
-								output = open("/tmp/cam.check.log", "a")
-								now = datetime.now()
-								output.write(now.strftime("%Y-%m-%d %H:%M") + ": AutoStarting: " + softcamcheck + "\n")
-								output.close()
-								self.Console.ePopen("ulimit -s 1024;/usr/softcams/" + softcamcheck + " -b")
-								sleep(10)
-
-						elif softcamcheck.lower().startswith("cccam"):
-							if path.exists("/tmp/index.html"):
-								remove("/tmp/index.html")
-							allow = "no"
-							port = ""
-							f = open("/etc/CCcam.cfg", "r")
-							for line in f.readlines():
-								if line.find("ALLOW WEBINFO") != -1:
-									if not line.startswith("#"):
-										parts = line.replace("ALLOW WEBINFO", "")
-										parts = parts.replace(":", "")
-										parts = parts.replace(" ", "")
-										parts = parts.strip().split()
-										if parts[0].startswith("yes"):
-											allow = parts[0]
-								if line.find("WEBINFO LISTEN PORT") != -1:
-									port = re.sub(r"\D", "", line)
-							f.close()
-							if allow.lower().find("yes") != -1:
-								print("[SoftcamManager] Checking if " + softcamcheck + " is frozen")
-								if port == "":
-									port = "16001"
-								self.Console.ePopen("wget -T 1 http://127.0.0.1:" + port + " -O /tmp/index.html &> /tmp/frozen")
-								sleep(2)
-								f = open("/tmp/frozen")
-								frozen = f.read()
-								f.close()
-								if frozen.find("Unauthorized") != -1 or frozen.find("Authorization Required") != -1 or frozen.find("Forbidden") != -1 or frozen.find("Connection refused") != -1 or frozen.find("100%") != -1 or path.exists("/tmp/index.html"):
-									print("[SoftcamManager] " + softcamcheck + " is responding like it should")
-									output = open("/tmp/cam.check.log", "a")
-									now = datetime.now()
-									output.write(now.strftime("%Y-%m-%d %H:%M") + ": ' + softcamcheck + ' is responding like it should\n")
-									output.close()
-								else:
-									print("[SoftcamManager] " + softcamcheck + " is frozen, Restarting...")
-									output = open("/tmp/cam.check.log", "a")
-									now = datetime.now()
-									output.write(now.strftime("%Y-%m-%d %H:%M") + ": " + softcamcheck + " is frozen, Restarting...\n")
-									output.close()
-									print("[SoftcamManager] Stopping " + softcamcheck)
-									self.Console.ePopen("killall -9 " + softcamcheck)
-									sleep(1)
-									print("[SoftcamManager] Starting " + softcamcheck)
-									self.Console.ePopen("ulimit -s 1024;/usr/softcams/" + softcamcheck)
-							elif allow.lower().find("no") != -1:
-								print("[SoftcamManager] Telnet info not allowed, can not check if frozen")
-								output = open("/tmp/cam.check.log", "a")
-								now = datetime.now()
-								output.write(now.strftime("%Y-%m-%d %H:%M") + ":  Webinfo info not allowed, can not check if frozen,\n\tplease enable 'ALLOW WEBINFO: YES'\n")
-								output.close()
-							else:
-								print("[SoftcamManager] Webinfo info not setup, please enable 'ALLOW WEBINFO= YES'")
-								output = open("/tmp/cam.check.log", "a")
-								now = datetime.now()
-								output.write(now.strftime("%Y-%m-%d %H:%M") + ":  Telnet info not setup, can not check if frozen,\n\tplease enable 'ALLOW WEBINFO: YES'\n")
-								output.close()
-
-					elif softcamcheck_process == "":
-						print("[SoftcamManager] Couldn't find " + softcamcheck + " running, Starting " + softcamcheck)
-						output = open("/tmp/cam.check.log", "a")
-						now = datetime.now()
-						output.write(now.strftime("%Y-%m-%d %H:%M") + ": Couldn't find " + softcamcheck + " running, Starting " + softcamcheck + "\n")
-						output.close()
-						if softcamcheck.lower().startswith(("oscam", "ncam")):
-							self.Console.ePopen("ps.procps | grep softcams | grep -v grep | awk 'NR==1' | awk '{print $5}'| awk  -F'[/]' '{print $4}' > /tmp/softcamRuningCheck.tmp")
-							sleep(2)
-							file = open("/tmp/softcamRuningCheck.tmp")
-							cccamcheck_process = file.read()
-							cccamcheck_process = cccamcheck_process.replace("\n", "")
-							file.close()
-							if cccamcheck_process.find("cccam") >= 0 or cccamcheck_process.find("CCcam") >= 0:
-								try:
-									print("[SoftcamManager] Stopping ", cccamcheck_process)
-									output = open("/tmp/cam.check.log", "a")
-									now = datetime.now()
-									output.write(now.strftime("%Y-%m-%d %H:%M") + ": AutoStopping: " + cccamcheck_process + "\n")
-									output.close()
-									self.Console.ePopen("killall -9 /usr/softcams/" + str(cccamcheck_process))
-								except:
-									pass
-							self.Console.ePopen("ulimit -s 1024;/usr/softcams/" + softcamcheck + " -b")
-							sleep(10)
-							remove("/tmp/softcamRuningCheck.tmp")
-						elif softcamcheck.lower().startswith("sbox"):
-							self.Console.ePopen("ulimit -s 1024;/usr/softcams/" + softcamcheck)
-							sleep(7)
-						elif softcamcheck.lower().startswith("gbox"):
-							self.Console.ePopen("ulimit -s 1024;/usr/softcams/" + softcamcheck)
-							sleep(3)
-							self.Console.ePopen("start-stop-daemon --start --quiet --background --exec /usr/bin/gbox")
-						else:
-							self.Console.ePopen("ulimit -s 1024;/usr/softcams/" + softcamcheck)
+					rename(filename, filename + ".1")
+		except (IOError, OSError):
+			pass
+
+
+softcamSupervisor = SoftcamSupervisor()
@@ -4,7 +4,7 @@ from Plugins.Plugin import PluginDescriptor
 from Components.config import config
 from Components.SystemInfo import SystemInfo
 
-from .BackupManager import BackupManagerautostart
+from .BackupManager import BackupManagerautostart, isBackupManifest, readBackupFile
 from .ImageManager import ImageManagerautostart
 from .IPKInstaller import IpkgInstaller
 from .ScriptRunner import ScriptRunnerAutostart
@@ -23,15 +23,27 @@ def setLanguageFromBackup(backupfile):
 	print("[ViX plugin][setLanguageFromBackup] backupfile", backupfile)
 	import tarfile
 
-	try:
-		tar = tarfile.open(backupfile)
-		member = tar.getmember("etc/enigma2/settings")
-	except KeyError:
-		print("[ViX plugin][setLanguageFromBackup] language selected failed")
-		tar.close()
-		return
-
-	for line in tar.extractfile(member):
+	if isBackupManifest(backupfile):
+		try:
+			settings = readBackupFile(backupfile, "etc/enigma2/settings")
+		except (IOError, OSError, ValueError, KeyError):
+			settings = None
+		if settings is None:
+			print("[ViX plugin][setLanguageFromBackup] language selected failed")
+			return
+		lines = settings.splitlines()
+		tar = None
+	else:
+		try:
+			tar = tarfile.open(backupfile)
+			member = tar.getmember("etc/enigma2/settings")
+		except KeyError:
+			print("[ViX plugin][setLanguageFromBackup] language selected failed")
+			tar.close()
+			return
+		lines = tar.extractfile(member)
+
+	for line in lines:
 		line = line.decode()
 		if line.startswith("config.osd.language"):
 			languageToSelect = line.strip().split("=")[1]
@@ -42,14 +54,15 @@ def setLanguageFromBackup(backupfile):
 			config.misc.languageselected.value = 0		# 0 means found
 			config.misc.languageselected.save()
 			break
-	tar.close()
+	if tar:
+		tar.close()
 
 
 def checkConfigBackup():
 	backups = []
 	for dir in ["/media/%s/backup" % media for media in listdir("/media/") if path.isdir(path.join("/media/", media))]:
 		try:
-			backups += [{"name": f, "mtime": stat(f).st_mtime} for x in listdir(dir) if (f := path.join(dir, x)) and path.isfile(f) and f.endswith(".tar.gz") and "vix" in f.lower()]
+			backups += [{"name": f, "mtime": stat(f).st_mtime} for x in listdir(dir) if (f := path.join(dir, x)) and path.isfile(f) and (f.endswith(".tar.gz") or isBackupManifest(f)) and "vix" in f.lower()]
 		except FileNotFoundError:  # e.g. /media/autofs/xxx will crash listdir if "xxx" is inactive
 			pass
 	if backups:
@@ -430,14 +430,14 @@ class PowerTimer(Timer):
 				w.state += 1
 
 		try:
-			self.timer_list.remove(w)
+			self.removeTimer(w)
 		except:
 			print('[PowerManager]: Remove list failed')
 
 		# did this timer reached the last state?
 		if w.state < PowerTimerEntry.StateEnded:
 			# no, sort it into active list
-			insort(self.timer_list, w)
+			self.insertTimer(w)
 		else:
 			# yes. Process repeated, and re-add.
 			if w.repeated:
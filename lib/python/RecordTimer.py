@@ -3,13 +3,15 @@ from timer import Timer, TimerEntry
 from bisect import insort
 from sys import maxsize
 from time import localtime, strftime, ctime, time
+from re import compile as re_compile
 
-from enigma import eEPGCache, getBestPlayableServiceReference, eStreamServer, eServiceReference, iRecordableService, quitMainloop, eActionMap, setPreferredTuner, eServiceCenter
+from enigma import eEPGCache, getBestPlayableServiceReference, eStreamServer, eServiceReference, iRecordableService, quitMainloop, eActionMap, setPreferredTuner, eServiceCenter, eTimer
 from Components.config import config
 import Components.ParentalControl
 from Components.UsageConfig import defaultMoviePath
 from Components.SystemInfo import SystemInfo
 from Components.TimerSanityCheck import TimerSanityCheck
+from Components.TimerIndex import TimerIndex, overlapClusters
 import Screens.InfoBar
 from Screens.MessageBox import MessageBox
 from Screens.PictureInPicture import PictureInPicture
@@ -35,6 +37,20 @@ import threading
 write_lock = threading.Lock()
 wasrec_lock = threading.Lock()
 
+
+# The timer log entries are kept in an append-only journal next to timers.xml,
+# one "logid<TAB>time<TAB>code<TAB>message" line per entry.
+def escapeJournal(text):
+	return text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+unescapeJournalRe = re_compile(r"\\(.)")
+
+
+def unescapeJournal(text):
+	return unescapeJournalRe.sub(lambda match: {"t": "\t", "n": "\n"}.get(match.group(1), match.group(1)), text)
+
+
 # Parses an event, and returns a (begin, end, name, duration, eit)-tuple.
 # begin and end include padding (if set in config)
 # If service is supplied, end will also include any split program spanning adjustment (if set in config)
@@ -202,6 +218,7 @@ class RecordTimerEntry(TimerEntry):
 		else:
 			self.service_ref = eServiceReference()
 		self.dontSave = False
+		self.logId = None  # links the entry to its lines in the log journal
 		self.eit = None
 		if not description or not name or not eit:
 			evt = self.getEventFromEPGId(eit) or self.getEventFromEPG()
@@ -295,6 +312,9 @@ class RecordTimerEntry(TimerEntry):
 
 	def log(self, code, msg):
 		self.log_entries.append((int(time()), code, msg))
+		timer = getattr(self, "Timer", None)
+		if timer is not None:
+			timer.journalLog(self, self.log_entries[-1])
 		print("[RecordTimer]", msg)
 
 	def freespace(self):
@@ -982,9 +1002,12 @@ def createTimer(xml):
 	if autoTimerId is not None:
 		autoTimerId = int(autoTimerId)
 	ice_timer_id = xml.get("ice_timer_id")
+	logId = xml.get("logid")
 	name = str(xml.get("name"))
 	entry = RecordTimerEntry(serviceref, begin, end, name, description, eit, disabled, justplay, afterevent, dirname=location, tags=tags, descramble=descramble, record_ecm=record_ecm, isAutoTimer=isAutoTimer, always_zap=always_zap, rename_repeat=rename_repeat, conflict_detection=conflict_detection, pipzap=pipzap, autoTimerId=autoTimerId, ice_timer_id=ice_timer_id)
 	entry.repeated = int(repeated)
+	if logId is not None:
+		entry.logId = int(logId)
 	flags = xml.get("flags")
 	if flags:
 		entry.flags = set(flags.encode("utf-8").split(" "))
@@ -999,7 +1022,20 @@ def createTimer(xml):
 
 
 class RecordTimer(Timer):
+	# saveTimer() requests are coalesced, timers.xml is written once no further
+	# request arrived for SaveIdleTime ms, but at the latest SaveMaxDelay seconds
+	# after the first pending request.
+	SaveIdleTime = 1000
+	SaveMaxDelay = 10
+
 	def __init__(self):
+		self.timerIndex = TimerIndex()
+		self.saveTimerTimer = eTimer()
+		self.saveTimerTimer.callback.append(self.flushTimers)
+		self.savePendingSince = None
+		self.nextLogId = 1
+		self.journalLines = 0  # lines in the journal file, live and obsolete
+		self.journalCompact = False  # rewrite the journal on the next flush
 		Timer.__init__(self)
 
 		self.onTimerAdded = []
@@ -1007,12 +1043,17 @@ class RecordTimer(Timer):
 		self.onTimerChanged = []
 
 		self.Filename = resolveFilename(SCOPE_CONFIG, "timers.xml")
+		self.JournalFilename = resolveFilename(SCOPE_CONFIG, "timers.journal")
 
 		try:
 			self.loadTimer()
 		except IOError:
 			print("[RecordTimer] unable to load timers from file!")
 
+	def addTimerEntry(self, entry, noRecalc=0, dosave=True):
+		Timer.addTimerEntry(self, entry, noRecalc, dosave)
+		self.timerIndex.update(entry)
+
 	def timeChanged(self, entry, dosave=True):
 		Timer.timeChanged(self, entry, dosave)
 		for f in self.onTimerChanged:
@@ -1040,12 +1081,12 @@ class RecordTimer(Timer):
 				w.state += 1
 
 		try:
-			self.timer_list.remove(w)
+			self.removeTimer(w)
 		except:
 			print("[RecordTimer] Remove list failed")
 		if w.state < RecordTimerEntry.StateEnded:  # did this timer reached the last state?
 			# no, sort it into active list
-			insort(self.timer_list, w)
+			self.insertTimer(w)
 		else:
 			# yes. Process repeated, and re-add.
 			if w.repeated:
@@ -1054,6 +1095,7 @@ class RecordTimer(Timer):
 				w.first_try_prepare = True
 				self.addTimerEntry(w)
 			else:
+				self.timerIndex.remove(w)
 				# If we want to keep done timers, re-insert in the active list
 				if config.recording.keep_timers.value > 0:
 					insort(self.processed_timers, w)
@@ -1093,9 +1135,13 @@ class RecordTimer(Timer):
 		checkit = False
 		timer_text = ""
 		now = time()
-		for timer in root.findall("timer"):
-			newTimer = createTimer(timer)
-			conflict_list = self.record(newTimer, ignoreTSC=True, dosave=False, loadtimer=True, justLoad=justLoad, sanityCheck=now < newTimer.end)
+		timers = [createTimer(timer) for timer in root.findall("timer")]
+		self.loadJournal(timers)
+		# one sweep over all timers finds the overlap clusters, so the check of each
+		# timer only simulates the timers chained to it and doesn't search the index
+		clusters = overlapClusters(self.timer_list + timers)
+		for newTimer in timers:
+			conflict_list = self.record(newTimer, ignoreTSC=True, dosave=False, loadtimer=True, justLoad=justLoad, sanityCheck=now < newTimer.end, clusters=clusters)
 			if conflict_list:
 				checkit = True
 				if newTimer in conflict_list:
@@ -1105,7 +1151,82 @@ class RecordTimer(Timer):
 			from Screens.MessageBox import MessageBox
 			AddPopup(_("Timer overlap in timers.xml detected!\nPlease recheck it!") + timer_text, type=MessageBox.TYPE_ERROR, timeout=0, id="TimerLoadFailed")
 
+	def loadJournal(self, timers):
+		timersById = {}
+		for timer in timers:
+			if timer.logId is not None:
+				timersById[timer.logId] = timer
+				self.nextLogId = max(self.nextLogId, timer.logId + 1)
+		self.journalLines = 0
+		try:
+			with open(self.JournalFilename, "r") as file:
+				for line in file:
+					self.journalLines += 1
+					try:
+						logId, logTime, code, msg = line.rstrip("\n").split("\t", 3)
+						logId = int(logId)
+						self.nextLogId = max(self.nextLogId, logId + 1)  # don't hand out ids of orphaned lines
+						timer = timersById.get(logId)
+						if timer is not None:
+							timer.log_entries.append((int(logTime), int(code), unescapeJournal(msg)))
+					except ValueError:
+						print("[RecordTimer] ignoring broken journal line: %s" % line)
+		except (IOError, OSError):
+			pass
+		for timer in timersById.values():
+			timer.log_entries.sort(key=lambda x: x[0])
+
+	def journalLine(self, entry, logEntry):
+		return "%d\t%d\t%d\t%s\n" % (entry.logId, logEntry[0], logEntry[1], escapeJournal(logEntry[2]))
+
+	def journalLog(self, entry, logEntry):
+		if entry.dontSave or entry.logId is None:
+			return
+		with write_lock:
+			try:
+				with open(self.JournalFilename, "a") as file:
+					file.write(self.journalLine(entry, logEntry))
+				self.journalLines += 1
+			except (IOError, OSError) as err:
+				print("[RecordTimer] unable to append to the timer journal: %s" % err)
+				self.journalCompact = True
+
+	# Rewrite the journal with just the log entries that are still held by the
+	# timers (old entries are pruned by cleanupLogs).  Runs in a thread, the write
+	# lock keeps journalLog() from appending to the file that is replaced.
+	def compactJournal(self, entries):
+		with write_lock:
+			lines = []
+			for entry in entries:
+				lines.extend([self.journalLine(entry, logEntry) for logEntry in list(entry.log_entries)])
+			try:
+				with open(self.JournalFilename + ".writing", "w") as file:
+					file.writelines(lines)
+					file.flush()
+					fsync(file.fileno())
+				rename(self.JournalFilename + ".writing", self.JournalFilename)
+				self.journalLines = len(lines)
+			except (IOError, OSError) as err:
+				print("[RecordTimer] unable to compact the timer journal: %s" % err)
+
+	# The AutoTimer scan saves from its thread, eTimer is not thread-safe so
+	# timers.xml is written right away there.
 	def saveTimer(self):
+		if threading.current_thread() is not threading.main_thread():
+			self.writeTimers()
+			return
+		now = time()
+		if self.savePendingSince is None:
+			self.savePendingSince = now
+		delay = min(self.SaveIdleTime, int((self.savePendingSince + self.SaveMaxDelay - now) * 1000))
+		self.saveTimerTimer.start(max(delay, 0), True)
+
+	def flushTimers(self):
+		self.saveTimerTimer.stop()
+		self.savePendingSince = None
+		self.writeTimers()
+
+	def writeTimers(self):
 		afterEvents = {
 			AFTEREVENT.NONE: "nothing",
 			AFTEREVENT.STANDBY: "standby",
@@ -1114,9 +1235,15 @@ class RecordTimer(Timer):
 		}
 
 		list = ['<?xml version="1.0" ?>\n<timers>\n']
-		for entry in self.timer_list + self.processed_timers:
-			if entry.dontSave:
-				continue
+		entries = [entry for entry in self.timer_list + self.processed_timers if not entry.dontSave]
+		liveLogs = 0
+		journalLines = []  # log entries of timers without a journal id yet (new timers, legacy timers.xml)
+		for entry in entries:
+			if entry.logId is None:
+				entry.logId = self.nextLogId
+				self.nextLogId += 1
+				journalLines.extend([self.journalLine(entry, logEntry) for logEntry in entry.log_entries[:]])
+			liveLogs += len(entry.log_entries)
 			list.append(
 				'<timer'
 				' begin="%d"'
@@ -1133,7 +1260,8 @@ class RecordTimer(Timer):
 				' conflict_detection="%d"'
 				' descramble="%d"'
 				' record_ecm="%d"'
-				' isAutoTimer="%d"' % (
+				' isAutoTimer="%d"'
+				' logid="%d"' % (
 					int(entry.begin),
 					int(entry.end),
 					stringToXML(str(entry.service_ref)),
@@ -1148,7 +1276,8 @@ class RecordTimer(Timer):
 					int(entry.conflict_detection),
 					int(entry.descramble),
 					int(entry.record_ecm),
-					int(entry.isAutoTimer)))
+					int(entry.isAutoTimer),
+					entry.logId))
 			if entry.eit is not None:
 				list.append(' eit="' + str(entry.eit) + '"')
 			if entry.dirname:
@@ -1163,13 +1292,7 @@ class RecordTimer(Timer):
 				list.append(' ice_timer_id="' + str(entry.ice_timer_id) + '"')
 			if entry.flags:
 				list.append(' flags="' + ' '.join([stringToXML(x) for x in entry.flags]) + '"')
-
-			if len(entry.log_entries) == 0:
-				list.append('/>\n')
-			else:
-				for log_time, code, msg in entry.log_entries:
-					list.append('>\n<log code="%d" time="%d">%s</log' % (code, log_time, stringToXML(msg)))
-				list.append('>\n</timer>\n')
+			list.append('/>\n')  # the log entries are kept in the journal
 
 		list.append('</timers>\n')
 
@@ -1191,6 +1314,17 @@ class RecordTimer(Timer):
 		# list-creating loop under the lock.
 		#
 		with write_lock:
+			# the log entries are in the journal before timers.xml is written without them
+			if journalLines:
+				try:
+					with open(self.JournalFilename, "a") as file:
+						file.writelines(journalLines)
+						file.flush()
+						fsync(file.fileno())
+					self.journalLines += len(journalLines)
+				except (IOError, OSError) as err:
+					print("[RecordTimer] unable to append to the timer journal: %s" % err)
+					self.journalCompact = True
 			file = open(self.Filename + ".writing", "w")
 			file.writelines(list)
 			file.flush()
@@ -1199,6 +1333,11 @@ class RecordTimer(Timer):
 			file.close()
 			rename(self.Filename + ".writing", self.Filename)
 
+		# most of the journal is obsolete (pruned logs, removed timers), rewrite it in the background
+		if self.journalCompact or self.journalLines > 2 * liveLogs + 64:
+			self.journalCompact = False
+			threading.Thread(target=self.compactJournal, args=(entries,)).start()
+
 	def getNextZapTime(self):
 		now = time()
 		for timer in self.timer_list:
@@ -1252,13 +1391,15 @@ class RecordTimer(Timer):
 # as we load.  On a restore we may not have the correct tuner
 # configuration (and no USB tuners)...
 #
-	def record(self, entry, ignoreTSC=False, dosave=True, loadtimer=False, justLoad=False, sanityCheck=True):
+	def record(self, entry, ignoreTSC=False, dosave=True, loadtimer=False, justLoad=False, sanityCheck=True, clusters=None):  # clusters as returned by overlapClusters()
 		answer = None
 		if sanityCheck:
 			real_cd = entry.conflict_detection
 			if justLoad:
 				entry.conflict_detection = False
-			check_timer_list = self.timer_list[:]
+			# only the timers chained to the entry by overlapping recording times are checked
+			cluster = clusters[entry] if clusters is not None and entry in clusters else self.timerIndex.overlapping(entry)
+			check_timer_list = self.timer_list[:] if cluster is None else [x for x in self.timer_list if x in cluster]
 			timersanitycheck = TimerSanityCheck(check_timer_list, entry)
 			if not timersanitycheck.check():
 				if not ignoreTSC:
@@ -1384,22 +1525,14 @@ class RecordTimer(Timer):
 		end = begin + duration
 		startAt = begin - config.recording.margin_before.value * 60
 		endAt = end + config.recording.margin_after.value * 60
-		if isinstance(service, str):
-			refstr = ':'.join(service.split(':')[:11])
-		else:
-			refstr = service.toCompareString()
 
-		# iterating is faster than using bisect+indexing to find the first relevant timer
-		for timer in self.timer_list:
-			# repeat timers represent all their future repetitions, so always include them
-			if (startAt <= timer.end or timer.repeated) and timer.begin < endAt:
-				check = timer.service_ref.toCompareString().split(":", 2)[2] == refstr.split(":", 2)[2]
-				if check:
-					matchType = RecordTimer.__checkTimer(timer, check_offset_time, begin, end, duration)
-					if matchType is not None:
-						returnValue = (timer, matchType)
-						if matchType in (2, 3):  # When full recording or within an event do not look further
-							break
+		# only the timers of this service that overlap the event are checked
+		for timer in self.timerIndex.lookup(service, startAt, endAt):
+			matchType = RecordTimer.__checkTimer(timer, check_offset_time, begin, end, duration)
+			if matchType is not None:
+				returnValue = (timer, matchType)
+				if matchType in (2, 3):  # When full recording or within an event do not look further
+					break
 		return returnValue or (None, None)
 
 	@staticmethod
@@ -1441,6 +1574,7 @@ class RecordTimer(Timer):
 		# now the timer should be in the processed_timers list. remove it from there.
 		if entry in self.processed_timers:
 			self.processed_timers.remove(entry)
+		self.timerIndex.remove(entry)
 
 		# Trigger onTimerRemoved callbacks
 		for f in self.onTimerRemoved:
@@ -1449,7 +1583,7 @@ class RecordTimer(Timer):
 		self.saveTimer()
 
 	def shutdown(self):
-		self.saveTimer()
+		self.flushTimers()
 
 	def cleanup(self):
 		removed_timers = [entry for entry in self.processed_timers if not entry.disabled]
@@ -1,8 +1,8 @@
 # -*- coding: UTF-8 -*-
 # CCcam Info by AliAbdul
-from base64 import b64encode
 from os import listdir, remove, rename, system, path
 
+from twisted.internet.defer import CancelledError
 from enigma import eListboxPythonMultiContent, gFont, RT_HALIGN_RIGHT, getDesktop
 
 from Components.ActionMap import ActionMap, NumberActionMap
@@ -13,6 +13,7 @@ from Components.Label import Label
 from Components.MenuList import MenuList
 from Components.MultiContent import MultiContentEntryText, MultiContentEntryPixmapAlphaBlend
 from Components.ScrollLabel import ScrollLabel
+from Components.WebIfClient import webIfClient
 from Screens.HelpMenu import HelpableScreen
 
 from Screens.LocationBox import LocationBox
@@ -21,7 +22,6 @@ from Screens.Screen import Screen
 from Screens.VirtualKeyBoard import VirtualKeyBoard
 from Tools.Directories import fileExists, SCOPE_CURRENT_SKIN, resolveFilename
 from Tools.LoadPixmap import LoadPixmap
-import requests
 from urllib.parse import urlparse, urlunparse  # raises ImportError in Python 2
 
 
@@ -30,9 +30,6 @@ DATE = "01.12.2021"
 CFG = "/etc/CCcam.cfg"
 global Counter
 Counter = 0
-AuthHeaders = {
-	"User-Agent": "Mozilla/5.0 (Windows NT 6.1) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/60.0.3112.113 Safari/537.36",
-}
 #############################################################
 
 
@@ -52,42 +49,59 @@ def _parse(url):
 		username, host = host.split('@')
 		if ':' in username:
 			username, password = username.split(':')
-			base64string = "%s:%s" % (username, password)
-			base64string = (b64encode(base64string.encode('utf-8'))).decode()
-			authHeader = "Basic " + base64string
-			AuthHeaders["Authorization"] = authHeader
 	if ':' in host:
 		host, port = host.split(':')
 		port = int(port)
 	print("[CCcamInfo]2 parsed=%s scheme=%s path=%s host=%s port=%s" % (parsed, scheme, path, host, port))
 	url = scheme + '://' + host + ':' + str(port) + path
-	print("[CCcamInfo]1 url=%s AuthHeaders=%s" % (url, AuthHeaders))
-	return url, AuthHeaders
+	return url, username, password
 
 
+# The page is read on the reactor, the callback is called when it arrived.
 def getPage(url, callback, errback):
-	global Counter
-	errormsg = ""
-	url, AuthHeaders = _parse(url)
+	url, username, password = _parse(url)
 	print("[CCcamInfo]2 url=%s" % url)
+	deferred = webIfClient.getPage(url, username, password)
+	deferred.addCallbacks(pageReceived, pageError, callbackArgs=(callback,), errbackArgs=(callback, errback))
+	return deferred
+
+
+def pageReceived(content, callback):
 	try:
-		response = requests.get(url, headers=AuthHeaders)  # to get content after redirection
-		response.raise_for_status()
-	except requests.exceptions.RequestException as error:
-		print("[CCcamInfo][getPage] incorrect response: %s" % error)
-		if Counter == 0:
-			Counter += 1
-			errormsg = "[CCcamInfo][getPage] incorrect response: %s" % error
-			errback(errormsg)
-		else:
-			data = ""
-			callback(data)
+		data = content.decode(encoding='UTF-8')
+	except UnicodeDecodeError:
+		data = content.decode(encoding='latin-1')
+	callback(data)
+
+
+def pageError(failure, callback, errback):
+	global Counter
+	if failure.check(CancelledError):  # the screen was closed
+		return
+	error = failure.getErrorMessage()
+	print("[CCcamInfo][getPage] incorrect response: %s" % error)
+	if Counter == 0:
+		Counter += 1
+		errormsg = "[CCcamInfo][getPage] incorrect response: %s" % error
+		errback(errormsg)
 	else:
-		try:
-			data = response.content.decode(encoding='UTF-8')
-		except:
-			data = response.content.decode(encoding='latin-1')
+		data = ""
 		callback(data)
+
+
+# Keeps the page request of a screen, it is cancelled when the screen is
+# closed while waiting for the page.
+class CCcamInfoPageReader:
+	deferred = None
+
+	def readPage(self, url, callback, errback):
+		self.cancelPage()
+		self.deferred = getPage(url, callback, errback)
+
+	def cancelPage(self):
+		if self.deferred is not None and not self.deferred.called:
+			self.deferred.cancel()
+		self.deferred = None
 #############################################################
 
 
@@ -392,7 +406,7 @@ def CCcamMenuConfigListEntry(name, blacklisted):
 #############################################################
 
 
-class CCcamInfoMain(Screen):
+class CCcamInfoMain(Screen, CCcamInfoPageReader):
 	def __init__(self, session):
 		Screen.__init__(self, session)
 		self.setTitle(_("CCcam Info"))
@@ -436,6 +450,7 @@ class CCcamInfoMain(Screen):
 			}, -2)  # noqa: E123
 
 		self.onLayoutFinish.append(self.updateMenuList)
+		self.onClose.append(self.cancelPage)
 
 	def updateMenuList(self):
 		self.working = True
@@ -501,19 +516,19 @@ class CCcamInfoMain(Screen):
 			sel = self.menu_list[idx]
 
 			if sel == _("General"):
-				getPage(self.url, self.showCCcamGeneral, self.getWebpageError)
+				self.readPage(self.url, self.showCCcamGeneral, self.getWebpageError)
 
 			elif sel == _("Clients"):
-				getPage(self.url + "/clients", self.showCCcamClients, self.getWebpageError)
+				self.readPage(self.url + "/clients", self.showCCcamClients, self.getWebpageError)
 
 			elif sel == _("Active clients"):
-				getPage(self.url + "/activeclients", self.showCCcamClients, self.getWebpageError)
+				self.readPage(self.url + "/activeclients", self.showCCcamClients, self.getWebpageError)
 
 			elif sel == _("Servers"):
-				getPage(self.url + "/servers", self.showCCcamServers, self.getWebpageError)
+				self.readPage(self.url + "/servers", self.showCCcamServers, self.getWebpageError)
 
 			elif sel == _("Shares"):
-				getPage(self.url + "/shares", self.showCCcamShares, self.getWebpageError)
+				self.readPage(self.url + "/shares", self.showCCcamShares, self.getWebpageError)
 
 			elif sel == _("Share View"):
 				self.session.openWithCallback(self.workingFinished, CCcamShareViewMenu, self.url)
@@ -522,10 +537,10 @@ class CCcamInfoMain(Screen):
 				self.session.openWithCallback(self.workingFinished, CCcamInfoShareInfo, "None", self.url)
 
 			elif sel == _("Providers"):
-				getPage(self.url + "/providers", self.showCCcamProviders, self.getWebpageError)
+				self.readPage(self.url + "/providers", self.showCCcamProviders, self.getWebpageError)
 
 			elif sel == _("Entitlements"):
-				getPage(self.url + "/entitlements", self.showCCcamEntitlements, self.getWebpageError)
+				self.readPage(self.url + "/entitlements", self.showCCcamEntitlements, self.getWebpageError)
 
 			elif sel == _("ecm.info"):
 				self.session.openWithCallback(self.showEcmInfoFile, CCcamInfoEcmInfoSelection)
@@ -615,7 +630,7 @@ class CCcamInfoMain(Screen):
 			idx2 = html.index('<BR></BODY>')
 			html = html[idx + 8:idx2].replace("<BR>", "\n").replace("\n\n", "\n")
 			self.infoToShow = html
-			getPage(self.url + "/shares", self.showCCcamGeneral2, self.getWebpageError)
+			self.readPage(self.url + "/shares", self.showCCcamGeneral2, self.getWebpageError)
 		else:
 			self.showInfo(_("Error reading webpage!"), _("Error"))
 
@@ -840,7 +855,7 @@ class CCcamInfoInfoScreen(Screen):
 #############################################################
 
 
-class CCcamShareViewMenu(Screen, HelpableScreen):
+class CCcamShareViewMenu(Screen, HelpableScreen, CCcamInfoPageReader):
 	def __init__(self, session, url):
 		Screen.__init__(self, session)
 		HelpableScreen.__init__(self)
@@ -879,6 +894,7 @@ class CCcamShareViewMenu(Screen, HelpableScreen):
 			}, -1)
 
 		self.onLayoutFinish.append(self.getProviders)
+		self.onClose.append(self.cancelPage)
 		self["key_red"] = Label(_("Cancel"))
 		self["actions"] = ActionMap(["CCcamInfoActions"], {"cancel": self.close, "red": self.close}, -1)
 
@@ -887,7 +903,7 @@ class CCcamShareViewMenu(Screen, HelpableScreen):
 			self.close()
 
 	def getProviders(self):
-		getPage(self.url + "/providers", self.readProvidersCallback, self.readError)
+		self.readPage(self.url + "/providers", self.readProvidersCallback, self.readError)
 
 	def readError(self, error=None):
 		# self.session.open(MessageBox, _("Error reading webpage!"), MessageBox.TYPE_ERROR)
@@ -1074,7 +1090,7 @@ class CCcamShareViewMenu(Screen, HelpableScreen):
 							providername = list[3]
 							caidprovider = self.formatCaidProvider(caid, provider)
 							self.providers.setdefault(caidprovider, providername)
-		getPage(self.url + "/shares", self.readSharesCallback, self.readError)
+		self.readPage(self.url + "/shares", self.readSharesCallback, self.readError)
 
 	def formatCaidProvider(self, caid, provider):
 		pos = provider.find(",")
@@ -1394,7 +1410,7 @@ class CCcamInfoRemoteBoxMenu(Screen):
 #############################################################
 
 
-class CCcamInfoShareInfo(Screen):
+class CCcamInfoShareInfo(Screen, CCcamInfoPageReader):
 	def __init__(self, session, hostname, url):
 		Screen.__init__(self, session)
 		self.session = session
@@ -1422,13 +1438,14 @@ class CCcamInfoShareInfo(Screen):
 			}, -1)  # noqa: E123
 
 		self.onLayoutFinish.append(self.readShares)
+		self.onClose.append(self.cancelPage)
 
 	def exit(self):
 		if not self.working:
 			self.close()
 
 	def readShares(self):
-		getPage(self.url + "/shares", self.readSharesCallback, self.readSharesError)
+		self.readPage(self.url + "/shares", self.readSharesCallback, self.readSharesError)
 
 	def readSharesError(self, error=None):
 		self.session.open(MessageBox, _("Error reading webpage!"), MessageBox.TYPE_ERROR)
@@ -8,6 +8,7 @@ from enigma import eActionMap, eServiceReference, eEPGCache, eServiceCenter, eRC
 from Tools.Profile import profile
 from Components.ActionMap import ActionMap, HelpableActionMap, HelpableNumberActionMap
 from Components.Button import Button
+from Components.BouquetIndex import bouquetIndex
 from Components.ChoiceList import ChoiceList, ChoiceEntryComponent
 from Components.config import config, configfile, ConfigSubsection, ConfigText, ConfigYesNo
 from Components.Input import Input
@@ -337,12 +338,14 @@ class ChannelContextMenu(Screen):
 	def addDedicated3DFlag(self):
 		eDVBDB.getInstance().addFlag(eServiceReference(self.csel.getCurrentSelection().toString()), FLAG_IS_DEDICATED_3D)
 		eDVBDB.getInstance().reloadBouquets()
+		bouquetIndex.invalidate()
 		self.set3DMode(True)
 		self.close()
 
 	def removeDedicated3DFlag(self):
 		eDVBDB.getInstance().removeFlag(eServiceReference(self.csel.getCurrentSelection().toString()), FLAG_IS_DEDICATED_3D)
 		eDVBDB.getInstance().reloadBouquets()
+		bouquetIndex.invalidate()
 		self.set3DMode(False)
 		self.close()
 
@@ -359,12 +362,14 @@ class ChannelContextMenu(Screen):
 	def addCenterDVBSubsFlag(self):
 		eDVBDB.getInstance().addFlag(eServiceReference(self.csel.getCurrentSelection().toString()), FLAG_CENTER_DVB_SUBS)
 		eDVBDB.getInstance().reloadBouquets()
+		bouquetIndex.invalidate()
 		config.subtitles.dvb_subtitles_centered.value = True
 		self.close()
 
 	def removeCenterDVBSubsFlag(self):
 		eDVBDB.getInstance().removeFlag(eServiceReference(self.csel.getCurrentSelection().toString()), FLAG_CENTER_DVB_SUBS)
 		eDVBDB.getInstance().reloadBouquets()
+		bouquetIndex.invalidate()
 		config.subtitles.dvb_subtitles_centered.value = False
 		self.close()
 
@@ -425,6 +430,7 @@ class ChannelContextMenu(Screen):
 				self.csel.toggleMoveMode()
 			self.csel.removeBouquet()
 			eDVBDB.getInstance().reloadBouquets()
+			bouquetIndex.invalidate()
 			self.close()
 
 	def purgeDeletedBouquets(self):
@@ -448,6 +454,7 @@ class ChannelContextMenu(Screen):
 		eDVBDBInstance = eDVBDB.getInstance()
 		eDVBDBInstance.setLoadUnlinkedUserbouquets(True)
 		eDVBDBInstance.reloadBouquets()
+		bouquetIndex.invalidate()
 		eDVBDBInstance.setLoadUnlinkedUserbouquets(config.misc.load_unlinked_userbouquets.value)
 		refreshServiceList()
 		self.csel.showFavourites()
@@ -932,6 +939,7 @@ class ChannelSelectionEdit:
 			root = self.getRoot()
 		list = root and serviceHandler.list(root)
 		if list is not None:
+			bouquetIndex.invalidate()  # The numbers change with the edits.
 			return list.startEdit()
 		return None
 
@@ -996,6 +1004,7 @@ class ChannelSelectionEdit:
 				mutableBouquet.removeService(cur_service.ref)
 				mutableBouquet.flushChanges()
 				eDVBDB.getInstance().reloadBouquets()
+				bouquetIndex.invalidate()
 				mutableAlternatives = new_ref.list().startEdit()
 				if mutableAlternatives:
 					mutableAlternatives.setListName(servicename)
@@ -1030,6 +1039,7 @@ class ChannelSelectionEdit:
 			if not mutableBouquetList.addService(new_bouquet_ref):
 				mutableBouquetList.flushChanges()
 				eDVBDB.getInstance().reloadBouquets()
+				bouquetIndex.invalidate()
 				mutableBouquet = serviceHandler.list(new_bouquet_ref).startEdit()
 				if mutableBouquet:
 					mutableBouquet.setListName(bName)
@@ -1415,17 +1425,9 @@ class ChannelSelectionBase(Screen, HelpableScreen):
 			return 0
 		offset = 0
 		if 'userbouquet.' in bouquet.toCompareString():
-			serviceHandler = eServiceCenter.getInstance()
-			servicelist = serviceHandler.list(bouquet)
-			if servicelist is not None:
-				while True:
-					serviceIterator = servicelist.getNext()
-					if not serviceIterator.valid():  # check if end of list
-						break
-					number = serviceIterator.getChannelNum()
-					if number > 0:
-						offset = number - 1
-						break
+			number = bouquetIndex.getFirstNumber(bouquet)
+			if number > 0:
+				offset = number - 1
 		return offset
 
 	def recallBouquetMode(self):
@@ -93,11 +93,11 @@ class FactoryReset(Setup, ProtectedScreen):
 				self.keymaps.append(file)
 			elif file in ("automounts.xml",):
 				self.networks.append(file)
-			elif file in ("resumepoints.pkl",):
+			elif file in ("resumepoints.journal", "resumepoints.pkl"):
 				self.resumePoints.append(file)
-			elif file in ("settings",):
+			elif file in ("settings", "settings.cache"):
 				self.settings.append(file)
-			elif file in ("autotimer.xml", "pm_timers.xml", "timers.xml"):
+			elif file in ("autotimer.xml", "pm_timers.xml", "timers.xml", "timers.journal"):
 				self.timers.append(file)
 			elif file.startswith("bouquets."):
 				self.bouquets.append(file)
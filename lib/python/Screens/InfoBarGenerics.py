@@ -1,10 +1,12 @@
 # -*- coding: utf-8 -*-
 from Components.ActionMap import ActionMap, HelpableActionMap, HelpableNumberActionMap, NumberActionMap
-from Components.Harddisk import harddiskmanager, findMountPoint
+from Components.BouquetIndex import bouquetIndex
+from Components.Harddisk import harddiskmanager
 from Components.Input import Input
 from Components.Label import Label
 from Components.MovieList import AUDIO_EXTENSIONS
 from Components.PluginComponent import plugins
+from Components.ResumePoints import resumePoints
 from Components.ServiceEventTracker import ServiceEventTracker
 from Components.Sources.ServiceEvent import ServiceEvent
 from Components.Sources.Boolean import Boolean
@@ -63,7 +65,6 @@ from os import listdir, path as ospath
 from sys import maxsize
 import itertools
 import datetime
-from pickle import load as pickle_load, dump as pickle_dump, HIGHEST_PROTOCOL as pickle_HIGHEST_PROTOCOL
 from gettext import dgettext
 from re import match
 
@@ -82,7 +83,6 @@ def isMoviePlayerInfoBar(self):
 
 
 def setResumePoint(session):
-	global resumePointCache, resumePointCacheLast
 	service = session.nav.getCurrentService()
 	ref = session.nav.getCurrentlyPlayingServiceOrGroup()
 	if (service is not None) and (ref is not None):  # and (ref.type != 1):
@@ -91,74 +91,36 @@ def setResumePoint(session):
 		if seek:
 			pos = seek.getPlayPosition()
 			if not pos[0]:
-				key = ref.toString()
-				lru = int(time())
 				sl = seek.getLength()
 				if sl:
 					sl = sl[1]
 				else:
 					sl = None
-				resumePointCache[key] = [lru, pos[1], sl]
-				for k, v in list(resumePointCache.items()):
-					if v[0] < lru:
-						candidate = k
-						filepath = ospath.realpath(candidate.split(':')[-1])
-						mountpoint = findMountPoint(filepath)
-						if ospath.ismount(mountpoint) and not ospath.exists(filepath):
-							del resumePointCache[candidate]
-				saveResumePoints()
+				resumePointCache.set(ref.toString(), pos[1], sl)
 
 
 def delResumePoint(ref):
-	global resumePointCache, resumePointCacheLast
-	try:
-		del resumePointCache[ref.toString()]
-	except KeyError:
-		pass
-	saveResumePoints()
+	resumePointCache.remove(ref.toString())
 
 
 def getResumePoint(session):
-	global resumePointCache
 	ref = session.nav.getCurrentlyPlayingServiceOrGroup()
 	if (ref is not None) and (ref.type != 1):
-		try:
-			entry = resumePointCache[ref.toString()]
-			entry[0] = int(time())  # update LRU timestamp
-			return entry[1]
-		except KeyError:
-			return None
+		entry = resumePointCache.use(ref.toString())
+		return entry and entry[1]
 
 
+# The resume points are written in batches, this writes the pending changes
+# (at shutdown).
 def saveResumePoints():
-	global resumePointCache, resumePointCacheLast
-	try:
-		f = open('/etc/enigma2/resumepoints.pkl', 'wb')
-		pickle_dump(resumePointCache, f, pickle_HIGHEST_PROTOCOL)
-		f.close()
-	except Exception as ex:
-		print("[InfoBarGenerics] Failed to write resumepoints:%s" % ex)
-	resumePointCacheLast = int(time())
-
-
-def loadResumePoints():
-	try:
-		file = open('/etc/enigma2/resumepoints.pkl', 'rb')
-		PickleFile = pickle_load(file)
-		file.close()
-		return PickleFile
-	except Exception as ex:
-		print("[InfoBarGenerics] Failed to load resumepoints:%s" % ex)
-		return {}
+	resumePointCache.save()
 
 
 def updateresumePointCache():
-	global resumePointCache
-	resumePointCache = loadResumePoints()
+	resumePointCache.reload()
 
 
-resumePointCache = loadResumePoints()
-resumePointCacheLast = int(time())
+resumePointCache = resumePoints
 
 
 class whitelist:
@@ -1219,37 +1181,19 @@ class InfoBarNumberZap:
 			self.selectAndStartService(service, bouquet)
 
 	def searchNumberHelper(self, serviceHandler, num, bouquet):
-		servicelist = serviceHandler.list(bouquet)
-		if servicelist:
-			serviceIterator = servicelist.getNext()
-			while serviceIterator.valid():
-				if num == serviceIterator.getChannelNum():
-					return serviceIterator
-				serviceIterator = servicelist.getNext()
-		return None
+		return bouquetIndex.getService(bouquet, num)
 
 	def searchNumber(self, number, firstBouquetOnly=False, bouquet=None):
 		bouquet = bouquet or self.servicelist.getRoot()
 		service = None
-		serviceHandler = eServiceCenter.getInstance()
 		if not firstBouquetOnly:
-			service = self.searchNumberHelper(serviceHandler, number, bouquet)
+			service = bouquetIndex.getService(bouquet, number)
 		if config.usage.multibouquet.value and not service:
-			bouquet = self.servicelist.bouquet_root
-			bouquetlist = serviceHandler.list(bouquet)
-			if bouquetlist:
-				bouquet = bouquetlist.getNext()
-				while bouquet.valid():
-					if bouquet.flags & eServiceReference.isDirectory and not bouquet.flags & eServiceReference.isInvisible:
-						service = self.searchNumberHelper(serviceHandler, number, bouquet)
-						if service:
-							playable = not (service.flags & (eServiceReference.isMarker | eServiceReference.isDirectory)) or (service.flags & eServiceReference.isNumberedMarker)
-							if not playable:
-								service = None
-							break
-						if config.usage.alternative_number_mode.value or firstBouquetOnly:
-							break
-					bouquet = bouquetlist.getNext()
+			service, bouquet = bouquetIndex.findNumber(self.servicelist.bouquet_root, number, config.usage.alternative_number_mode.value or firstBouquetOnly)
+			if service:
+				playable = not (service.flags & (eServiceReference.isMarker | eServiceReference.isDirectory)) or (service.flags & eServiceReference.isNumberedMarker)
+				if not playable:
+					service = None
 		return service, bouquet
 
 	def selectAndStartService(self, service, bouquet):
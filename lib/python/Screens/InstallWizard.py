@@ -1,8 +1,10 @@
 from Screens.Screen import Screen
+from Components.BouquetIndex import bouquetIndex
 from Components.ConfigList import ConfigListScreen
 from Components.Sources.StaticText import StaticText
 from Components.config import config, ConfigSubsection, ConfigBoolean, getConfigListEntry, ConfigSelection, ConfigYesNo, ConfigIP
 from Components.Network import iNetwork
+from Components.ServiceMetadataIndex import serviceMetadataIndex
 from Components.Ipkg import IpkgComponent
 from enigma import eDVBDB
 
@@ -145,5 +147,7 @@ class InstallWizardIpkgUpdater(Screen):
 				else:
 					config.misc.installwizard.channellistdownloaded.value = True
 					eDVBDB.getInstance().reloadBouquets()
+					bouquetIndex.invalidate()
 					eDVBDB.getInstance().reloadServicelist()
+					serviceMetadataIndex.invalidate()
 			self.close()
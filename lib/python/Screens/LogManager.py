@@ -8,6 +8,7 @@ from Components.Button import Button
 from Components.config import config, configfile
 from Components.FileList import FileList, MultiFileSelectList
 from Components.GUIComponent import GUIComponent
+from Components.Harddisk import getProcMounts
 from Components.Label import Label
 from Components.MenuList import MenuList
 import Components.Task
@@ -74,13 +75,9 @@ class LogManagerPoller:
 		ctimeLimit = time() - (config.crash.daysloglimit.value * 3600 * 24)
 		allowedBytes = 1024 * 1024 * int(config.crash.sizeloglimit.value)
 
-		mounts = []
 		matches = []
 		print("[LogManager] probing folders")
-		with open("/proc/mounts", "r") as f:
-			for line in f.readlines():
-				parts = line.strip().split()
-				mounts.append(parts[1])
+		mounts = [parts[1] for parts in getProcMounts()]
 
 		for mount in mounts:
 			if path.isdir(path.join(mount, 'logs')):
@@ -5,7 +5,7 @@ import struct
 from Components.ActionMap import HelpableActionMap
 from Components.ChoiceList import ChoiceEntryComponent, ChoiceList
 from Components.Console import Console
-from Components.Harddisk import Harddisk
+from Components.Harddisk import Harddisk, getProcMounts
 from Components.Sources.StaticText import StaticText
 from Components.SystemInfo import SystemInfo
 from Screens.HelpMenu import HelpableScreen
@@ -142,19 +142,18 @@ class MultiBootSelector(Screen, HelpableScreen):
 		usblist = list(SystemInfo["HasUsbhdd"].keys())
 		print("[MultiBootSelector] usblist=", usblist)
 		if not SystemInfo["VuUUIDSlot"]:
-			with open("/proc/mounts", "r") as fd:
-				xlines = fd.readlines()
-				# print("[MultiBootSelector] xlines", xlines)
-				for hddkey in range(len(usblist)):
-					for xline in xlines:
-						print("[MultiBootSelector] xline, usblist", xline, "   ", usblist[hddkey])
-						if xline.find(usblist[hddkey]) != -1 and "ext4" in xline:
-							index = xline.find(usblist[hddkey])
-							print("[MultiBootSelector] key, line ", usblist[hddkey], "   ", xline)
-							hdd.append(xline[index:index + 4])
-						else:
-							continue
-							# print("[MultiBootSelector] key, not in line ", usblist[hddkey], "   ", xline)
+			xlines = [" ".join(parts) for parts in getProcMounts()]
+			# print("[MultiBootSelector] xlines", xlines)
+			for hddkey in range(len(usblist)):
+				for xline in xlines:
+					print("[MultiBootSelector] xline, usblist", xline, "   ", usblist[hddkey])
+					if xline.find(usblist[hddkey]) != -1 and "ext4" in xline:
+						index = xline.find(usblist[hddkey])
+						print("[MultiBootSelector] key, line ", usblist[hddkey], "   ", xline)
+						hdd.append(xline[index:index + 4])
+					else:
+						continue
+						# print("[MultiBootSelector] key, not in line ", usblist[hddkey], "   ", xline)
 			print("[MultiBootSelector] hdd available ", hdd)
 			if not hdd:
 				self.session.open(MessageBox, _("[MultiBootSelector][add USB STARTUP slots] - No EXT4 USB attached."), MessageBox.TYPE_INFO, timeout=10)
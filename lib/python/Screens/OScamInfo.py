@@ -4,6 +4,7 @@ from operator import itemgetter
 from xml.etree import ElementTree
 
 from enigma import eTimer, RT_HALIGN_LEFT, eListboxPythonMultiContent, gFont, getDesktop
+from twisted.internet.defer import CancelledError, FirstError, gatherResults, succeed
 
 from Components.About import about
 from Components.ActionMap import ActionMap, NumberActionMap
@@ -12,6 +13,7 @@ from Components.ConfigList import ConfigListScreen
 from Components.MenuList import MenuList
 from Components.Sources.List import List
 from Components.Sources.StaticText import StaticText
+from Components.WebIfClient import WebIfError, webIfClient
 from Screens.ChoiceBox import ChoiceBox
 from Screens.MessageBox import MessageBox
 from Screens.Screen import Screen
@@ -19,9 +21,6 @@ import skin
 from Tools.LoadPixmap import LoadPixmap
 from Tools.Directories import SCOPE_CURRENT_SKIN, resolveFilename, fileExists
 
-# required methods: Request, urlopen, URLError, HTTPHandler, HTTPPasswordMgrWithDefaultRealm, HTTPDigestAuthHandler, build_opener, install_opener
-from urllib.request import urlopen, Request, HTTPHandler, HTTPPasswordMgrWithDefaultRealm, HTTPDigestAuthHandler, build_opener, install_opener
-from urllib.error import URLError
 import urllib.parse
 
 
@@ -74,6 +73,7 @@ class OscamInfo:
 		CAID_SRVID: _("Caid:Srvid"), SRVNAME: _("Channel Name"),
 		ECMTIME: _("Ecm Time"), IP_PORT: _("IP Address")}
 	version = ""
+	deferred = None
 
 	def confPath(self):
 		owebif = False
@@ -150,7 +150,9 @@ class OscamInfo:
 				ret = [user, pwd, port, ipconfigured]
 		return ret
 
-	def openWebIF(self, part=None, reader=None):
+	# Returns True and the url of the page of the webif, or False and an error
+	# message.
+	def getWebIfUrl(self, part=None, reader=None):
 		NAMEBIN = check_NAMEBIN()
 		self.proto = "http"
 		# print("[OscamInfo][openWebIF] NAMEBIN part", NAMEBIN, "   ", part)
@@ -185,7 +187,7 @@ class OscamInfo:
 			# print("[OscamInfo][openWebIF]2 self.ip self.port  self.username self.password", self.ip, "   ", self.port, "   ", self.username, "   ",  self.password)
 		if self.port.startswith('+'):
 			self.proto = "https"
-			self.port.replace("+", "")
+			self.port = self.port.replace("+", "")
 			# print("[OscamInfo][openWebIF] NAMEBIN=%s, CAM=%s" % (NAMEBIN, NAMEBIN))
 		if part is None:
 			self.url = "%s://%s:%s/%sapi.html?part=status" % (self.proto, self.ip, self.port, NAMEBIN)
@@ -196,29 +198,45 @@ class OscamInfo:
 			self.url = "%s://%s:%s/%sapi.html?part=%s&label=%s" % (self.proto, self.ip, self.port, NAMEBIN, part, urllib.parse.quote_plus(reader))
 		# print("[OscamInfo][openWebIF] NAMEBIN=%s, NAMEBIN=%s url=%s" % (NAMEBIN, NAMEBIN, self.url))
 		# print("[OscamInfo][openWebIF] self.url=%s" % self.url)
-		opener = build_opener(HTTPHandler)
-		if not self.username == "":
-			pwman = HTTPPasswordMgrWithDefaultRealm()
-			pwman.add_password(None, self.url, self.username, self.password)
-			handlers = HTTPDigestAuthHandler(pwman)
-			opener = build_opener(HTTPHandler, handlers)
-			install_opener(opener)
-		request = Request(self.url)
-		err = False
-		try:
-			data = urlopen(request).read()
-			# print("[OscamInfo][openWebIF] data=", data)
-		except URLError as e:
-			print("[OscamInfo][openWebIF] error: %s" % e)
-			if hasattr(e, "reason"):
-				err = str(e.reason)
-			elif hasattr(e, "code"):
-				err = str(e.code)
-		if err is not False:
-			print("[OscamInfo][openWebIF] error: %s" % err)
-			return False, err
-		else:
-			return True, data.decode(encoding="UTF-8", errors="ignore")
+		return True, self.url
+
+	# Returns a deferred firing with True and the page, parsed while it is
+	# received unless xml is False, or with False and an error message. The
+	# request runs on the reactor and is shared with the other screens asking
+	# for the same page at the same time.
+	def openWebIF(self, part=None, reader=None, xml=True):
+		result = self.getWebIfUrl(part, reader)
+		if not result[0]:
+			return succeed(result)
+		deferred = webIfClient.getPage(self.url, self.username or None, self.password, xml)
+		deferred.addCallback(lambda data: (True, data if xml else data.decode(encoding="UTF-8", errors="ignore")))
+		deferred.addErrback(self.webIfError)
+		return deferred
+
+	def webIfError(self, failure):
+		if failure.check(CancelledError):
+			return failure
+		err = failure.value.reason if failure.check(WebIfError) else failure.getErrorMessage()
+		print("[OscamInfo][openWebIF] error: %s" % err)
+		return False, err
+
+	# Calls the callback with the result of the deferred unless the screen was
+	# closed or asked for new data in the meantime.
+	def fetch(self, deferred, callback):
+		self.cancelFetch()
+		self.deferred = deferred
+		deferred.addCallback(callback)
+		deferred.addErrback(self.fetchCancelled)
+
+	def fetchCancelled(self, failure):
+		if failure.check(FirstError):
+			failure = failure.value.subFailure
+		failure.trap(CancelledError)
+
+	def cancelFetch(self):
+		if self.deferred is not None and not self.deferred.called:
+			self.deferred.cancel()
+		self.deferred = None
 
 	def readXML(self, typ):
 		if typ == "l":
@@ -227,19 +245,22 @@ class OscamInfo:
 		else:
 			self.showLog = False
 			part = None
-		result = self.openWebIF(part)			# returns True/False and data or error
+		return self.openWebIF(part, xml=not self.showLog).addCallback(self.parseXML, typ)
+
+	def parseXML(self, result, typ):
 		retval = []
 		tmp = {}
 		if result[0]:
 			# print("[OscamInfo][readXML] show typ, result 0,1", typ, "   ", result[0], "  ", result[1])
-			if not self.showLog:
-				dataXML = ElementTree.XML(result[1])
+			if typ != "l":
+				dataXML = result[1]
 				if typ == "version":
 					if "version" in dataXML.attrib:
 						self.version = dataXML.attrib["version"]
 					else:
 						self.version = "n/a"
 					return self.version
+				self.version = dataXML.attrib.get("revision", _("n/a"))
 				status = dataXML.find("status")
 				clients = status.findall("client")
 				for client in clients:
@@ -283,6 +304,7 @@ class OscamInfo:
 					tmp = result[1]
 				print("[OscamInfo][readXML] show tmp", tmp)
 				dataXML = ElementTree.XML(tmp)
+				self.version = dataXML.attrib.get("revision", _("n/a"))
 				log = dataXML.find("log")
 				logtext = log.text
 			if typ == "s":
@@ -314,36 +336,26 @@ class OscamInfo:
 			print("[OscamInfo][readXML] result result[1]", result[0], "   ", result[1])
 			return result[0], result[1]
 
-	def getVersion(self):
-		dataWebif = self.openWebIF()
-		print("[OscamInfo][getVersion] dataWebif", dataWebif)
-		if dataWebif[0]:
-			dataXML = ElementTree.XML(dataWebif[1])
-			if "revision" in dataXML.attrib:
-				self.version = dataXML.attrib["revision"]
-			else:
-				self.version = _("n/a")
-			return self.version
-		else:
-			self.version = _("n/a")
-		return self.version
-
 	def getTotalCards(self, reader):
-		dataWebif = self.openWebIF(part="entitlement", reader=reader)
+		return self.openWebIF(part="entitlement", reader=reader).addCallback(self.parseTotalCards)
+
+	def parseTotalCards(self, dataWebif):
 		if dataWebif[0]:
-			dataXML = ElementTree.XML(dataWebif[1])
-			cards = dataXML.find("reader").find("cardlist")
+			cards = dataWebif[1].find("reader").find("cardlist")
 			cardTotal = cards.attrib["totalcards"]
 			return cardTotal
 		else:
 			return None
 
+	# Returns a deferred firing with the list of readers, the readers of the
+	# protocol spec are listed with their number of cards.
 	def getReaders(self, spec=None):
-		dataWebif = self.openWebIF()
+		return self.openWebIF().addCallback(self.parseReaders, spec)
+
+	def parseReaders(self, dataWebif, spec):
 		readers = []
 		if dataWebif[0]:
-			dataXML = ElementTree.XML(dataWebif[1])
-			status = dataXML.find("status")
+			status = dataWebif[1].find("status")
 			clients = status.findall("client")
 			for client in clients:
 				if "type" in client.attrib:
@@ -352,22 +364,25 @@ class OscamInfo:
 							proto = client.attrib["protocol"]
 							if spec in proto:
 								name = client.attrib["name"]
-								cards = self.getTotalCards(name)
-								readers.append((_("%s ( %s Cards )") % (name, cards), name))
+								readers.append((name, self.getTotalCards(name)))
 						else:
 							if client.attrib["name"] != "" and client.attrib["name"] != "" and client.attrib["protocol"] != "":
 								readers.append((client.attrib["name"], client.attrib["name"]))  # return tuple for later use in Choicebox
+			if spec is not None:
+				names = [name for name, cards in readers]
+				return gatherResults([cards for name, cards in readers], consumeErrors=True).addCallback(lambda cards: [(_("%s ( %s Cards )") % (name, total), name) for name, total in zip(names, cards)])
 			print("[OscamInfo][getReaders] readers", readers)
 			return readers
 		else:
 			return None
 
 	def getClients(self):
-		dataWebif = self.openWebIF()
+		return self.openWebIF().addCallback(self.parseClients)
+
+	def parseClients(self, dataWebif):
 		clientnames = []
 		if dataWebif[0]:
-			dataXML = ElementTree.XML(dataWebif[1])
-			status = dataXML.find("status")
+			status = dataWebif[1].find("status")
 			clients = status.findall("client")
 			for client in clients:
 				if "type" in client.attrib and client.attrib["type"] == "c":
@@ -443,6 +458,7 @@ class OscamInfoMenu(Screen):
 						"down": self.down
 						}, -1)  # noqa: E123
 		self.onLayoutFinish.append(self.showMenu)
+		self.onClose.append(self.osc.cancelFetch)
 
 	def ok(self):
 		selected = self["mainmenu"].getSelectedIndex()
@@ -505,30 +521,32 @@ class OscamInfoMenu(Screen):
 			elif entry == 3:
 				self.session.open(oscInfo, "l")
 			elif entry == 4:
-				osc = OscamInfo()
-				reader = osc.getReaders("cccam")  # get list of available CCcam-Readers
-				if isinstance(reader, list):
-					if len(reader) == 1:
-						self.session.open(oscEntitlements, reader[0][1])
-					else:
-						self.callbackmode = "cccam"
-						self.session.openWithCallback(self.chooseReaderCallback, ChoiceBox, title=_("Choose CCcam-Reader"), list=reader)
+				self.osc.fetch(self.osc.getReaders("cccam"), self.cccamReadersReceived)  # get list of available CCcam-Readers
 			elif entry == 5:
-				osc = OscamInfo()
-				reader = osc.getReaders()
-				if reader is not None:
-					reader.append((_("All"), "all"))
-					if isinstance(reader, list):
-						if len(reader) == 1:
-							self.session.open(oscReaderStats, reader[0][1])
-						else:
-							self.callbackmode = "readers"
-							self.session.openWithCallback(self.chooseReaderCallback, ChoiceBox, title=_("Choose reader"), list=reader)
+				self.osc.fetch(self.osc.getReaders(), self.readersReceived)
 			elif entry == 6:
 				self.session.open(OscamInfoConfigScreen)
 		else:
 			self.session.open(MessageBox, _("Oscam/Ncam not running - start Cam to obtain information."), MessageBox.TYPE_INFO)
 
+	def cccamReadersReceived(self, reader):
+		if isinstance(reader, list):
+			if len(reader) == 1:
+				self.session.open(oscEntitlements, reader[0][1])
+			else:
+				self.callbackmode = "cccam"
+				self.session.openWithCallback(self.chooseReaderCallback, ChoiceBox, title=_("Choose CCcam-Reader"), list=reader)
+
+	def readersReceived(self, reader):
+		if reader is not None:
+			reader.append((_("All"), "all"))
+			if isinstance(reader, list):
+				if len(reader) == 1:
+					self.session.open(oscReaderStats, reader[0][1])
+				else:
+					self.callbackmode = "readers"
+					self.session.openWithCallback(self.chooseReaderCallback, ChoiceBox, title=_("Choose reader"), list=reader)
+
 	def chooseReaderCallback(self, retval):
 		print(retval)
 		if retval is not None:
@@ -630,10 +648,9 @@ class oscInfo(Screen, OscamInfo):
 		global HDSKIN, sizeH
 		self.session = session
 		self.what = what
-		self.firstrun = True
 		self.listchange = True
 		self.scrolling = False
-		self.webif_data = self.readXML(typ=self.what)
+		self.out = []
 		ypos = 10
 		ysize = 350
 		self.rows = 12
@@ -690,6 +707,7 @@ class oscInfo(Screen, OscamInfo):
 				"moveDown": self.key_moveDown
 			}, -1)  # noqa: E123
 		self.onLayoutFinish.append(self.showData)
+		self.onClose.append(self.cancelFetch)
 
 	def key_ok(self):
 		self.disableScrolling()
@@ -805,12 +823,10 @@ class oscInfo(Screen, OscamInfo):
 		return res
 
 	def showData(self):
+		self.fetch(self.readXML(typ=self.what), self.dataReceived)
+
+	def dataReceived(self, data):
 		NAMEBIN2 = check_NAMEBIN2()
-		if self.firstrun:
-			data = self.webif_data
-			self.firstrun = False
-		else:
-			data = self.readXML(typ=self.what)
 		self.out = []
 		self.itemheight = 25
 		# print("[OscamInfo][showData] data[0], data[1]", data[0], "   ", data[1])
@@ -827,17 +843,17 @@ class oscInfo(Screen, OscamInfo):
 					if i != "":
 						self.out.append(self.buildLogListEntry((i,)))
 			if self.what == "c":
-				self.setTitle(_("Client %s-%s") % (NAMEBIN2, self.getVersion()))
+				self.setTitle(_("Client %s-%s") % (NAMEBIN2, self.version))
 				self["key_green"].setText("")
 				self["key_yellow"].setText(_("Servers"))
 				self["key_blue"].setText(_("Log"))
 			elif self.what == "s":
-				self.setTitle(_("Server %s-%s") % (NAMEBIN2, self.getVersion()))
+				self.setTitle(_("Server %s-%s") % (NAMEBIN2, self.version))
 				self["key_green"].setText(_("Clients"))
 				self["key_yellow"].setText("")
 				self["key_blue"].setText(_("Log"))
 			elif self.what == "l":
-				self.setTitle(_("Log %s-%s") % (NAMEBIN2, self.getVersion()))
+				self.setTitle(_("Log %s-%s") % (NAMEBIN2, self.version))
 				self["key_green"].setText(_("Clients"))
 				self["key_yellow"].setText(_("Servers"))
 				self["key_blue"].setText("")
@@ -935,6 +951,7 @@ class oscEntitlements(Screen, OscamInfo):
 			}, -1)  # noqa: E123
 		self["key_red"] = StaticText(_("Close"))
 		self.onLayoutFinish.append(self.showData)
+		self.onClose.append(self.cancelFetch)
 
 	def exit(self):
 		self.close()
@@ -969,8 +986,13 @@ class oscEntitlements(Screen, OscamInfo):
 		return res
 
 	def showData(self):
-		dataWebif_for_reader = self.openWebIF(part="entitlement", reader=self.cccamreader)
-		dataReader = ElementTree.XML(dataWebif_for_reader[1])
+		self.fetch(self.openWebIF(part="entitlement", reader=self.cccamreader), self.dataReceived)
+
+	def dataReceived(self, dataWebif_for_reader):
+		if not dataWebif_for_reader[0]:
+			self.setTitle(_("Error") + ": " + dataWebif_for_reader[1])
+			return
+		dataReader = dataWebif_for_reader[1]
 		reader = dataReader.find("reader")
 		if "hostaddress" in reader.attrib:
 			hostadr = reader.attrib["hostaddress"]
@@ -1077,6 +1099,7 @@ class oscReaderStats(Screen, OscamInfo):
 			}, -1)  # noqa: E123
 		self["key_red"] = StaticText(_("Close"))
 		self.onLayoutFinish.append(self.showData)
+		self.onClose.append(self.cancelFetch)
 
 	def exit(self):
 		self.close()
@@ -1114,14 +1137,20 @@ class oscReaderStats(Screen, OscamInfo):
 		return sorted(datalist, key=itemgetter(sort_col), reverse=reverse)
 
 	def showData(self):
-		readers = self.getReaders()
+		self.fetch(self.getReaders().addCallback(self.readersReceived), self.dataReceived)
+
+	# Asks for the statistics of all readers at the same time.
+	def readersReceived(self, readers):
+		readers = readers or []
+		return gatherResults([self.openWebIF(part="readerstats", reader=i[1]) for i in readers], consumeErrors=True).addCallback(lambda stats: list(zip(readers, stats)))
+
+	def dataReceived(self, data):
 		result = []
 		title2 = ""
-		for i in readers:
-			dataWebif = self.openWebIF(part="readerstats", reader=i[1])
+		for i, dataWebif in data:
 			# emm_wri = emm_ski = emm_blk = emm_err = ""
 			if dataWebif[0]:
-				dataReader = ElementTree.XML(dataWebif[1])
+				dataReader = dataWebif[1]
 				rdr = dataReader.find("reader")
 				# emms = rdr.find("emmstats")
 				# if "totalwritten" in emms.attrib:
@@ -4,6 +4,7 @@ from enigma import eConsoleAppContainer, eDVBDB, eTimer
 
 from Components.ActionMap import ActionMap, NumberActionMap
 from Components.Button import Button
+from Components.BouquetIndex import bouquetIndex
 from Components.config import config, ConfigSubsection, ConfigYesNo, ConfigText
 from Components.Harddisk import harddiskmanager
 from Components import Ipkg
@@ -12,6 +13,7 @@ from Components.Language import language
 from Components.OnlineUpdateCheck import feedsstatuscheck, kernelMismatch
 from Components.PluginComponent import plugins
 from Components.PluginList import PluginList, PluginEntryComponent, PluginCategoryComponent, PluginDownloadComponent
+from Components.ServiceMetadataIndex import serviceMetadataIndex
 from Components.Sources.StaticText import StaticText
 from Components.SystemInfo import SystemInfo
 from Plugins.Plugin import PluginDescriptor
@@ -379,7 +381,9 @@ class PluginDownloadBrowser(Screen):
 		if self.reload_settings:
 			self["text"].setText(_("Reloading bouquets and services..."))
 			eDVBDB.getInstance().reloadBouquets()
+			bouquetIndex.invalidate()
 			eDVBDB.getInstance().reloadServicelist()
+			serviceMetadataIndex.invalidate()
 		plugins.readPluginList(resolveFilename(SCOPE_PLUGINS))
 		self.container.appClosed.remove(self.runFinished)
 		self.container.dataAvail.remove(self.dataAvail)
@@ -9,7 +9,7 @@ from Screens.MessageBox import MessageBox
 from Screens.Setup import Setup
 from Tools.camcontrol import CamControl
 from Tools.Directories import fileExists
-from Tools.GetEcmInfo import GetEcmInfo
+from Tools.GetEcmInfo import GetEcmInfo, ecmInfoWatcher
 
 
 class SoftcamScript(Setup):
@@ -30,11 +30,18 @@ class SoftcamScript(Setup):
 		self["infoActions"].setEnabled(False)
 		(newEcmFound, ecmInfo) = self.ecminfo.getEcm()
 		self["info"] = ScrollLabel("".join(ecmInfo))
-		self.EcmInfoPollTimer = eTimer()
-		self.EcmInfoPollTimer.callback.append(self.setEcmInfo)
-		self.EcmInfoPollTimer.start(1000)
+		if ecmInfoWatcher.watch():
+			ecmInfoWatcher.subscribe(self.setEcmInfo)
+			self.onClose.append(self.removeEcmInfoSubscription)
+		else:
+			self.EcmInfoPollTimer = eTimer()
+			self.EcmInfoPollTimer.callback.append(self.setEcmInfo)
+			self.EcmInfoPollTimer.start(1000)
 		self.onShown.append(self.updateButtons)
 
+	def removeEcmInfoSubscription(self):
+		ecmInfoWatcher.unsubscribe(self.setEcmInfo)
+
 	def selectionChanged(self):
 		self.updateButtons()
 		Setup.selectionChanged(self)
@@ -77,7 +84,7 @@ class SoftcamScript(Setup):
 			from Screens.CCcamInfo import CCcamInfoMain
 			self.session.open(CCcamInfoMain)
 
-	def setEcmInfo(self):
+	def setEcmInfo(self, data=None, info=None):
 		(newEcmFound, ecmInfo) = self.ecminfo.getEcm()
 		if newEcmFound:
 			self["info"].setText("".join(ecmInfo))
@@ -2,9 +2,11 @@ from enigma import eTimer, eDVBDB
 
 from Components.ActionMap import ActionMap
 from Components.Button import Button
+from Components.BouquetIndex import bouquetIndex
 from Components.config import config
 from Components.Ipkg import IpkgComponent
 from Components.Pixmap import Pixmap
+from Components.ServiceMetadataIndex import serviceMetadataIndex
 from Components.Label import Label
 from Components.ScrollLabel import ScrollLabel  # noqa: F401
 from Components.Sources.StaticText import StaticText
@@ -312,7 +314,9 @@ class UpdatePlugin(Screen, ProtectedScreen):
 				elif self.channellist_only == 4:
 					self.showUpdateCompletedMessage()
 					eDVBDB.getInstance().reloadBouquets()
+					bouquetIndex.invalidate()
 					eDVBDB.getInstance().reloadServicelist()
+					serviceMetadataIndex.invalidate()
 			elif self.error == 0:
 				self.showUpdateCompletedMessage()
 			else:
@@ -1,6 +1,7 @@
 import glob
 from Components.config import config, configfile
 from Components.Console import Console
+from Components.Harddisk import getProcMounts
 from Components.Pixmap import Pixmap
 from Components.Sources.Boolean import Boolean
 from Components.SystemInfo import SystemInfo
@@ -109,12 +110,10 @@ class VuWizard(WizardLanguage, Rc):
 					cmdlist.append("mv %s %s" % (file, file.replace("force.update", "noforce.update")))						# remove Vu force update(Vu+ Zero4k)
 				hddExt4 = False
 				if pathExists("/media/hdd"):
-					with open("/proc/mounts", "r") as fd:
-						xlines = fd.readlines()
-						for xline in xlines:
-							if xline.find("/media/hdd") != -1 and "ext4" in xline:
-								hddExt4 = True
-								break
+					for parts in getProcMounts():
+						if parts[1].find("/media/hdd") != -1 and parts[2] == "ext4":
+							hddExt4 = True
+							break
 				if hddExt4 and pathExists("/media/hdd/%s/linuxrootfs1" % SystemInfo["boxtype"]):
 					self.Console.eBatch(cmdlist, self.eMMCload, debug=True)
 				elif hddExt4:
@@ -160,6 +159,7 @@ class VuWizard(WizardLanguage, Rc):
 		config.misc.firstrun.value = 0
 		config.misc.firstrun.save()
 		configfile.save()
+		configfile.flush()
 		self.ConsoleS.ePopen("/usr/bin/opkg list_installed", self.readOpkg)
 
 	def readOpkg(self, result, retval, extra_args):
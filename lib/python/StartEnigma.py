@@ -429,6 +429,7 @@ def runScreenTest():
 	session.nav.shutdown()
 	profile("configfile.save")
 	configfile.save()
+	configfile.flush()
 	if not VuRecovery:
 		from Screens import InfoBarGenerics
 		InfoBarGenerics.saveResumePoints()
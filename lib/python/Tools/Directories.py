@@ -48,6 +48,11 @@ SCOPE_USERETC = SCOPE_HOME
 PATH_CREATE = 0
 PATH_DONTCREATE = 1
 
+# Seconds, the coarsest file modification time resolution (FAT). A file or
+# directory changed this recently may still change without a new mtime, so
+# anything cached on its mtime has to be read again.
+MTIME_RESOLUTION = 2
+
 #
 # ${libdir} = /usr/lib
 # ${sysconfdir} = /etc/enigma2
@@ -1,4 +1,9 @@
-from os import stat
+from collections import deque
+from ctypes import CDLL, get_errno
+from os import O_CLOEXEC, O_NONBLOCK, close, read, stat, strerror
+from os.path import basename, dirname
+from select import POLLIN
+from struct import calcsize, unpack_from
 import time
 
 from Components.config import config
@@ -6,15 +11,147 @@ from Components.config import config
 ECM_INFO = "/tmp/ecm.info"
 EMPTY_ECM_INFO = "", "0", "0", "0", ""
 
-old_ecm_time = time.time()
-info = {}
-ecm = ""
-data = EMPTY_ECM_INFO
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+INOTIFY_EVENT = "iIII"  # wd, mask, cookie, len, followed by the name
+
+
+# Parsed copy of the softcam's ecm.info shared by all users. The directory of
+# the file is watched with inotify from the main loop, so the file is read and
+# parsed once per change, the new data is passed to the subscribers and the
+# ecm times are kept in a short history. Without inotify or a main loop the
+# file is checked with stat() when the data is used, like before.
+class EcmInfoWatcher:
+	HistoryLength = 50  # ecm changes kept in the history
+
+	def __init__(self):
+		self.info = {}
+		self.ecm = []
+		self.data = EMPTY_ECM_INFO
+		self.ecmTime = None  # mtime of the parsed file
+		self.history = deque(maxlen=self.HistoryLength)  # (time, ecm time in msec, caid)
+		self.subscribers = []
+		self.inotify = None  # inotify file descriptor, False when inotify is not available
+		self.notifier = None
+		self.formatter = None
+		self.parses = 0  # bumped on every parse, tells the readers that the data changed
+
+	def watch(self):
+		if self.inotify is None:
+			self.inotify = False
+			try:
+				libc = CDLL(None, use_errno=True)
+				fd = libc.inotify_init1(O_NONBLOCK | O_CLOEXEC)
+				if fd < 0:
+					raise OSError(get_errno(), strerror(get_errno()))
+				if libc.inotify_add_watch(fd, dirname(ECM_INFO).encode(), IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE) < 0:
+					errno = get_errno()
+					close(fd)
+					raise OSError(errno, strerror(errno))
+				from enigma import eSocketNotifier
+				self.notifier = eSocketNotifier(fd, POLLIN)
+				self.notifier.callback.append(self.inotifyEvent)
+				self.inotify = fd
+			except (AttributeError, ImportError, OSError) as err:  # No inotify or no main loop, the file is checked when it is used.
+				print("[GetEcmInfo] Unable to watch '%s', checking it when used:" % ECM_INFO, err)
+			self.update(False)
+		return self.inotify is not False
+
+	def inotifyEvent(self, what=None):
+		changed = False
+		name = basename(ECM_INFO).encode()
+		size = calcsize(INOTIFY_EVENT)
+		while True:
+			try:
+				buffer = read(self.inotify, 4096)
+			except BlockingIOError:
+				break
+			except OSError as err:
+				print("[GetEcmInfo] Error: Unable to read inotify events!", err)
+				break
+			offset = 0
+			while offset + size <= len(buffer):
+				wd, mask, cookie, length = unpack_from(INOTIFY_EVENT, buffer, offset)
+				if mask & IN_Q_OVERFLOW or buffer[offset + size:offset + size + length].rstrip(b"\0") == name:
+					changed = True
+				offset += size + length
+		if changed:
+			if self.update(False):
+				for callback in self.subscribers[:]:
+					callback(self.data, self.info)
+
+	# Reads and parses the file, when checking only if its mtime changed.
+	# Returns True when the file was parsed again.
+	def update(self, checkOnly=True):
+		try:
+			ecmTime = stat(ECM_INFO).st_mtime
+		except OSError:
+			ecmTime = None
+		if ecmTime == self.ecmTime and checkOnly:
+			return False
+		previous = self.ecmTime
+		self.ecmTime = ecmTime
+		self.ecm = []
+		self.info = {"ecminterval2": self.info.get("ecminterval1", "")} if ecmTime is not None else {}
+		if ecmTime is not None:
+			self.parses += 1
+			try:
+				with open(ECM_INFO, "r") as fd:
+					self.ecm = fd.readlines()
+			except (IOError, OSError):
+				pass
+			if previous is not None:
+				self.info["ecminterval1"] = int(ecmTime - previous + 0.5)
+			for line in self.ecm:
+				d = line.split(":", 1)
+				if len(d) > 1:
+					self.info[d[0].strip()] = d[1].strip()
+			self.history.append((ecmTime, self.getEcmTime(self.info), self.info.get("caid", self.info.get("CAID", ""))))
+		if self.formatter is None:
+			self.formatter = GetEcmInfo()
+		self.data = self.formatter.getText() if self.info else EMPTY_ECM_INFO
+		return True
+
+	# Returns the ecm time of the parsed ecm.info in msec, softcams write it
+	# in seconds ("0.123") or milliseconds ("123 msec").
+	def getEcmTime(self, info):
+		value = info.get("ecm time", "")
+		try:
+			if "msec" in value:
+				return int(value.split()[0])
+			return int(float(value) * 1000 + 0.5) if value else None
+		except ValueError:
+			return None
+
+	# The file is only checked here when it can not be watched.
+	def check(self):
+		if not self.watch():
+			self.update()
+		if self.ecmTime is not None:
+			self.info["ecminterval0"] = int(time.time() - self.ecmTime + 0.5)
+
+	def subscribe(self, callback):
+		self.watch()
+		if callback not in self.subscribers:
+			self.subscribers.append(callback)
+
+	def unsubscribe(self, callback):
+		if callback in self.subscribers:
+			self.subscribers.remove(callback)
+
+	def getHistory(self):
+		return list(self.history)
+
+
+ecmInfoWatcher = EcmInfoWatcher()
 
 
 class GetEcmInfo:
 	def __init__(self):
-		pass
+		self.parses = None  # parses of the watcher when getEcm() was last called
 
 	def createCurrentDevice(self, current_device, isLong):
 		if not current_device:
@@ -39,52 +176,29 @@ class GetEcmInfo:
 			return _("Constcw") if isLong else "CCW"
 
 	def pollEcmData(self):
-		global data
-		global old_ecm_time
-		global info
-		global ecm
-		try:
-			ecm_time = stat(ECM_INFO).st_mtime
-		except:
-			ecm_time = old_ecm_time
-			data = EMPTY_ECM_INFO
-			info = {}
-			ecm = ""
-		if ecm_time != old_ecm_time:
-			oecmi1 = info.get("ecminterval1", "")
-			oecmi0 = info.get("ecminterval0", "")
-			info = {"ecminterval2": oecmi1, "ecminterval1": oecmi0}
-			old_ecm_time = ecm_time
-			try:
-				ecm = open(ECM_INFO, "r").readlines()
-			except:
-				ecm = ""
-			for line in ecm:
-				d = line.split(":", 1)
-				if len(d) > 1:
-					info[d[0].strip()] = d[1].strip()
-			data = self.getText()
-			return True
-		else:
-			info["ecminterval0"] = int(time.time() - ecm_time + 0.5)
+		ecmInfoWatcher.check()
 
 	def getEcm(self):
-		return (self.pollEcmData(), ecm)
+		self.pollEcmData()
+		changed = self.parses != ecmInfoWatcher.parses
+		self.parses = ecmInfoWatcher.parses
+		return (changed, ecmInfoWatcher.ecm)
 
 	def getEcmData(self):
 		self.pollEcmData()
-		return data
+		return ecmInfoWatcher.data
 
 	def getInfo(self, member, ifempty=""):
 		self.pollEcmData()
-		return str(info.get(member, ifempty))
+		return str(ecmInfoWatcher.info.get(member, ifempty))
 
 	def getInfoRaw(self):
 		self.pollEcmData()
-		return info
+		return ecmInfoWatcher.info
 
 	def getText(self):
-		global ecm
+		info = ecmInfoWatcher.info
+		ecm = ecmInfoWatcher.ecm
 		address = ""
 		device = ""
 		try:
@@ -1,10 +1,133 @@
-from enigma import loadPNG, loadJPG, loadSVG, RT_HALIGN_CENTER
+from collections import OrderedDict, deque
+from os import stat
+
+from enigma import eTimer, loadPNG, loadJPG, loadSVG, RT_HALIGN_CENTER
+
+
+# Python side cache of decoded pixmaps, keyed on the file name, its mtime and
+# size and the requested size/scaling.  The least recently used pixmaps are dropped once
+# the (estimated) memory of all cached pixmaps exceeds the byte budget.
+# Large pixmaps like backgrounds are not kept, they would push out many of
+# the small ones.
+class PixmapCache:
+	MaxPixmapBytes = 1024 * 1024  # (estimated) bytes of the largest pixmap kept
+	PrefetchSlice = 5  # pixmaps decoded per main loop iteration when prefetching
+
+	def __init__(self, budget=16 * 1024 * 1024):
+		self.budget = budget
+		self.pixmaps = OrderedDict()  # key -> (pixmap, bytes)
+		self.bytes = 0
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.skipped = 0
+		self.prefetchQueue = deque()
+		self.prefetchTimer = None
+
+	def setBudget(self, budget):
+		self.budget = budget
+		self.trim()
+
+	def get(self, key):
+		item = self.pixmaps.get(key)
+		if item is None:
+			self.misses += 1
+			return None
+		self.pixmaps.move_to_end(key)
+		self.hits += 1
+		return item[0]
+
+	def put(self, key, pixmap):
+		try:
+			size = pixmap.size()
+			bytes = size.width() * size.height() * 4
+		except Exception:
+			bytes = 65536
+		if bytes > self.MaxPixmapBytes:
+			self.skipped += 1
+			return
+		old = self.pixmaps.pop(key, None)
+		if old:
+			self.bytes -= old[1]
+		self.pixmaps[key] = (pixmap, bytes)
+		self.bytes += bytes
+		self.trim()
+
+	def trim(self):
+		while self.pixmaps and self.bytes > self.budget:
+			self.bytes -= self.pixmaps.popitem(last=False)[1][1]
+			self.evictions += 1
+
+	# Drop all cached pixmaps, or just the ones loaded from the given file.
+	# Called by skin.InitSkins() as a skin reload may change any image.
+	def invalidate(self, path=None):
+		if path is None:
+			self.pixmaps.clear()
+			self.bytes = 0
+			self.prefetchQueue.clear()
+		else:
+			for key in [key for key in self.pixmaps if key[0] == path]:
+				self.bytes -= self.pixmaps.pop(key)[1]
+
+	# Decode the given files in the background (a few per main loop iteration)
+	# so that a later LoadPixmap() of the same file and size is a cache hit.
+	def prefetch(self, paths, desktop=None, width=0, height=0, scaletoFit=0, align=RT_HALIGN_CENTER):
+		if self.budget > 0:
+			for path in paths:
+				if path:
+					self.prefetchQueue.append((path, desktop, width, height, scaletoFit, align))
+		if self.prefetchQueue:
+			if self.prefetchTimer is None:
+				self.prefetchTimer = eTimer()
+				self.prefetchTimer.callback.append(self.prefetchSlice)
+			self.prefetchTimer.start(0, True)
+
+	def prefetchSlice(self):
+		count = self.PrefetchSlice
+		while self.prefetchQueue and count:
+			path, desktop, width, height, scaletoFit, align = self.prefetchQueue.popleft()
+			key = pixmapKey(path, desktop, width, height, scaletoFit, align)
+			if self.budget > 0 and key is not None and key not in self.pixmaps:
+				try:
+					LoadPixmap(path, desktop=desktop, width=width, height=height, scaletoFit=scaletoFit, align=align)
+				except Exception as err:
+					print("[LoadPixmap] prefetch of '%s' failed: %s" % (path, err))
+				count -= 1
+		if self.prefetchQueue:
+			self.prefetchTimer.start(0, True)
+
+	def getStats(self):
+		return {"pixmaps": len(self.pixmaps), "bytes": self.bytes, "budget": self.budget, "hits": self.hits, "misses": self.misses, "evictions": self.evictions, "skipped": self.skipped}
+
+
+pixmapCache = PixmapCache()
+
+
+# Returns None if the file can't be read, such pixmaps are not cached.
+def pixmapKey(path, desktop, width, height, scaletoFit, align):
+	try:
+		st = stat(path + "rgb.jpg" if path[-1:] == "." else path)  # images rewritten under the same name are loaded again
+	except OSError:
+		return None
+	# pixmaps made compatible to the GUI and the display desktop differ
+	return (path, st.st_mtime, st.st_size, width, height, scaletoFit, align, desktop and (desktop.size().width(), desktop.size().height()))
 
 
 # If cached is not supplied, LoadPixmap defaults to caching PNGs and not caching JPGs
 # Split alpha channel JPGs are never cached as the C++ layer's caching is based on
 # a single file per image in the cache
+#
+# With the Python side pixmap cache enabled (a budget > 0) all image types,
+# including split alpha JPGs, are cached there unless cached is False. A
+# file rewritten under the same name misses the cache as its mtime or size
+# changed. The C++ layer still caches as described above, so the skin images stay loaded
+# when they are dropped from the Python side cache.
 def LoadPixmap(path, desktop=None, cached=None, width=0, height=0, scaletoFit=0, align=RT_HALIGN_CENTER):
+	key = pixmapKey(path, desktop, width, height, scaletoFit, align) if cached is not False and pixmapCache.budget > 0 else None
+	if key is not None:
+		ptr = pixmapCache.get(key)
+		if ptr:
+			return ptr
 	if path[-4:] == ".png":
 		# cache unless caller explicity requests to not cache
 		ptr = loadPNG(path, 0, 0 if cached is False else 1)
@@ -24,4 +147,6 @@ def LoadPixmap(path, desktop=None, cached=None, width=0, height=0, scaletoFit=0,
 		raise Exception("Neither .png nor .jpg nor .svg, please fix file extension")
 	if ptr and desktop:
 		desktop.makeCompatiblePixmap(ptr)
+	if ptr and key is not None:
+		pixmapCache.put(key, ptr)
 	return ptr
@@ -1,8 +1,12 @@
-from Components.Task import Task, Job
+import errno
+import os
+from os import path, remove
+from struct import Struct
+
+from Components.Task import Task, Job, PythonTask
 from Components.config import config
 from Tools.Directories import fileExists
 from enigma import eTimer
-from os import path
 
 
 class CopyTimeshiftJob(Job):
@@ -45,44 +49,123 @@ class AddCopyTimeshiftTask(Task):
 
 
 class MergeTimeshiftJob(Job):
-	def __init__(self, toolbox, cmdline, srcfile, destfile, eventname):
+	def __init__(self, toolbox, srcfile, destfile, eventname):
 		Job.__init__(self, _("Merging Timeshift files"))
 		self.toolbox = toolbox
-		AddMergeTimeshiftTask(self, cmdline, srcfile, destfile, eventname)
+		MergeTimeshiftTask(self, srcfile, destfile, eventname)
 
 
-class AddMergeTimeshiftTask(Task):
-	def __init__(self, job, cmdline, srcfile, destfile, eventname):
-		Task.__init__(self, job, eventname)
-		self.toolbox = job.toolbox
-		self.setCmdline(cmdline)
-		self.srcfile = config.usage.default_path.value + srcfile
-		self.destfile = config.usage.default_path.value + destfile
+# The access point (.ap) and structure (.sc) files of a recording hold
+# (file offset, pts/data) pairs of 64-bit big-endian values, the cuts file
+# (pts, type) pairs. When a segment is appended to a recording its entries are
+# appended with the file offsets moved by the old size of the recording and
+# the cut positions moved by the pts difference of the two starts.
+indexParser = Struct(">QQ")
+cutsParser = Struct(">QI")
+PTS_MASK = (1 << 33) - 1
 
-		self.ProgressTimer = eTimer()
-		self.ProgressTimer.callback.append(self.ProgressUpdate)
 
-	def ProgressUpdate(self):
-		if self.srcsize <= 0 or not fileExists(self.destfile, 'r'):
-			return
+def readIndex(filename):
+	with open(filename, "rb") as fd:
+		data = fd.read()
+	return [indexParser.unpack_from(data, offset) for offset in range(0, len(data) - indexParser.size + 1, indexParser.size)]
 
-		self.setProgress(int((path.getsize(self.destfile) / float(self.srcsize)) * 100))
-		self.ProgressTimer.start(7500, True)
 
-	def prepare(self):
-		if fileExists(self.srcfile, 'r') and fileExists(self.destfile, 'r'):
-			fsize1 = path.getsize(self.srcfile)
-			fsize2 = path.getsize(self.destfile)
-			self.srcsize = fsize1 + fsize2
-			self.ProgressTimer.start(7500, True)
+def appendIndex(srcName, destName, fileOffset):
+	entries = readIndex(srcName)
+	with open(destName, "ab") as fd:
+		fd.write(b"".join([indexParser.pack(offset + fileOffset, value) for offset, value in entries]))
 
+
+def getFirstPTS(apName):
+	with open(apName, "rb") as fd:
+		data = fd.read(indexParser.size)
+	return indexParser.unpack(data)[1] if len(data) == indexParser.size else None
+
+
+def appendCuts(srcName, destName, ptsOffset):
+	with open(srcName, "rb") as fd:
+		data = fd.read()
+	cuts = [cutsParser.unpack_from(data, offset) for offset in range(0, len(data) - cutsParser.size + 1, cutsParser.size)]
+	with open(destName, "ab") as fd:
+		fd.write(b"".join([cutsParser.pack(pts + ptsOffset, cutType) for pts, cutType in cuts if cutType != 3]))  # the last play position of the segment is dropped
+
+
+class MergeTimeshiftTask(PythonTask):
+	CopyChunk = 16 * 1024 * 1024  # bytes copied between progress updates
+
+	def __init__(self, job, srcfile, destfile, eventname):
+		PythonTask.__init__(self, job, eventname)
+		self.toolbox = job.toolbox
+		self.srcfile = config.usage.default_path.value + srcfile
+		self.destfile = config.usage.default_path.value + destfile
+		self.indexed = False  # the access point and structure files were merged
+		self.merged = False
+
+	def prepare(self):
 		self.toolbox.ptsFrontpanelActions("start")
 
+	def work(self):
+		srcsize = path.getsize(self.srcfile)
+		destsize = path.getsize(self.destfile)
+		self.indexed = all([path.exists(filename) for filename in (self.srcfile + ".ap", self.srcfile + ".sc", self.destfile + ".ap", self.destfile + ".sc")])
+		if not self.indexed:  # the indexes are created again afterwards
+			for filename in (self.destfile + ".ap", self.destfile + ".sc"):
+				if path.exists(filename):
+					remove(filename)
+		self.appendData(srcsize, destsize)
+		self.merged = True
+		if self.indexed:
+			try:
+				srcPTS = getFirstPTS(self.srcfile + ".ap")
+				destPTS = getFirstPTS(self.destfile + ".ap")
+				appendIndex(self.srcfile + ".ap", self.destfile + ".ap", destsize)
+				appendIndex(self.srcfile + ".sc", self.destfile + ".sc", destsize)
+				if path.exists(self.srcfile + ".cuts") and srcPTS is not None and destPTS is not None:
+					appendCuts(self.srcfile + ".cuts", self.destfile + ".cuts", (srcPTS - destPTS) & PTS_MASK)
+			except (IOError, OSError) as err:
+				print("[TimeShift] Unable to merge the indexes, they are created again: %s" % err)
+				self.indexed = False
+				for filename in (self.destfile + ".ap", self.destfile + ".sc"):
+					if path.exists(filename):
+						remove(filename)
+
+	# Appends the segment with copy_file_range(), which copies inside the
+	# kernel (or the file system), or sendfile() where it is not supported.
+	def appendData(self, srcsize, destsize):
+		copy = getattr(os, "copy_file_range", None)
+		with open(self.srcfile, "rb") as src, open(self.destfile, "r+b") as dest:
+			done = 0
+			try:
+				while done < srcsize:
+					if self.aborted:
+						raise IOError("Merge aborted")
+					count = min(self.CopyChunk, srcsize - done)
+					if copy:
+						try:
+							copied = copy(src.fileno(), dest.fileno(), count, done, destsize + done)
+						except OSError as err:
+							if err.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+								raise
+							copy = None
+							continue
+					else:
+						dest.seek(destsize + done)
+						copied = os.sendfile(dest.fileno(), src.fileno(), done, count)
+					if not copied:
+						raise IOError("%s is shorter than expected" % self.srcfile)
+					done += copied
+					self.pos = done * 100 // srcsize
+			except Exception:
+				dest.truncate(destsize)  # leave the recording as it was
+				raise
+
 	def afterRun(self):
-		self.setProgress(100)
-		self.ProgressTimer.stop()
-		config.timeshift.isRecording.value = True
-		self.toolbox.ptsMergeFilefinished(self.srcfile, self.destfile)
+		if self.merged:
+			config.timeshift.isRecording.value = True
+			self.toolbox.ptsMergeFilefinished(self.srcfile, self.destfile, self.indexed)
+		else:
+			self.toolbox.ptsMergeFilefailed(self.srcfile, self.destfile)
 
 
 class CreateAPSCFilesJob(Job):
@@ -146,9 +146,7 @@ class CleanTrashTask(Components.Task.PythonTask):
 
 		# add the root and the movie directory of each mount
 		print("[Trashcan] probing folders")
-		f = open("/proc/mounts", "r")
-		for line in f.readlines():
-			parts = line.strip().split()
+		for parts in Harddisk.getProcMounts():
 			if parts[1] == "/media/autofs":
 				continue
 			# skip network mounts unless the option to clean them is set
@@ -157,7 +155,6 @@ class CleanTrashTask(Components.Task.PythonTask):
 			# one trashcan in the root, one in movie subdirectory
 			trashcanLocations.add(parts[1])
 			trashcanLocations.add(ospath.join(parts[1], "movie"))
-		f.close()
 
 		for trashfolder in trashcanLocations:
 			trashfolder = ospath.join(trashfolder, ".Trash")
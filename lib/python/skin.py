@@ -8,7 +8,7 @@ from Components.Sources.Source import ObsoleteSource
 from Components.SystemInfo import SystemInfo
 from Tools.Directories import SCOPE_CONFIG, SCOPE_CURRENT_LCDSKIN, SCOPE_CURRENT_SKIN, SCOPE_FONTS, SCOPE_SKIN, SCOPE_SKIN_IMAGE, resolveFilename, fileReadXML, clearResolveLists  # noqa: F401
 from Tools.Import import my_import
-from Tools.LoadPixmap import LoadPixmap
+from Tools.LoadPixmap import LoadPixmap, pixmapCache
 
 DEFAULT_SKIN = SystemInfo["HasFullHDSkinSupport"] and "Simple_Ten_Eighty/skin.xml" or "ViX-Night-HD/skin.xml"
 EMERGENCY_SKIN = "skin_default/skin.xml"
@@ -83,6 +83,7 @@ def InitSkins(booting=True):
 	switchPixmap.clear()
 	scrollbarStyle = None
 	windowStyles.clear()
+	pixmapCache.invalidate()  # the new skin may use different images under the same names
 	desktop = getDesktop(GUI_SKIN_ID)
 	# Add the emergency skin.  This skin should provide enough functionality
 	# to enable basic GUI functions to work.
@@ -1,4 +1,6 @@
-from bisect import insort
+from bisect import bisect_left, insort
+from heapq import heappop, heappush
+from itertools import count
 from time import time, localtime, mktime
 from enigma import eTimer, eActionMap
 import datetime
@@ -158,6 +160,15 @@ class TimerEntry:
 		self.disabled = False
 
 
+# Stand-in entry to bisect timer_list on an activation time.
+class ActivationTime:
+	def __init__(self, when):
+		self.when = when
+
+	def getNextActivation(self):
+		return self.when
+
+
 class Timer:
 	# the time between "polls". We do this because
 	# we want to account for time jumps etc.
@@ -174,6 +185,15 @@ class Timer:
 		self.timer_list = []
 		self.processed_timers = []
 
+		# Activation queue for the entries in timer_list, a heap of
+		# (nextActivation, sequence, entry).  Heap items are invalidated lazily:
+		# only the item whose sequence matches queuedTimers[entry] is current,
+		# and the activation time is re-checked when an item reaches the top.
+		self.timerQueue = []
+		self.queuedTimers = {}
+		self.disabledTimers = set()  # disabled entries of timer_list, not queued
+		self.queueSequence = count()
+
 		self.timer = eTimer()
 		self.timer.callback.append(self.calcNextActivation)
 		self.lastActivation = time()
@@ -214,6 +234,65 @@ class Timer:
 				# Clear logs on finished timers
 				entry.log_entries = []
 
+	def queueTimer(self, entry):
+		if entry.disabled:
+			self.queuedTimers.pop(entry, None)
+			self.disabledTimers.add(entry)
+		else:
+			self.disabledTimers.discard(entry)
+			item = (entry.getNextActivation(), next(self.queueSequence), entry)
+			self.queuedTimers[entry] = item[:2]
+			heappush(self.timerQueue, item)
+
+	def unqueueTimer(self, entry):
+		self.queuedTimers.pop(entry, None)
+		self.disabledTimers.discard(entry)
+
+	# Add an entry to timer_list and the activation queue.
+	def insertTimer(self, entry):
+		insort(self.timer_list, entry)
+		self.queueTimer(entry)
+
+	# Remove an entry from timer_list and the activation queue,
+	# raises ValueError like list.remove() when it is not in the list.
+	def removeTimer(self, entry):
+		queued = self.queuedTimers.get(entry)
+		if queued is not None:
+			# timer_list is sorted on the activation time the entry was queued with,
+			# if the entry's times have been changed since, the bisection can end
+			# up one place behind it
+			when = queued[0]
+			index = max(bisect_left(self.timer_list, ActivationTime(when)) - 1, 0)
+			while index < len(self.timer_list):
+				if self.timer_list[index] is entry:
+					del self.timer_list[index]
+					self.unqueueTimer(entry)
+					return
+				if self.timer_list[index].getNextActivation() > when:
+					break
+				index += 1
+		self.timer_list.remove(entry)
+		self.unqueueTimer(entry)
+
+	# Return the enabled entry with the earliest activation or None.
+	def nextQueuedTimer(self):
+		for entry in [x for x in self.disabledTimers if not x.disabled]:
+			self.queueTimer(entry)  # enabled without timeChanged()
+		queue = self.timerQueue
+		while queue:
+			when, sequence, entry = queue[0]
+			if self.queuedTimers.get(entry, (None, None))[1] != sequence:
+				heappop(queue)  # stale item
+			elif entry.disabled:
+				heappop(queue)
+				self.queueTimer(entry)
+			elif entry.getNextActivation() != when:
+				heappop(queue)
+				self.queueTimer(entry)
+			else:
+				return entry
+		return None
+
 	def addTimerEntry(self, entry, noRecalc=0, dosave=True):
 		entry.processRepeated()
 
@@ -224,7 +303,7 @@ class Timer:
 			insort(self.processed_timers, entry)
 			entry.state = TimerEntry.StateEnded
 		else:
-			insort(self.timer_list, entry)
+			self.insertTimer(entry)
 			if not noRecalc:
 				self.calcNextActivation(dosave)
 
@@ -258,9 +337,11 @@ class Timer:
 	def calcNextActivation(self, dosave=True):
 		now = time()
 		if self.lastActivation > now:
-			print("[timer.py] timewarp - re-evaluating all processed timers.")
-			tl = self.processed_timers
-			self.processed_timers = []
+			print("[timer.py] timewarp - re-evaluating processed timers.")
+			# only timers which can still (re-)occur after the jump need a new chance,
+			# the others would just end up in processed_timers again
+			tl = [x for x in self.processed_timers if x.repeated or x.end > now]
+			self.processed_timers = [x for x in self.processed_timers if not (x.repeated or x.end > now)]
 			for x in tl:
 				# simulate a "waiting" state to give them a chance to re-occure
 				x.resetState()
@@ -271,12 +352,10 @@ class Timer:
 
 		min = int(now) + self.MaxWaitTime
 
-		self.timer_list and self.timer_list.sort()  # resort/refresh list, try to fix hanging timers
-
 		# calculate next activation point
-		timer_list = [t for t in self.timer_list if not t.disabled]
-		if timer_list:
-			w = timer_list[0].getNextActivation()
+		entry = self.nextQueuedTimer()
+		if entry:
+			w = entry.getNextActivation()
 			if w < min:
 				min = w
 
@@ -292,7 +371,7 @@ class Timer:
 			self.processed_timers.remove(timer)
 		else:
 			try:
-				self.timer_list.remove(timer)
+				self.removeTimer(timer)
 			except:
 				print("[timer] Failed to remove, not in list")
 				return
@@ -307,7 +386,7 @@ class Timer:
 		self.addTimerEntry(timer, dosave=dosave)
 
 	def doActivate(self, w, dosave=True):
-		self.timer_list.remove(w)
+		self.removeTimer(w)
 
 		# when activating a timer which has already passed,
 		# simply abort the timer. don't run trough all the stages.
@@ -323,7 +402,7 @@ class Timer:
 		# did this timer reached the last state?
 		if w.state < TimerEntry.StateEnded:
 			# no, sort it into active list
-			insort(self.timer_list, w)
+			self.insertTimer(w)
 		else:
 			# yes. Process repeated, and re-add.
 			if w.repeated:
@@ -354,11 +433,16 @@ class Timer:
 
 		wasActivated = False
 		while True:
-			entry = None
-			for tmr in self.timer_list:
-				if not tmr.disabled and not getattr(tmr, "currentlyActivated", False):
-					entry = tmr
-					break
+			entry = self.nextQueuedTimer()
+			if entry and getattr(entry, "currentlyActivated", False):
+				# being activated further up the stack, look at the entries behind it
+				busy = []
+				while entry and getattr(entry, "currentlyActivated", False):
+					busy.append(entry)
+					self.unqueueTimer(entry)
+					entry = self.nextQueuedTimer()
+				for tmr in busy:
+					self.queueTimer(tmr)
 			if entry and entry.getNextActivation() < t:
 				entry.currentlyActivated = True
 				self.doActivate(entry, False)
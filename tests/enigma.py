@@ -24,6 +24,7 @@ timers = set()
 class eTimer:
 	def __init__(self):
 		self.timeout = slot()
+		self.callback = self.timeout.list
 		self.next_activation = None
 		print("NEW TIMER")
 
@@ -166,6 +167,9 @@ class eServiceReference:
 	def toString(self):
 		return self.ref
 
+	def toCompareString(self):
+		return self.ref
+
 	def __repr__(self):
 		return self.toString()
 
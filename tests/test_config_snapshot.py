@@ -0,0 +1,67 @@
+import os
+import tempfile
+import time
+from . import enigma
+from Components.config import Config
+
+# Benchmark of the settings snapshot against parsing the settings file.
+#
+# Run with:
+# PYTHONPATH=.:..:../lib/python/ python test_config_snapshot.py (see README)
+#
+# Every boot loads the settings file before the first ConfigElement is created,
+# a valid snapshot must be loaded instead of parsing the text again.
+
+
+class TextConfig(Config):
+	snapshotEnabled = False
+
+
+def writeSettings(filename, sections=200, entries=100):
+	lines = ["config.skin.primary_skin=None\n"]
+	for x in range(sections):
+		for y in range(entries):
+			lines.append("config.plugins.bench%d.sub%d.entry%d=value %d\n" % (x, y % 10, y, x * y))
+	config = Config()
+	config.unpickle(lines)
+	config.saveToFile(filename)
+
+
+def timeLoads(filename, snapshot, loads=5):
+	start = time.perf_counter()
+	for x in range(loads):
+		config = Config() if snapshot else TextConfig()
+		config.loadFromFile(filename)
+	return (time.perf_counter() - start) / loads, config.saved_value
+
+
+def test_config_snapshot():
+	with tempfile.TemporaryDirectory() as directory:
+		filename = os.path.join(directory, "settings")
+		writeSettings(filename, sections=2, entries=10)
+		assert os.path.exists(filename + Config.SNAPSHOT_SUFFIX)
+		config = Config()
+		assert config.loadSnapshot(filename)["config"]["plugins"]["bench1"]["sub3"]["entry3"] == "value 3"
+		# the text file stays the source of truth
+		with open(filename, "a") as f:
+			f.write("config.plugins.bench1.sub3.entry3=changed\n")
+		assert config.loadSnapshot(filename) is None
+		config.loadFromFile(filename)
+		assert config.saved_value["plugins"]["bench1"]["sub3"]["entry3"] == "changed"
+		assert config.loadSnapshot(filename)["config"]["plugins"]["bench1"]["sub3"]["entry3"] == "changed"
+
+
+def test_config_snapshot_benchmark():
+	with tempfile.TemporaryDirectory() as directory:
+		filename = os.path.join(directory, "settings")
+		writeSettings(filename)
+		parse, parsed = timeLoads(filename, False)
+		load, loaded = timeLoads(filename, True)
+		print("%d settings: %.2f msec to parse, %.2f msec from the snapshot" % (200 * 100, parse * 1000, load * 1000))
+		assert parsed == loaded
+		assert load < parse, "loading the settings snapshot is slower than parsing the settings"
+
+
+if __name__ == "__main__":
+	test_config_snapshot()
+	test_config_snapshot_benchmark()
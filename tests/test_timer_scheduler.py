@@ -0,0 +1,85 @@
+import time
+from . import enigma
+import timer
+
+# Synthetic benchmark of the timer.Timer activation queue.
+#
+# Run with:
+# PYTHONPATH=.:..:../lib/python/ python test_timer_scheduler.py (see README)
+#
+# Every wakeup of the Timer looks for the next entry to activate, so its cost
+# must not grow with the number of waiting timers.
+
+
+class BenchTimerEntry(timer.TimerEntry):
+	def __init__(self, begin, end):
+		timer.TimerEntry.__init__(self, begin, end)
+		self.activated = 0
+
+	def getNextActivation(self):
+		return self.begin
+
+	def activate(self):
+		self.activated += 1
+		return True
+
+
+def buildTimer(count, base):
+	t = timer.Timer()
+	t.saveTimer = lambda: None
+	for x in range(count):
+		t.addTimerEntry(BenchTimerEntry(base + 3600 + x * 60, base + 5400 + x * 60), noRecalc=1)
+	return t
+
+
+def timeWakeups(t, wakeups=2000):
+	start = time.perf_counter()
+	for x in range(wakeups):
+		t.calcNextActivation()
+	return (time.perf_counter() - start) / wakeups
+
+
+def timeChanges(t, base, changes=2000):
+	entries = t.timer_list[:changes]
+	start = time.perf_counter()
+	for x, entry in enumerate(entries):
+		entry.begin = base + 7200 + x
+		t.timeChanged(entry)
+	return (time.perf_counter() - start) / changes
+
+
+def test_timer_scheduler_order():
+	base = int(time.time())
+	t = buildTimer(10, base)
+	first = t.timer_list[0]
+	first.disable()
+	assert t.nextQueuedTimer() is not first
+	first.enable()
+	assert t.nextQueuedTimer() is first
+	# moving the first entry to the back must be picked up lazily
+	first.begin += 86400
+	assert t.nextQueuedTimer() is t.timer_list[1]
+	t.timeChanged(first)
+	assert t.timer_list[-1] is first
+	# due entries are activated in order
+	t.timer_list[0].begin = base - 10
+	t.timeChanged(t.timer_list[0])
+	t.calcNextActivation()
+	assert sum([x.activated for x in t.timer_list + t.processed_timers]) == 3
+
+
+def test_timer_scheduler_benchmark():
+	base = int(time.time())
+	results = []
+	for count in (1000, 10000):
+		t = buildTimer(count, base)
+		wakeup = timeWakeups(t)
+		change = timeChanges(t, base)
+		results.append(wakeup)
+		print("%6d timers: %.2f usec per wakeup, %.2f usec per time change" % (count, wakeup * 1000000, change * 1000000))
+	assert results[-1] < results[0] * 5, "timer wakeup cost grows with the timer count"
+
+
+if __name__ == "__main__":
+	test_timer_scheduler_order()
+	test_timer_scheduler_benchmark()
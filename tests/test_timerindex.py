@@ -0,0 +1,90 @@
+import time
+from . import enigma
+from timer import TimerEntry
+from Components.TimerIndex import TimerIndex, overlapClusters
+
+# Benchmark of the RecordTimer interval index.
+#
+# Run with:
+# PYTHONPATH=.:..:../lib/python/ python test_timerindex.py (see README)
+#
+# The EPG screens look up every visible event against the timer list, so the
+# cost of a lookup must not grow with the number of timers.
+
+
+class FakeTimer:
+	def __init__(self, serviceref, begin, end, repeated=0):
+		self.service_ref = enigma.eServiceReference(serviceref)
+		self.begin = begin
+		self.end = end
+		self.repeated = repeated
+		self.state = TimerEntry.StateWaiting
+
+
+def serviceRef(number):
+	return "1:0:1:%X:44D:1:C00000:0:0:0:" % (number + 1)
+
+
+def buildIndex(count, services=100, base=1000000):
+	index = TimerIndex()
+	for x in range(count):
+		begin = base + (x // services) * 3600
+		index.update(FakeTimer(serviceRef(x % services), begin, begin + 1800, repeated=0x7f if x % 97 == 0 else 0))
+	return index
+
+
+def timeLookups(index, lookups=20000, services=100, base=1000000):
+	start = time.perf_counter()
+	for x in range(lookups):
+		begin = base + (x % 24) * 3600
+		index.lookup(serviceRef(x % services), begin, begin + 3600)
+	return (time.perf_counter() - start) / lookups
+
+
+def test_timerindex_lookup():
+	index = buildIndex(10)
+	timers = index.lookup(serviceRef(1), 1000000, 1003600)
+	assert len(timers) == 1
+	timer = timers[0]
+	timer.begin += 7200
+	timer.end += 7200
+	index.update(timer)
+	assert not index.lookup(serviceRef(1), 1000000, 1003600)
+	assert index.lookup(serviceRef(1), 1007200, 1010800) == [timer]
+	timer.state = TimerEntry.StateEnded
+	index.update(timer)
+	assert not index.lookup(serviceRef(1), 1007200, 1010800)
+	assert len(index) == 9
+
+
+def test_timerindex_overlapclusters():
+	# the clusters of one sweep must match the ones the index finds per timer
+	timers = []
+	index = TimerIndex()
+	for x in range(200):
+		begin = 1800000000 + (x * 7919) % 200 * 1200
+		timers.append(FakeTimer(serviceRef(x % 10), begin, begin + 600 + (x * 31) % 3000, repeated=0x01 if x % 67 == 0 else 0))
+		index.update(timers[-1])
+	clusters = overlapClusters(timers)
+	for timer in timers:
+		if timer.repeated:
+			assert clusters[timer] is None
+		else:
+			cluster = index.overlapping(timer)
+			assert cluster is None or cluster <= clusters[timer], "sweep misses a timer of the cluster"
+
+
+def test_timerindex_benchmark():
+	results = []
+	for count in (100, 1000, 10000):
+		cost = timeLookups(buildIndex(count))
+		results.append(cost)
+		print("%6d timers: %.2f usec per lookup" % (count, cost * 1000000))
+	# a linear scan grows 100 fold here, the index must stay (nearly) flat
+	assert results[-1] < results[0] * 5, "timer lookup cost grows with the timer count"
+
+
+if __name__ == "__main__":
+	test_timerindex_lookup()
+	test_timerindex_overlapclusters()
+	test_timerindex_benchmark()
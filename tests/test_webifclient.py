@@ -0,0 +1,194 @@
+import time
+from hashlib import md5
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from re import findall
+from threading import Thread
+from twisted.internet import reactor
+from twisted.internet.error import TimeoutError
+from Components.WebIfClient import WebIfClient, WebIfError
+
+# Tests of the softcam web interface client against a local stand-in server.
+#
+# Run with:
+# PYTHONPATH=.:..:../lib/python/ python test_webifclient.py (see README)
+#
+# OScamInfo and CCcamInfo refresh their pages from the main loop, a slow web
+# interface must not block it and screens asking for the same page at the same
+# time must share one request.
+
+STATUS = b"""<?xml version="1.0" encoding="UTF-8"?>
+<oscam version="1.20" revision="11700">
+<status>
+<client type="r" name="reader1" protocol="internal"><request caid="0963" srvid="1234">Sky: News</request><connection ip="0.0.0.0">OK</connection></client>
+<client type="c" name="user1" protocol="cccam"><request caid="0963" srvid="1234">Sky: News</request><connection ip="192.168.1.2">OK</connection></client>
+</status>
+</oscam>
+"""
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"  # keep-alive
+	connections = 0
+	requests = 0
+
+	def setup(self):
+		StandInHandler.connections += 1
+		BaseHTTPRequestHandler.setup(self)
+
+	def log_message(self, format, *args):
+		pass
+
+	def send(self, code, body, headers=()):
+		self.send_response(code)
+		for name, value in headers:
+			self.send_header(name, value)
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def do_GET(self):
+		StandInHandler.requests += 1
+		if self.path.startswith("/oscamapi.html"):
+			self.send_response(200)
+			self.send_header("Transfer-Encoding", "chunked")
+			self.end_headers()
+			for x in range(0, len(STATUS), 64):  # The document arrives in small pieces over some time.
+				chunk = STATUS[x:x + 64]
+				self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+				self.wfile.flush()
+				time.sleep(0.02)
+			self.wfile.write(b"0\r\n\r\n")
+		elif self.path == "/slow":
+			time.sleep(2)
+			try:
+				self.send(200, b"late")
+			except ConnectionError:  # The client gave up.
+				pass
+		elif self.path == "/broken":
+			self.send(200, b"<oscam><status></oscam>")
+		elif self.path == "/basic":
+			if self.headers.get("Authorization") == "Basic dXNlcjpwYXNz":
+				self.send(200, b"shares")
+			else:
+				self.send(401, b"denied", (("WWW-Authenticate", 'Basic realm="CCcam"'),))
+		elif self.path.startswith("/digest"):
+			if self.checkDigest(self.headers.get("Authorization", "")):
+				self.send(200, b"secret")
+			else:
+				self.send(401, b"denied", (("WWW-Authenticate", 'Digest realm="Forbidden", qop="auth", nonce="abc123", opaque="xyz"'),))
+		else:
+			self.send(404, b"not found")
+
+	def checkDigest(self, authorization):
+		if not authorization.startswith("Digest "):
+			return False
+		fields = dict([(name, quoted or plain) for name, quoted, plain in findall(r'(\w+)=(?:"([^"]*)"|([^\s,]*))', authorization[7:])])
+		ha1 = md5(b"user:Forbidden:pass").hexdigest()
+		ha2 = md5(("GET:%s" % self.path).encode()).hexdigest()
+		expected = md5(("%s:abc123:%s:%s:auth:%s" % (ha1, fields.get("nc"), fields.get("cnonce"), ha2)).encode()).hexdigest()
+		return fields.get("response") == expected and fields.get("uri") == self.path and fields.get("opaque") == "xyz"
+
+
+def startServer():
+	server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+	server.daemon_threads = True
+	thread = Thread(target=server.serve_forever)
+	thread.daemon = True
+	thread.start()
+	return server, "http://127.0.0.1:%d" % server.server_address[1]
+
+
+def wait(*deferreds):
+	if not reactor.running:
+		reactor.startRunning(installSignalHandlers=False)  # Starts the thread pool resolving the host names.
+	results = [[] for deferred in deferreds]
+	for deferred, result in zip(deferreds, results):
+		deferred.addBoth(result.append)
+	end = time.time() + 10
+	while not all(results) and time.time() < end:
+		reactor.iterate(0.01)
+	assert all(results), "request did not finish"
+	return [result[0] for result in results] if len(results) > 1 else results[0][0]
+
+
+def test_webifclient_xml():
+	server, url = startServer()
+	client = WebIfClient()
+	root = wait(client.getPage(url + "/oscamapi.html?part=status", xml=True))
+	assert root.attrib["revision"] == "11700"
+	assert [x.attrib["name"] for x in root.find("status").findall("client")] == ["reader1", "user1"]
+	assert wait(client.getPage(url + "/slow")) == b"late"
+	failure = wait(client.getPage(url + "/broken", xml=True))
+	assert "mismatched tag" in failure.getErrorMessage()
+	failure = wait(client.getPage(url + "/missing"))
+	assert failure.check(WebIfError) and failure.value.code == 404
+	client.pool.closeCachedConnections()
+	server.shutdown()
+
+
+def test_webifclient_coalescing():
+	server, url = startServer()
+	client = WebIfClient()
+	StandInHandler.requests = 0
+	results = wait(*[client.getPage(url + "/oscamapi.html?part=status", xml=True) for x in range(5)])
+	assert StandInHandler.requests == 1, "concurrent requests of the same page were not joined"
+	assert all([result is results[0] for result in results])
+	first = client.getPage(url + "/oscamapi.html?part=status", xml=True)
+	second = client.getPage(url + "/oscamapi.html?part=status", xml=True)
+	first.addErrback(lambda failure: None)
+	first.cancel()  # A screen closed while waiting does not cancel the request of the others.
+	assert wait(second).attrib["revision"] == "11700"
+	assert StandInHandler.requests == 2
+	client.pool.closeCachedConnections()
+	server.shutdown()
+
+
+def test_webifclient_keepalive():
+	server, url = startServer()
+	client = WebIfClient()
+	StandInHandler.connections = 0
+	for x in range(10):
+		assert wait(client.getPage(url + "/oscamapi.html?part=status&refresh=%d" % x, xml=True)).tag == "oscam"
+	assert StandInHandler.connections == 1, "%d connections for 10 sequential requests" % StandInHandler.connections
+	client.pool.closeCachedConnections()
+	server.shutdown()
+
+
+def test_webifclient_timeout():
+	server, url = startServer()
+	client = WebIfClient()
+	client.Timeout = 0.5
+	start = time.time()
+	failure = wait(client.getPage(url + "/slow"))
+	assert time.time() - start < 1.5
+	assert failure.check(TimeoutError)
+	client.pool.closeCachedConnections()
+	server.shutdown()
+
+
+def test_webifclient_auth():
+	server, url = startServer()
+	client = WebIfClient()
+	StandInHandler.requests = 0
+	assert wait(client.getPage(url + "/digest?part=status", "user", "pass")) == b"secret"
+	assert StandInHandler.requests == 2
+	assert wait(client.getPage(url + "/digest?part=status", "user", "pass")) == b"secret"
+	assert StandInHandler.requests == 3, "the digest was not sent with the following request"
+	failure = wait(client.getPage(url + "/digest?part=status", "user", "wrong"))
+	assert failure.check(WebIfError) and failure.value.code == 401
+	StandInHandler.requests = 0
+	assert wait(client.getPage(url + "/basic", "user", "pass")) == b"shares"
+	assert wait(client.getPage(url + "/basic", "user", "pass")) == b"shares"
+	assert StandInHandler.requests == 3, "the authorization was not sent with the following request"
+	client.pool.closeCachedConnections()
+	server.shutdown()
+
+
+if __name__ == "__main__":
+	test_webifclient_xml()
+	test_webifclient_coalescing()
+	test_webifclient_keepalive()
+	test_webifclient_timeout()
+	test_webifclient_auth()
+	reactor.stop()
+	reactor.iterate(0)